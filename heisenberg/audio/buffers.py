@@ -1,3 +1,46 @@
 class AudioBuffer:
-    """Circular buffer for audio data."""
-    pass
+    """
+    Circular buffer for audio data.
+
+    Keeps the last `capacity_ms` of 16-bit mono PCM in a preallocated
+    bytearray; writing never allocates and old audio is overwritten. Used as
+    a pre-roll: on barge-in, the speech that triggered it is handed to STT.
+    """
+
+    def __init__(self, capacity_ms: int, sample_rate: int = 16000, sample_width: int = 2):
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.capacity = max(sample_width, capacity_ms * sample_rate // 1000 * sample_width)
+        self._data = bytearray(self.capacity)
+        self._end = 0  # Next write position
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def duration_ms(self) -> float:
+        return self._size / self.sample_width * 1000 / self.sample_rate
+
+    def write(self, frame: bytes) -> None:
+        frame = memoryview(frame)[-self.capacity:]
+        n = len(frame)
+        first = min(n, self.capacity - self._end)
+        self._data[self._end:self._end + first] = frame[:first]
+        self._data[:n - first] = frame[first:]
+        self._end = (self._end + n) % self.capacity
+        self._size = min(self.capacity, self._size + n)
+
+    def read(self, ms: float = None) -> bytes:
+        """The most recent `ms` of audio (everything held if None), oldest first."""
+        size = self._size
+        if ms is not None:
+            size = min(size, int(ms * self.sample_rate / 1000) * self.sample_width)
+        start = (self._end - size) % self.capacity
+        if start + size <= self.capacity:
+            return bytes(self._data[start:start + size])
+        return bytes(self._data[start:]) + bytes(self._data[:self._end])
+
+    def clear(self) -> None:
+        self._end = 0
+        self._size = 0
@@ -1,5 +1,6 @@
 import asyncio
 import logging
+import threading
 import pyaudio
 import numpy as np
 from typing import Optional
@@ -23,6 +24,9 @@ class PyAudioIO(ABCAudioIO):
         self.config = config
         self.pa = pyaudio.PyAudio()
         self.stream: Optional[pyaudio.Stream] = None
+        self.output_stream: Optional[pyaudio.Stream] = None
+        # Blocking writes run in a worker thread; closing must not race them
+        self._output_lock = threading.Lock()
         self._loop = asyncio.get_event_loop()
         
         # Internal target for Heisenberg (fixed at 16000)
@@ -173,6 +177,18 @@ class PyAudioIO(ABCAudioIO):
             self.stream = None
         logger.info("PyAudioIO stream stopped")
 
+    async def close(self) -> None:
+        """Stop capture and close the output stream."""
+        await self.stop()
+        with self._output_lock:
+            if self.output_stream:
+                try:
+                    self.output_stream.stop_stream()
+                    self.output_stream.close()
+                except Exception:
+                    pass
+                self.output_stream = None
+
     async def read_frame(self) -> Optional[bytes]:
         """Pop a 16kHz frame from the internal queue."""
         try:
@@ -181,4 +197,23 @@ class PyAudioIO(ABCAudioIO):
             return None
 
     async def play_frame(self, frame: bytes) -> None:
-        pass
+        """
+        Play a 16kHz mono int16 frame. The blocking write returns once the frame
+        fits in the device buffer, which paces callers at the playback rate.
+        """
+        await asyncio.to_thread(self._write_output, frame)
+
+    def _write_output(self, frame: bytes) -> None:
+        with self._output_lock:
+            if self.output_stream is None:
+                idx = self.config.output_device_index if self.config.output_device_index != -1 else None
+                self.output_stream = self.pa.open(
+                    format=pyaudio.paInt16,
+                    channels=1,
+                    rate=self.process_rate,
+                    output=True,
+                    output_device_index=idx,
+                    frames_per_buffer=self.process_rate // 50,  # 20ms
+                )
+                logger.info(f"PyAudioIO output started at {self.process_rate}Hz")
+            self.output_stream.write(frame)
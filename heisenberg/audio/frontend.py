@@ -0,0 +1,350 @@
+import asyncio
+import logging
+import multiprocessing
+import struct
+import time
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from typing import Awaitable, Callable, Iterable, Optional, Set, Tuple
+
+from heisenberg.interfaces.audio import ABCAudioIO
+from heisenberg.interfaces.wakeword import ABCWakeword
+from heisenberg.core.config import Config
+from heisenberg.core.metrics import metrics
+from heisenberg.core.profiling import CpuSampler, JitterMeter
+from heisenberg.orchestrator.state import State
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct("<Q")  # Frames written so far
+_SLOT_HEADER = struct.Struct("<QId")  # Frame sequence number, length, capture time (time.monotonic)
+_HEADER_SIZE = 64
+_BUSY = 2**64 - 1  # Slot sequence number while the writer rewrites it
+
+
+class SharedAudioRing:
+    """
+    Single-producer, single-consumer ring of audio frames in shared memory.
+
+    The buffer holds `slots` fixed-size slots. Each slot is a seqlock: the
+    writer marks it busy, fills it, then stamps it with its sequence number
+    and bumps the global counter. The reader follows with its own counter
+    and checks the slot's stamp before and after copying, so a frame
+    rewritten under it is never returned torn. A reader lapped by the
+    writer skips ahead to the oldest frame still held and counts the
+    overrun, so the real-time side never waits for the other process.
+    """
+
+    def __init__(self, slots: int = 32, slot_bytes: int = 6400, name: Optional[str] = None):
+        """
+        Args:
+            slots: Frames held
+            slot_bytes: Largest frame (longer frames are split)
+            name: Shared memory block to attach to (a new one is created if None)
+        """
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self._stride = _SLOT_HEADER.size + slot_bytes
+        size = _HEADER_SIZE + slots * self._stride
+        self.owner = name is None
+        self.shm = SharedMemory(name=name, create=self.owner, size=size if self.owner else 0)
+        if self.owner:
+            # Only the creator unlinks; spawned children share its resource tracker
+            _HEADER.pack_into(self.shm.buf, 0, 0)
+        self.read_seq = self.written
+        self.overruns = 0
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def written(self) -> int:
+        return _HEADER.unpack_from(self.shm.buf, 0)[0]
+
+    def write(self, frame: bytes, captured_at: Optional[float] = None) -> None:
+        captured_at = time.monotonic() if captured_at is None else captured_at
+        seq = self.written
+        for i in range(0, len(frame), self.slot_bytes):
+            part = frame[i:i + self.slot_bytes]
+            data = self._begin_slot(seq)
+            self.shm.buf[data:data + len(part)] = part
+            self._commit_slot(seq, len(part), captured_at)
+            seq += 1
+            _HEADER.pack_into(self.shm.buf, 0, seq)
+
+    def _begin_slot(self, seq: int) -> int:
+        """Mark the slot of `seq` busy before rewriting it; returns where its data goes."""
+        offset = _HEADER_SIZE + (seq % self.slots) * self._stride
+        _SLOT_HEADER.pack_into(self.shm.buf, offset, _BUSY, 0, 0.0)
+        return offset + _SLOT_HEADER.size
+
+    def _commit_slot(self, seq: int, length: int, captured_at: float) -> None:
+        offset = _HEADER_SIZE + (seq % self.slots) * self._stride
+        _SLOT_HEADER.pack_into(self.shm.buf, offset, seq, length, captured_at)
+
+    def read(self) -> Optional[Tuple[bytes, float]]:
+        """Next frame and its capture time, or None if the reader is up to date."""
+        written = self.written
+        if self.read_seq >= written:
+            return None
+        if written - self.read_seq > self.slots:
+            skipped = written - self.slots - self.read_seq
+            self.overruns += skipped
+            metrics.increment("audio_ring_overrun", value=skipped)
+            self.read_seq = written - self.slots
+
+        offset = _HEADER_SIZE + (self.read_seq % self.slots) * self._stride
+        seq, length, captured_at = _SLOT_HEADER.unpack_from(self.shm.buf, offset)
+        if seq == self.read_seq:
+            frame = self._copy(offset + _SLOT_HEADER.size, min(length, self.slot_bytes))
+            if _SLOT_HEADER.unpack_from(self.shm.buf, offset)[0] == seq:
+                self.read_seq += 1
+                return frame, captured_at
+        # Being rewritten (busy) or rewritten while copying: the frame is lost
+        self.overruns += 1
+        metrics.increment("audio_ring_overrun")
+        self.read_seq = max(self.read_seq + 1, self.written - self.slots)
+        return None
+
+    def _copy(self, data: int, length: int) -> bytes:
+        return bytes(self.shm.buf[data:data + length])
+
+    def close(self) -> None:
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class FrontendWakeword(ABCWakeword):
+    """Main-process side of the wakeword detector running in the front-end process."""
+
+    def __init__(self, frontend: "FrontendProcess"):
+        self.frontend = frontend
+        self.callback: Optional[Callable[[], Awaitable[None]]] = None
+
+    def on_detected(self, callback: Callable[[], Awaitable[None]]) -> None:
+        self.callback = callback
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def feed_audio(self, frame: bytes) -> None:
+        """Nothing to do: the front-end process feeds the detector itself."""
+
+
+class FrontendProcess(ABCAudioIO):
+    """
+    Capture and the always-on wakeword detector in a dedicated process.
+
+    The child process owns PyAudio, RNNoise and openwakeword: its capture
+    callbacks and ONNX inference never wait for this process's GIL, garbage
+    collector or event loop. Frames reach this process through a
+    `SharedAudioRing`; detections, statistics and commands go over a pipe,
+    read here with a loop reader instead of a polling task. Playback stays
+    in this process, on `output`.
+    """
+
+    def __init__(self, config: Config, output: Optional[ABCAudioIO] = None):
+        self.config = config
+        self.output = output
+        self.wakeword = FrontendWakeword(self)
+        self.ring: Optional[SharedAudioRing] = None
+        self.wakeword_states: Set[State] = {State.IDLE}
+        self.wakeword_active = True
+        self._process: Optional[multiprocessing.Process] = None
+        self._conn: Optional[Connection] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def running(self) -> bool:
+        return self._process is not None and self._process.is_alive()
+
+    async def _spawn(self) -> None:
+        audio = self.config.audio
+        self.ring = SharedAudioRing(audio.frontend_ring_slots)
+        parent_conn, child_conn = multiprocessing.Pipe()
+        # spawn: the child must not inherit this process's threads and event loop
+        context = multiprocessing.get_context("spawn")
+        self._process = context.Process(
+            target=run_frontend,
+            args=(self.config, self.ring.name, self.ring.slots, self.ring.slot_bytes, child_conn),
+            name="heisenberg-frontend",
+            daemon=True,
+        )
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(self._conn.fileno(), self._on_message)
+        self._send("wakeword", self.wakeword_active)
+        logger.info(f"Audio front-end process started (pid {self._process.pid})")
+
+    async def start(self) -> None:
+        if not self.running:
+            await self._spawn()
+        self._send("capture", True)
+
+    async def stop(self) -> None:
+        self._send("capture", False)
+
+    async def close(self) -> None:
+        if self._conn is not None:
+            self._send("exit")
+            self._loop.remove_reader(self._conn.fileno())
+        if self._process is not None:
+            await asyncio.to_thread(self._process.join, 2.0)
+            if self._process.is_alive():
+                self._process.terminate()
+            self._process = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+        if self.output is not None and hasattr(self.output, "close"):
+            await self.output.close()
+
+    async def read_frame(self) -> Optional[bytes]:
+        """Next captured 16kHz frame, or None after a short wait if none is ready."""
+        item = self.ring.read() if self.ring is not None else None
+        if item is None:
+            await asyncio.sleep(0.005)
+            return None
+        frame, captured_at = item
+        metrics.record_latency("audio_frontend_delivery", (time.monotonic() - captured_at) * 1000)
+        return frame
+
+    async def play_frame(self, frame: bytes) -> None:
+        if self.output is not None:
+            await self.output.play_frame(frame)
+
+    def bind(self, fsm, wakeword_states: Iterable[State]) -> None:
+        """Run the detector only in `wakeword_states`, following the FSM."""
+        self.wakeword_states = set(wakeword_states)
+
+        async def on_enter(old_state: State, new_state: State) -> None:
+            self.set_wakeword_active(new_state in self.wakeword_states)
+
+        for state in State:
+            fsm.on_enter(state, on_enter)
+        self.set_wakeword_active(fsm.state in self.wakeword_states)
+
+    def set_wakeword_active(self, active: bool) -> None:
+        if active != self.wakeword_active:
+            self.wakeword_active = active
+            self._send("wakeword", active)
+
+    def _send(self, *message) -> None:
+        if self._conn is None:
+            return
+        try:
+            self._conn.send(message)
+        except (OSError, EOFError) as e:
+            logger.error(f"Audio front-end process unreachable: {e}")
+
+    def _on_message(self) -> None:
+        try:
+            kind, *args = self._conn.recv()
+        except (OSError, EOFError):
+            logger.error("Audio front-end process exited")
+            self._loop.remove_reader(self._conn.fileno())
+            return
+
+        if kind == "wakeword":
+            # A detection sent just before the detector was paused is stale
+            if self.wakeword_active and self.wakeword.callback:
+                task = asyncio.ensure_future(self.wakeword.callback())
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        elif kind == "stats":
+            cpu_percent, jitter_ms, max_jitter_ms = args
+            metrics.set_gauge("process_cpu_percent", cpu_percent, {"process": "frontend"})
+            metrics.set_gauge("audio_capture_jitter_ms", jitter_ms, {"process": "frontend"})
+            metrics.set_gauge("audio_capture_jitter_max_ms", max_jitter_ms, {"process": "frontend"})
+        elif kind == "error":
+            logger.error(f"Audio front-end process: {args[0]}")
+
+
+def run_frontend(config: Config, ring_name: str, slots: int, slot_bytes: int, conn: Connection) -> None:
+    """Entry point of the front-end process."""
+    from heisenberg.core.logging import setup_logging
+
+    setup_logging(config=config.logging)
+    try:
+        asyncio.run(_frontend_loop(config, SharedAudioRing(slots, slot_bytes, name=ring_name), conn))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _frontend_loop(config: Config, ring: SharedAudioRing, conn: Connection) -> None:
+    # Heavy imports only happen in this process
+    from heisenberg.audio.capture import PyAudioIO
+    from heisenberg.wakeword.engine import OpenWakeWordEngine
+
+    loop = asyncio.get_running_loop()
+    audio = PyAudioIO(config.audio)
+    wakeword = OpenWakeWordEngine(config.wakeword)
+    state = {"wakeword": True, "exit": asyncio.Event()}
+
+    async def on_detected():
+        conn.send(("wakeword", time.monotonic()))
+
+    wakeword.on_detected(on_detected)
+
+    async def apply(command: str, *args) -> None:
+        if command == "capture":
+            await (audio.start() if args[0] else audio.stop())
+        elif command == "wakeword":
+            state["wakeword"] = args[0]
+        elif command == "exit":
+            state["exit"].set()
+
+    def on_command() -> None:
+        try:
+            message = conn.recv()
+        except (OSError, EOFError):
+            # The main process is gone
+            state["exit"].set()
+            return
+        loop.create_task(apply(*message))
+
+    loop.add_reader(conn.fileno(), on_command)
+    await wakeword.start()
+
+    cpu = CpuSampler()
+    jitter = JitterMeter()
+    stats_interval = config.audio.frontend_stats_interval_seconds
+    next_stats = time.monotonic() + stats_interval
+    try:
+        while not state["exit"].is_set():
+            try:
+                frame = await asyncio.wait_for(audio.read_frame(), timeout=0.5)
+            except asyncio.TimeoutError:
+                jitter.reset()  # Capture paused
+                frame = None
+            now = time.monotonic()
+            if frame:
+                ring.write(frame, now)
+                jitter.observe(len(frame) / 32, now)  # 16kHz int16: 32 bytes per ms
+                if state["wakeword"]:
+                    await wakeword.feed_audio(frame)
+            if now >= next_stats:
+                next_stats = now + stats_interval
+                conn.send(("stats", cpu.sample(), jitter.jitter_ms, jitter.max_ms))
+    except Exception as e:
+        conn.send(("error", str(e)))
+        raise
+    finally:
+        loop.remove_reader(conn.fileno())
+        await wakeword.stop()
+        await audio.close()
+        ring.close()
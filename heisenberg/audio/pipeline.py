@@ -0,0 +1,188 @@
+import asyncio
+import logging
+from enum import Enum
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from heisenberg.interfaces.audio import ABCAudioIO
+from heisenberg.orchestrator.state import State
+from heisenberg.core.metrics import metrics
+from heisenberg.core.profiling import JitterMeter
+
+logger = logging.getLogger(__name__)
+
+FrameHandler = Callable[[bytes], Awaitable[None]]
+
+
+class OverflowPolicy(Enum):
+    DROP_OLDEST = "drop_oldest"  # Keep up with real time (detectors)
+    DROP_NEWEST = "drop_newest"  # Keep the start of what is queued
+
+
+class FrameConsumer:
+    """
+    One stage fed by the FrameBroadcaster: a handler running on its own task,
+    behind its own bounded queue, active only in some FSM states.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: FrameHandler,
+        states: Optional[Set[State]] = None,
+        queue_size: int = 50,
+        overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        tags: Optional[Dict[str, str]] = None,
+    ):
+        """
+        Args:
+            name: Label used in logs and metrics
+            handler: Coroutine called with each 16kHz frame, in order
+            states: FSM states in which the consumer receives frames (None = always)
+            queue_size: Frames kept while the handler is busy
+            overflow: What to drop when the queue is full
+            tags: Extra metric tags (e.g. the pipeline instance)
+        """
+        self.name = name
+        self.handler = handler
+        self.states = states
+        self.overflow = overflow
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.active = states is None
+        self.task: Optional[asyncio.Task] = None
+        self.processed = 0
+        self.dropped = 0
+        self.lag = 0  # Frames captured but not yet handled
+        self._tags = {**(tags or {}), "consumer": name}
+
+    def offer(self, sequence: int, frame: bytes) -> None:
+        if not self.active:
+            return
+        if self.queue.full():
+            self.dropped += 1
+            metrics.increment("audio_frames_dropped", self._tags)
+            if self.overflow == OverflowPolicy.DROP_NEWEST:
+                return
+            self.queue.get_nowait()
+            self.queue.task_done()
+        self.queue.put_nowait((sequence, frame))
+
+    def set_active(self, active: bool) -> None:
+        if active == self.active:
+            return
+        self.active = active
+        if not active:
+            # Frames queued for a state we left are stale
+            while not self.queue.empty():
+                self.queue.get_nowait()
+                self.queue.task_done()
+            self.lag = 0
+            metrics.set_gauge("audio_consumer_lag", 0, self._tags)
+        logger.debug(f"Audio consumer {self.name} {'activated' if active else 'paused'}")
+
+    async def run(self, broadcaster: "FrameBroadcaster") -> None:
+        while True:
+            sequence, frame = await self.queue.get()
+            try:
+                await self.handler(frame)
+            except Exception as e:
+                logger.error(f"Audio consumer {self.name} failed on a frame: {e}", exc_info=True)
+            finally:
+                self.queue.task_done()
+            self.processed += 1
+            self.lag = broadcaster.sequence - sequence
+            metrics.set_gauge("audio_consumer_lag", self.lag, self._tags)
+
+
+class FrameBroadcaster:
+    """
+    Fan-out of captured audio to independent consumers.
+
+    A single reader task takes frames from the audio source and offers each
+    one to every active consumer's queue without waiting for any of them,
+    so a slow stage (e.g. a wakeword inference spike) only falls behind on
+    its own frames, within the bounds of its queue and overflow policy.
+    Consumers are switched on and off by FSM state through `set_state`
+    (hooked to FSM transitions by `bind`). Each consumer's lag, in frames
+    behind the latest capture, is exported as the `audio_consumer_lag` gauge,
+    and the regularity of frame arrivals as `audio_frame_jitter_ms`.
+    """
+
+    def __init__(self, source: ABCAudioIO, tags: Optional[Dict[str, str]] = None):
+        self.source = source
+        self.tags = dict(tags or {})  # Added to every metric (e.g. the pipeline instance)
+        self.consumers: List[FrameConsumer] = []
+        self.sequence = 0  # Frames read so far
+        self.state: Optional[State] = None
+        self.jitter = JitterMeter()
+        self._running = False
+
+    def add_consumer(
+        self,
+        name: str,
+        handler: FrameHandler,
+        states: Optional[Iterable[State]] = None,
+        queue_size: int = 50,
+        overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+    ) -> FrameConsumer:
+        consumer = FrameConsumer(
+            name, handler, set(states) if states is not None else None, queue_size, overflow, self.tags
+        )
+        if self.state is not None and consumer.states is not None:
+            consumer.active = self.state in consumer.states
+        self.consumers.append(consumer)
+        if self._running:
+            consumer.task = asyncio.create_task(consumer.run(self))
+        return consumer
+
+    def set_state(self, state: State) -> None:
+        self.state = state
+        for consumer in self.consumers:
+            if consumer.states is not None:
+                consumer.set_active(state in consumer.states)
+
+    def bind(self, fsm) -> None:
+        """Follow the FSM: consumers are (de)activated on every transition."""
+
+        async def on_enter(old_state: State, new_state: State) -> None:
+            self.set_state(new_state)
+
+        for state in State:
+            fsm.on_enter(state, on_enter)
+        self.set_state(fsm.state)
+
+    def publish(self, frame: bytes) -> None:
+        """Hand one frame to every active consumer (never waits)."""
+        self.sequence += 1
+        self.jitter.observe(len(frame) / 32)  # 16kHz int16: 32 bytes per ms
+        metrics.set_gauge("audio_frame_jitter_ms", self.jitter.jitter_ms, self.tags)
+        for consumer in self.consumers:
+            consumer.offer(self.sequence, frame)
+
+    async def run(self) -> None:
+        """Read the source until stop(), feeding the consumers."""
+        self._running = True
+        for consumer in self.consumers:
+            if consumer.task is None or consumer.task.done():
+                consumer.task = asyncio.create_task(consumer.run(self))
+        try:
+            while self._running:
+                frame = await self.source.read_frame()
+                if frame:
+                    self.publish(frame)
+                else:
+                    await asyncio.sleep(0.01)
+        finally:
+            await self.stop()
+
+    async def join(self) -> None:
+        """Wait until every queued frame has been handled."""
+        await asyncio.gather(*(consumer.queue.join() for consumer in self.consumers))
+
+    async def stop(self) -> None:
+        self._running = False
+        tasks = [consumer.task for consumer in self.consumers if consumer.task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for consumer in self.consumers:
+            consumer.task = None
@@ -1,3 +1,4 @@
+import copy
 import logging
 import torch
 import numpy as np
@@ -33,6 +34,20 @@ class SileroVADEngine:
 
         self._reset()
 
+    def fork(self) -> "SileroVADEngine":
+        """
+        Engine for another audio stream, without loading the model again.
+
+        The Silero module carries its recurrent state between calls, so each
+        stream gets its own copy of the (small) loaded model.
+        """
+        engine = object.__new__(type(self))
+        engine.config = self.config
+        engine.model = copy.deepcopy(self.model) if self.model is not None else None
+        engine._utils = self._utils
+        engine._reset()
+        return engine
+
     def _reset(self):
         self._is_speaking = False
         self._silence_frames = 0
@@ -0,0 +1,68 @@
+import asyncio
+import logging
+import time
+import wave
+from typing import List, Optional
+
+from heisenberg.interfaces.audio import ABCAudioIO
+from heisenberg.core.exceptions import AudioError
+
+logger = logging.getLogger(__name__)
+
+
+class WavFileAudioIO(ABCAudioIO):
+    """
+    Audio device replaying a 16kHz mono WAV file as its microphone.
+
+    Frames are delivered at the file's real-time pace (or as fast as they
+    are read with `realtime=False`), then `read_frame` returns None. Played
+    frames are kept in `played`, so tests and satellites can run without
+    any sound hardware.
+    """
+
+    def __init__(self, path: str, frame_ms: int = 80, realtime: bool = True, loop: bool = False):
+        with wave.open(path, "rb") as wav:
+            if wav.getframerate() != 16000 or wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+                raise AudioError(f"{path}: expected 16kHz mono 16-bit audio")
+            self.pcm = wav.readframes(wav.getnframes())
+        self.frame_bytes = 16000 * frame_ms // 1000 * 2
+        self.frame_ms = frame_ms
+        self.realtime = realtime
+        self.loop = loop
+        self.played: List[bytes] = []
+        self._offset = 0
+        self._running = False
+        self._next_at = 0.0
+
+    @property
+    def finished(self) -> bool:
+        return not self.loop and self._offset >= len(self.pcm)
+
+    async def start(self) -> None:
+        self._running = True
+        self._next_at = time.monotonic()
+
+    async def stop(self) -> None:
+        self._running = False
+
+    async def close(self) -> None:
+        self._running = False
+
+    async def read_frame(self) -> Optional[bytes]:
+        if not self._running or not self.pcm:
+            await asyncio.sleep(self.frame_ms / 1000)
+            return None
+        if self._offset >= len(self.pcm):
+            if not self.loop:
+                await asyncio.sleep(self.frame_ms / 1000)
+                return None
+            self._offset = 0
+        if self.realtime:
+            self._next_at += self.frame_ms / 1000
+            await asyncio.sleep(max(0.0, self._next_at - time.monotonic()))
+        frame = self.pcm[self._offset:self._offset + self.frame_bytes]
+        self._offset += len(frame)
+        return frame
+
+    async def play_frame(self, frame: bytes) -> None:
+        self.played.append(frame)
@@ -3,7 +3,22 @@ from dataclasses import dataclass, field
 @dataclass
 class LoggingConfig:
     level: str = "INFO"
-    format: str = "json"
+    format: str = "json"  # json | text
+    queue_size: int = 10000  # Records waiting for the writer thread before new ones are dropped
+    debug_rate_limit_per_second: float = 50.0  # DEBUG records per module and second (0 = unlimited)
+    debug_rate_limit_burst: int = 100
+
+@dataclass
+class TracingConfig:
+    export: str = ""  # jsonl | chrome (trace-event format) | "" = stage latencies only
+    path: str = "traces/turns.jsonl"
+    max_open_traces: int = 32  # Unfinished turns kept before the oldest is dropped
+
+@dataclass
+class MetricsConfig:
+    enabled: bool = False  # Serve /metrics (Prometheus), /healthz and /readyz
+    host: str = "127.0.0.1"
+    port: int = 9464
 
 @dataclass
 class AudioConfig:
@@ -12,6 +27,10 @@ class AudioConfig:
     sample_rate: int = 16000
     channels: int = 1
     chunk_size: int = 1280
+    consumer_queue_frames: int = 50  # Frames each pipeline stage may fall behind before dropping
+    frontend_process: bool = False  # Capture and wakeword detection in a separate process
+    frontend_ring_slots: int = 32  # Frames in the shared-memory ring between the two processes
+    frontend_stats_interval_seconds: float = 5.0  # CPU and jitter reporting period (both processes)
 
 @dataclass
 class WakewordConfig:
@@ -27,6 +46,9 @@ class STTConfig:
     sampling_strategy: int = 1 # 0: GREEDY, 1: BEAM_SEARCH
     initial_prompt: str = "Bonjour, je suis ton assistant Heisenberg."
     debug_dump: bool = False 
+    thread_budget: int = 4 # Total CPU threads the shared STTService may use across decodes
+    partial_interval_ms: int = 0 # Emit a partial transcript every N ms of audio (0 = disabled)
+    context_per_worker: bool = False # One Whisper context per STTService worker: parallel decodes, one model copy in RAM each
 
 @dataclass
 class VADConfig:
@@ -38,6 +60,9 @@ class VADConfig:
 @dataclass
 class LLMConfig:
     endpoint: str = "http://localhost:8080/completion"
+    endpoints: list[str] = field(default_factory=list)  # Extra llama.cpp servers for failover and load spreading
+    health_check_interval_seconds: float = 5.0  # /health and /slots probe period (with several endpoints)
+    hedge_after_ms: float = 0.0  # Also send the request to another endpoint if no token arrived by then (0 = off)
     model_name: str = "LFM2-350M"
     temperature: float = 0.7
     max_tokens: int = 512
@@ -47,15 +72,89 @@ class LLMConfig:
     timeout_seconds: int = 30
     system_prompt: str = "Tu es Heisenberg, un assistant vocal intelligent et serviable. Réponds de manière concise et naturelle."
     max_history_turns: int = 5  # Number of conversation turns to keep in context
+    max_prompt_tokens: int = 0  # Token budget for the whole prompt, counted by /tokenize (0 = no limit)
+    prompt_query_reserve_tokens: int = 64  # Part of the budget set aside for the current query
+    compact_turn_words: int = 24  # Old turns over budget are shortened to this many words before being dropped
+    unix_socket: str = ""  # Path to a co-located llama.cpp server socket (empty = TCP)
+    pool_size: int = 4  # Max pooled keep-alive connections to the server
+    keepalive_seconds: float = 60.0  # Idle time before a pooled connection is closed
+    cache_prompt: bool = True  # Let llama.cpp reuse the KV cache of the common prompt prefix
+    n_slots: int = 1  # Server slots (llama-server --parallel); each session is pinned to one
+    slot_persist: bool = False  # Save/restore slot KV state (needs llama-server --slot-save-path)
+    slot_file_prefix: str = "heisenberg"  # Slot state files are named <prefix>-slot<N>.bin
+    stop_sequences: list[str] = field(
+        default_factory=lambda: ["User:", "user:", "Assistant:", "<|im_end|>", "<|im_start|>", "</s>"]
+    )  # Matched by the server and, across token boundaries, by the client
+    max_sentences: int = 0  # Stop spoken answers after N sentences (0 = unlimited)
+    response_cache_enabled: bool = False  # Replay complete answers to repeated queries
+    response_cache_max_entries: int = 256
+    response_cache_max_bytes: int = 1_000_000
+    response_cache_ttl_seconds: float = 3600.0
+    response_cache_use_history: bool = True  # Key on the conversation history too (False = query only)
+    response_cache_path: str = ""  # JSON file to persist the cache across restarts (empty = memory only)
+
+@dataclass
+class TTSConfig:
+    enabled: bool = False  # When disabled, playback is only simulated
+    engine: str = "piper"
+    voice: str = "fr_FR-siwis-medium"
+    voices_dir: str = "models/piper"  # Holds <voice>.onnx and <voice>.onnx.json
+    voice_memory_budget_mb: int = 300  # Loaded voices beyond this are evicted, least recently used first
+    preload_voice: bool = True  # Load the default voice in the background at startup
+    length_scale: float = 1.0  # > 1 speaks slower
+    frame_ms: int = 20  # Playback frame size; stop() takes effect within one frame
+    cache_enabled: bool = True  # Replay phrases already synthesized from disk
+    cache_dir: str = "cache/tts"
+    cache_max_bytes: int = 50_000_000
+    prewarm_phrases: list[str] = field(default_factory=lambda: ["Oui ?"])  # Synthesized into the cache at startup
+    first_chunk_chars: int = 20  # The first chunk may end at a clause once this long (fast first audio)
+    min_chunk_chars: int = 80  # Later chunks group whole sentences up to this length (better prosody)
+    max_chunk_chars: int = 200  # Hard cap; longer sentences are split at a clause or a space
+
+@dataclass
+class IntentConfig:
+    enabled: bool = True
+    min_confidence: float = 0.8  # Below this, the utterance falls through to the LLM
+    max_keyword_words: int = 8  # Longer utterances skip keyword matching (likely real questions)
+
+@dataclass
+class DeviceConfig:
+    name: str = "default"  # Instance label, used in logs and metric tags
+    input_device_index: int = -1
+    output_device_index: int = -1
+    voice: str = ""  # TTS voice for this room (empty = tts.voice)
+
+@dataclass
+class SatelliteConfig:
+    # Server side: accept remote satellites, one assistant pipeline each
+    enabled: bool = False
+    host: str = "0.0.0.0"
+    port: int = 10700
+    # Satellite side
+    server_url: str = "ws://127.0.0.1:10700/satellite"
+    name: str = ""  # Pipeline name on the server (hostname if empty)
+    codec: str = "pcm16"  # pcm16 | ulaw (8-bit, half the bandwidth)
+    # Both
+    heartbeat_seconds: float = 5.0  # A peer silent for twice this long is dropped
+    queue_frames: int = 200  # Received capture frames kept before dropping the oldest
+    playout_prebuffer_ms: int = 60  # Audio gathered before playback starts (absorbs network jitter)
+    playout_lead_ms: int = 200  # How far the server sends TTS audio ahead of real time
+    reconnect_max_seconds: float = 10.0  # Backoff ceiling between connection attempts
 
 @dataclass
 class Config:
     logging: LoggingConfig = field(default_factory=LoggingConfig)
+    tracing: TracingConfig = field(default_factory=TracingConfig)
+    metrics: MetricsConfig = field(default_factory=MetricsConfig)
     audio: AudioConfig = field(default_factory=AudioConfig)
     wakeword: WakewordConfig = field(default_factory=WakewordConfig)
     stt: STTConfig = field(default_factory=STTConfig)
     vad: VADConfig = field(default_factory=VADConfig)
     llm: LLMConfig = field(default_factory=LLMConfig)
+    tts: TTSConfig = field(default_factory=TTSConfig)
+    intents: IntentConfig = field(default_factory=IntentConfig)
+    devices: list[DeviceConfig] = field(default_factory=list)  # One assistant pipeline each (empty = [audio] devices)
+    satellite: SatelliteConfig = field(default_factory=SatelliteConfig)
     
     @classmethod
     def load(cls) -> "Config":
@@ -1,13 +1,24 @@
+import atexit
+import copy
 import logging
+import logging.handlers
+import queue
 import sys
-import json
+import threading
 import time
 from typing import Any, Dict, Optional
 from contextvars import ContextVar
 
+from heisenberg.core import serialization
+from heisenberg.core.config import LoggingConfig
+from heisenberg.core.metrics import metrics
+
 # Context var for correlation ID
 _correlation_id: ContextVar[Optional[str]] = ContextVar("correlation_id", default=None)
 
+# Attributes every LogRecord has; anything else was passed with `extra=`
+_RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime", "correlation_id"}
+
 class StructuredFormatter(logging.Formatter):
     def format(self, record: logging.LogRecord) -> str:
         log_record: Dict[str, Any] = {
@@ -15,25 +26,148 @@ class StructuredFormatter(logging.Formatter):
             "level": record.levelname,
             "module": record.name,
             "message": record.getMessage(),
-            "correlation_id": _correlation_id.get(),
+            "correlation_id": getattr(record, "correlation_id", None) or _correlation_id.get(),
         }
-        
-        # Add extra fields if they exist
-        if hasattr(record, "extra"):
-             log_record.update(record.extra) # type: ignore
 
+        # Fields passed with extra=
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                log_record[key] = value
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            log_record["exception"] = record.exc_text
+
+        return serialization.dumps(log_record)
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for a terminal, with the correlation id when there is one."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        correlation_id = getattr(record, "correlation_id", None) or _correlation_id.get()
+        return f"[{correlation_id}] {line}" if correlation_id else line
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per logger for records at or below `max_level`.
+
+    Each module may emit `burst` such records at once and `rate` per second
+    on average; the rest are dropped, and the next record that gets through
+    says how many were (`suppressed`). Keeps DEBUG usable on hot paths
+    (per-frame audio, per-token LLM) without flooding the log.
+    """
+
+    def __init__(self, rate: float, burst: int, max_level: int = logging.DEBUG):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.max_level = max_level
+        self._buckets: Dict[str, list] = {}  # Logger name -> [tokens, last refill, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0 or record.levelno > self.max_level:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(record.name)
+            if bucket is None:
+                bucket = self._buckets[record.name] = [float(self.burst), now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            suppressed, bucket[2] = bucket[2], 0
+        if suppressed:
+            record.suppressed = suppressed
+            metrics.increment("log_records_rate_limited", {"module": record.name}, suppressed)
+        return True
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the listener thread without blocking the caller.
+
+    The message, exception text and correlation id are resolved here (the
+    listener runs in another thread and context); JSON encoding and the
+    write happen there. When the bounded queue is full the record is
+    dropped and counted rather than waiting for the writer.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
         if record.exc_info:
-            log_record["exception"] = self.formatException(record.exc_info)
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if getattr(record, "correlation_id", None) is None:
+            record.correlation_id = _correlation_id.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            metrics.increment("log_records_dropped", {"level": record.levelname})
+
+class _QueueListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # The queue may be full at shutdown: wait for the writer rather than fail
+        self.queue.put(self._sentinel)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional[NonBlockingQueueHandler] = None
 
-        return json.dumps(log_record)
+def setup_logging(level: str = "INFO", config: Optional[LoggingConfig] = None):
+    """
+    Route all logging through a bounded queue to a writer thread.
+
+    Logging calls on the event loop, audio callbacks and worker threads
+    only copy the record into the queue; formatting and the stdout write
+    happen on the listener thread. Calling it again replaces the previous
+    setup.
+    """
+    global _listener, _handler
+    config = config or LoggingConfig(level=level)
+    shutdown_logging()
 
-def setup_logging(level: str = "INFO"):
     root = logging.getLogger()
-    root.setLevel(level)
-    
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(StructuredFormatter(datefmt="%Y-%m-%dT%H:%M:%S%z"))
-    root.addHandler(handler)
+    root.setLevel(config.level)
+
+    stream = logging.StreamHandler(sys.stdout)
+    if config.format == "text":
+        stream.setFormatter(TextFormatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    else:
+        stream.setFormatter(StructuredFormatter(datefmt="%Y-%m-%dT%H:%M:%S%z"))
+
+    _handler = NonBlockingQueueHandler(queue.Queue(maxsize=config.queue_size))
+    if config.debug_rate_limit_per_second > 0:
+        _handler.addFilter(RateLimitFilter(config.debug_rate_limit_per_second, config.debug_rate_limit_burst))
+    root.addHandler(_handler)
+
+    _listener = _QueueListener(_handler.queue, stream, respect_handler_level=True)
+    _listener.start()
+
+def shutdown_logging():
+    """Write out what is still queued and stop the listener thread."""
+    global _listener, _handler
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(shutdown_logging)
 
 def set_correlation_id(cid: str):
     _correlation_id.set(cid)
@@ -0,0 +1,79 @@
+import logging
+from typing import Callable, Dict, Optional
+
+from aiohttp import web
+
+from heisenberg.core.config import MetricsConfig
+from heisenberg.core.metrics import MetricsRegistry, metrics
+
+logger = logging.getLogger(__name__)
+
+ReadinessCheck = Callable[[], bool]
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsServer:
+    """
+    Local HTTP endpoint for scrapers and supervisors.
+
+    - `/metrics`: the registry in the Prometheus text format
+    - `/healthz`: 200 as long as the event loop answers
+    - `/readyz`: 200 once every readiness check passes, 503 otherwise,
+      with the result of each check as JSON
+
+    Checks are plain callables run on the event loop; they must be cheap
+    (read a flag, not probe a server).
+    """
+
+    def __init__(self, config: MetricsConfig, registry: MetricsRegistry = metrics):
+        self.config = config
+        self.registry = registry
+        self.checks: Dict[str, ReadinessCheck] = {}
+        self.app = web.Application()
+        self.app.router.add_get("/metrics", self.handle_metrics)
+        self.app.router.add_get("/healthz", self.handle_health)
+        self.app.router.add_get("/readyz", self.handle_ready)
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def port(self) -> int:
+        """Listening port (useful when started on port 0)."""
+        return self._runner.addresses[0][1]
+
+    def add_readiness_check(self, name: str, check: ReadinessCheck) -> None:
+        self.checks[name] = check
+
+    def readiness(self) -> Dict[str, bool]:
+        results = {}
+        for name, check in self.checks.items():
+            try:
+                results[name] = bool(check())
+            except Exception as e:
+                logger.warning(f"Readiness check {name} failed: {e}")
+                results[name] = False
+        return results
+
+    async def start(self) -> None:
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.config.host, self.config.port).start()
+        logger.info(f"Metrics server listening on http://{self.config.host}:{self.port}/metrics")
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        # Cost grows with the number of series, not of samples recorded
+        body = self.registry.render_prometheus().encode()
+        return web.Response(body=body, headers={"Content-Type": CONTENT_TYPE})
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        return web.json_response({"status": "ok"})
+
+    async def handle_ready(self, request: web.Request) -> web.Response:
+        checks = self.readiness()
+        ready = all(checks.values())
+        return web.json_response({"ready": ready, "checks": checks}, status=200 if ready else 503)
@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+from heisenberg.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class JitterMeter:
+    """
+    Arrival jitter of a periodic stream (e.g. audio frames).
+
+    Jitter is the deviation of each inter-arrival time from the expected
+    period, smoothed like RTP's interarrival jitter (RFC 3550, gain 1/16);
+    the worst deviation seen is kept as well.
+    """
+
+    def __init__(self, gain: float = 1 / 16):
+        self.gain = gain
+        self.jitter_ms = 0.0
+        self.max_ms = 0.0
+        self.count = 0
+        self._last: Optional[float] = None
+
+    def observe(self, period_ms: float, now: Optional[float] = None) -> float:
+        """Record an arrival expected `period_ms` after the previous one; returns the current jitter."""
+        now = time.monotonic() if now is None else now
+        if self._last is not None:
+            deviation = abs((now - self._last) * 1000 - period_ms)
+            self.jitter_ms += (deviation - self.jitter_ms) * self.gain
+            self.max_ms = max(self.max_ms, deviation)
+        self._last = now
+        self.count += 1
+        return self.jitter_ms
+
+    def reset(self) -> None:
+        """Forget the last arrival (the stream was paused)."""
+        self._last = None
+
+
+class CpuSampler:
+    """CPU used by this process (all threads), as a percentage of one core between samples."""
+
+    def __init__(self):
+        self._cpu = time.process_time()
+        self._wall = time.monotonic()
+
+    def sample(self) -> float:
+        cpu, wall = time.process_time(), time.monotonic()
+        elapsed = wall - self._wall
+        percent = (cpu - self._cpu) / elapsed * 100 if elapsed > 0 else 0.0
+        self._cpu, self._wall = cpu, wall
+        return percent
+
+
+class ProcessMonitor:
+    """Periodically exports this process's CPU usage as the `process_cpu_percent` gauge."""
+
+    def __init__(self, process: str = "main", interval: float = 5.0):
+        self.tags: Dict[str, str] = {"process": process}
+        self.interval = interval
+        self.sampler = CpuSampler()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            percent = self.sampler.sample()
+            metrics.set_gauge("process_cpu_percent", percent, self.tags)
+            logger.debug(f"CPU ({self.tags['process']}): {percent:.1f}%")
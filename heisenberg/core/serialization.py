@@ -0,0 +1,26 @@
+import json
+from typing import Any
+
+# Try to import orjson for faster JSON encoding/decoding, fall back to the stdlib
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def loads(data: bytes | str) -> Any:
+    """Decode JSON from bytes or str (orjson when available)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> str:
+    """Encode an object to a JSON string (orjson when available)."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str).decode("utf-8")
+    return json.dumps(obj, default=str, ensure_ascii=False)
+
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so one except clause covers both
+DecodeError = json.JSONDecodeError
@@ -0,0 +1,15 @@
+import re
+import unicodedata
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Canonical form of an utterance for matching and cache keys:
+    lowercase, accents removed, punctuation/apostrophes/hyphens turned into
+    single spaces. "Quelle heure est-il ?" -> "quelle heure est il".
+    """
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_WORD.sub(" ", stripped).strip()
@@ -0,0 +1,260 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Protocol
+
+from heisenberg.core.config import TracingConfig
+from heisenberg.core.logging import get_correlation_id
+from heisenberg.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Milestones of a voice turn, in order; the time between consecutive ones is
+# recorded as the `turn_stage` latency (tagged with the later stage)
+TURN_STAGES = ["wakeword", "speech_end", "stt_done", "llm_first_token", "tts_first_audio", "playback_end"]
+
+
+@dataclass
+class Span:
+    name: str
+    start: float  # time.perf_counter()
+    end: float
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end - self.start) * 1000
+
+
+@dataclass
+class Trace:
+    """Spans and milestones of one turn, tied together by its correlation id."""
+    correlation_id: str
+    name: str = "turn"
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    start: float = field(default_factory=time.perf_counter)
+    start_wall: float = field(default_factory=time.time)
+    end: Optional[float] = None
+    spans: List[Span] = field(default_factory=list)
+    marks: Dict[str, float] = field(default_factory=dict)  # Milestone -> time.perf_counter()
+
+    def mark(self, name: str, at: Optional[float] = None) -> bool:
+        """Record a milestone; only its first occurrence counts. Returns True if recorded."""
+        if name in self.marks:
+            return False
+        self.marks[name] = time.perf_counter() if at is None else at
+        return True
+
+    def add_span(self, name: str, start: float, end: float, **attributes: Any) -> Span:
+        span = Span(name, start, end, attributes)
+        self.spans.append(span)
+        return span
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end or time.perf_counter()) - self.start) * 1000
+
+    def offset_ms(self, at: float) -> float:
+        return (at - self.start) * 1000
+
+    def stages(self) -> Dict[str, float]:
+        """Milliseconds spent reaching each TURN_STAGES milestone from the previous one reached."""
+        stages = {}
+        previous = None
+        for stage in TURN_STAGES:
+            at = self.marks.get(stage)
+            if at is None:
+                continue
+            if previous is not None:
+                stages[stage] = (at - previous) * 1000
+            previous = at
+        return stages
+
+
+class TraceExporter(Protocol):
+    def export(self, trace: Trace) -> None: ...
+
+
+class JsonlTraceExporter:
+    """One JSON object per turn and line, with offsets in milliseconds from the turn start."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def export(self, trace: Trace) -> None:
+        record = {
+            "correlation_id": trace.correlation_id,
+            "name": trace.name,
+            "timestamp": trace.start_wall,
+            "duration_ms": round(trace.duration_ms, 3),
+            "attributes": trace.attributes,
+            "marks": {name: round(trace.offset_ms(at), 3) for name, at in trace.marks.items()},
+            "stages": {name: round(ms, 3) for name, ms in trace.stages().items()},
+            "spans": [
+                {
+                    "name": span.name,
+                    "start_ms": round(trace.offset_ms(span.start), 3),
+                    "duration_ms": round(span.duration_ms, 3),
+                    "attributes": span.attributes,
+                }
+                for span in trace.spans
+            ],
+        }
+        line = json.dumps(record, default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class ChromeTraceExporter:
+    """
+    Chrome trace-event format (chrome://tracing, Perfetto).
+
+    Events are appended to a JSON array left open, which both viewers
+    accept, so the file stays valid while the assistant runs. Each pipeline
+    instance gets its own track.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.pid = os.getpid()
+        self._tids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("[\n")
+
+    def export(self, trace: Trace) -> None:
+        track = str(trace.attributes.get("instance", trace.name))
+        events = []
+        with self._lock:
+            tid = self._tids.get(track)
+            if tid is None:
+                tid = self._tids[track] = len(self._tids) + 1
+                events.append({"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": track}})
+        common = {"pid": self.pid, "tid": tid, "cat": trace.name}
+        args = {"correlation_id": trace.correlation_id, **trace.attributes}
+        events.append({
+            "name": trace.name, "ph": "X", "ts": _us(trace.start), "dur": trace.duration_ms * 1000,
+            "args": args, **common,
+        })
+        for span in trace.spans:
+            events.append({
+                "name": span.name, "ph": "X", "ts": _us(span.start), "dur": span.duration_ms * 1000,
+                "args": {"correlation_id": trace.correlation_id, **span.attributes}, **common,
+            })
+        for name, at in trace.marks.items():
+            events.append({"name": name, "ph": "i", "s": "t", "ts": _us(at), "args": args, **common})
+        data = "".join(json.dumps(event, default=str) + ",\n" for event in events)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(data)
+
+
+def _us(perf_counter: float) -> float:
+    return perf_counter * 1_000_000
+
+
+class Tracer:
+    """
+    Registry of the turns in progress, keyed by correlation id.
+
+    Stages add milestones and spans to the turn of the correlation id active
+    in their context (the router and the STT service propagate it), or of
+    an explicit one; without a turn in progress they are no-ops. Finished
+    turns record their `turn_stage` latencies and go to the exporters.
+    """
+
+    def __init__(self, max_open: int = 64):
+        self.max_open = max_open
+        self.exporters: List[TraceExporter] = []
+        self._open: Dict[str, Trace] = {}
+        self._lock = threading.Lock()  # Spans may be recorded from worker threads
+
+    def add_exporter(self, exporter: TraceExporter) -> None:
+        self.exporters.append(exporter)
+
+    def start(self, correlation_id: str, name: str = "turn", **attributes: Any) -> Trace:
+        trace = Trace(correlation_id, name, attributes)
+        with self._lock:
+            if len(self._open) >= self.max_open:
+                # Turns that never finished (e.g. a lost satellite) must not pile up
+                oldest = next(iter(self._open))
+                del self._open[oldest]
+                logger.debug(f"Dropping unfinished trace {oldest}")
+            self._open[correlation_id] = trace
+        return trace
+
+    def get(self, correlation_id: Optional[str] = None) -> Optional[Trace]:
+        correlation_id = correlation_id or get_correlation_id()
+        if correlation_id is None:
+            return None
+        return self._open.get(correlation_id)
+
+    def mark(self, name: str, correlation_id: Optional[str] = None, at: Optional[float] = None) -> bool:
+        trace = self.get(correlation_id)
+        return trace.mark(name, at) if trace is not None else False
+
+    def record_span(
+        self, name: str, start: float, end: float, correlation_id: Optional[str] = None, **attributes: Any
+    ) -> Optional[Span]:
+        trace = self.get(correlation_id)
+        if trace is None:
+            return None
+        with self._lock:
+            return trace.add_span(name, start, end, **attributes)
+
+    @contextmanager
+    def span(self, name: str, correlation_id: Optional[str] = None, **attributes: Any) -> Iterator[Dict[str, Any]]:
+        """Time the enclosed block; the yielded dict adds attributes to the span."""
+        correlation_id = correlation_id or get_correlation_id()
+        start = time.perf_counter()
+        try:
+            yield attributes
+        finally:
+            self.record_span(name, start, time.perf_counter(), correlation_id, **attributes)
+
+    def finish(self, correlation_id: Optional[str] = None, **attributes: Any) -> Optional[Trace]:
+        """End a turn, record its stage latencies and export it."""
+        correlation_id = correlation_id or get_correlation_id()
+        with self._lock:
+            trace = self._open.pop(correlation_id, None) if correlation_id else None
+        if trace is None:
+            return None
+        trace.end = time.perf_counter()
+        trace.attributes.update(attributes)
+
+        tags = {k: str(v) for k, v in trace.attributes.items() if k == "instance"}
+        for stage, ms in trace.stages().items():
+            metrics.record_latency("turn_stage", ms, {**tags, "stage": stage})
+        metrics.record_latency("turn_total", trace.duration_ms, tags)
+        logger.info(
+            f"Turn {trace.correlation_id} finished in {trace.duration_ms:.0f}ms: "
+            + ", ".join(f"{stage} +{ms:.0f}ms" for stage, ms in trace.stages().items()),
+            extra={"stages": trace.stages()},
+        )
+        for exporter in self.exporters:
+            try:
+                exporter.export(trace)
+            except Exception as e:
+                logger.error(f"Trace export failed: {e}")
+        return trace
+
+
+def configure_tracing(config: TracingConfig) -> None:
+    """Attach the exporter selected in `TracingConfig` to the global tracer."""
+    tracer.max_open = config.max_open_traces
+    if config.export == "jsonl":
+        tracer.add_exporter(JsonlTraceExporter(config.path))
+    elif config.export == "chrome":
+        tracer.add_exporter(ChromeTraceExporter(config.path))
+    elif config.export:
+        logger.warning(f"Unknown trace export format '{config.export}', traces are not exported")
+
+
+tracer = Tracer()
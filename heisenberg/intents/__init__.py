@@ -0,0 +1,30 @@
+"""
+Intents Module - Heisenberg
+
+Local fast-path answering frequent commands without the LLM.
+
+Main Components:
+- IntentRouter: Normalized exact-match + pattern/keyword classifier with pluggable handlers
+- register_builtin_intents: Time, date and stop/cancel commands in French
+
+Example Usage:
+    from heisenberg.intents import IntentRouter, register_builtin_intents
+
+    intents = IntentRouter(config.intents)
+    register_builtin_intents(intents)
+    intents.register("lights_on", turn_on_lights, phrases=["allume la lumière"])
+
+    result = await intents.handle(transcript)
+    if result is None:
+        ...  # Fall through to the LLM
+"""
+
+from heisenberg.intents.router import IntentRouter, IntentMatch, IntentResult
+from heisenberg.intents.builtin import register_builtin_intents
+
+__all__ = [
+    "IntentRouter",
+    "IntentMatch",
+    "IntentResult",
+    "register_builtin_intents",
+]
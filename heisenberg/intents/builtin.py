@@ -0,0 +1,58 @@
+from datetime import datetime
+from typing import Callable
+
+from heisenberg.intents.router import IntentRouter
+
+DAYS = ["lundi", "mardi", "mercredi", "jeudi", "vendredi", "samedi", "dimanche"]
+MONTHS = [
+    "janvier", "février", "mars", "avril", "mai", "juin",
+    "juillet", "août", "septembre", "octobre", "novembre", "décembre",
+]
+
+
+def say_time(now: datetime) -> str:
+    """French spoken time: "Il est 15 h 05.", "Il est 1 heure."."""
+    if now.minute == 0:
+        return f"Il est {now.hour} heure{'s' if now.hour > 1 else ''}."
+    return f"Il est {now.hour} h {now.minute:02d}."
+
+
+def say_date(now: datetime) -> str:
+    """French spoken date: "Nous sommes le lundi 1er juin 2026."."""
+    day = "1er" if now.day == 1 else str(now.day)
+    return f"Nous sommes le {DAYS[now.weekday()]} {day} {MONTHS[now.month - 1]} {now.year}."
+
+
+def register_builtin_intents(router: IntentRouter, clock: Callable[[], datetime] = datetime.now) -> None:
+    """
+    Register the frequent French commands answered without the LLM.
+
+    Args:
+        router: Router to populate
+        clock: Time source (injectable for tests)
+    """
+    router.register(
+        "time",
+        lambda match: say_time(clock()),
+        phrases=["quelle heure est-il", "il est quelle heure", "quelle heure il est"],
+        patterns=[r"^(?:dis moi |tu peux me dire |tu sais )?(?:quelle heure (?:est il|il est)|il est quelle heure)(?: s il te plait| stp)?$"],
+    )
+    router.register(
+        "date",
+        lambda match: say_date(clock()),
+        phrases=[
+            "quel jour sommes-nous", "on est quel jour", "quel jour on est",
+            "quelle est la date", "quelle date sommes-nous", "on est le combien",
+            "quelle est la date d'aujourd'hui",
+        ],
+    )
+
+    # Nothing is said back: the turn ends silently and the assistant returns to
+    # waiting for the wakeword. Only whole-utterance commands match, so a question
+    # that merely mentions "stop" still goes to the LLM.
+    router.register(
+        "stop",
+        lambda match: "",
+        phrases=["arrête-toi", "laisse tomber", "c'est bon", "merci c'est tout"],
+        patterns=[r"^(?:stop|arrete|tais toi|annule)(?: (?:stop|arrete|tais toi|annule))*$"],
+    )
@@ -0,0 +1,173 @@
+import inspect
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+from heisenberg.core.config import IntentConfig
+from heisenberg.core.metrics import metrics
+from heisenberg.core.text import normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IntentMatch:
+    """What the classifier recognized in an utterance."""
+    intent: str
+    text: str  # Original transcript
+    normalized: str
+    confidence: float
+    groups: Dict[str, str] = field(default_factory=dict)  # Named regex groups, if any
+
+
+@dataclass
+class IntentResult:
+    """Outcome of a handled intent: the text to speak ("" = say nothing)."""
+    match: IntentMatch
+    response: str
+    latency_ms: float
+
+
+IntentHandler = Callable[[IntentMatch], Union[str, Awaitable[str]]]
+
+
+@dataclass
+class Intent:
+    name: str
+    handler: IntentHandler
+    phrases: List[str] = field(default_factory=list)  # Exact utterances (normalized on registration)
+    patterns: List[re.Pattern] = field(default_factory=list)  # Regexes over the normalized text
+    keywords: List[str] = field(default_factory=list)  # Bag of normalized words
+
+
+class IntentRouter:
+    """
+    Local fast-path between TRANSCRIPTION_FINAL and the LLM.
+
+    Utterances are normalized, then classified in three cheap tiers:
+    exact phrase lookup (confidence 1.0), regex patterns (0.9), then keyword
+    overlap for short utterances. Confident matches are answered by their
+    handler in microseconds; anything else returns None and falls through
+    to the LLM.
+    """
+
+    PATTERN_CONFIDENCE = 0.9
+
+    def __init__(self, config: Optional[IntentConfig] = None):
+        self.config = config or IntentConfig()
+        self._intents: Dict[str, Intent] = {}
+        self._phrases: Dict[str, str] = {}  # normalized phrase -> intent name
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved_ms = 0.0
+        self._llm_latency_ms: Optional[float] = None  # EWMA of full LLM turns
+
+    def register(
+        self,
+        name: str,
+        handler: IntentHandler,
+        phrases: Optional[List[str]] = None,
+        patterns: Optional[List[str]] = None,
+        keywords: Optional[List[str]] = None,
+    ) -> None:
+        """
+        Register (or replace) an intent.
+
+        Args:
+            name: Intent identifier
+            handler: Returns the text to speak, sync or async
+            phrases: Utterances matched exactly after normalization
+            patterns: Regexes searched in the normalized utterance (named groups are passed on)
+            keywords: Words whose joint presence signals the intent
+        """
+        intent = Intent(
+            name=name,
+            handler=handler,
+            phrases=[normalize_text(p) for p in phrases or []],
+            patterns=[re.compile(p) for p in patterns or []],
+            keywords=[normalize_text(k) for k in keywords or []],
+        )
+        self._intents[name] = intent
+        for phrase in intent.phrases:
+            self._phrases[phrase] = name
+
+    def classify(self, text: str) -> Optional[IntentMatch]:
+        """Return the best confident match for `text`, or None."""
+        normalized = normalize_text(text)
+        if not normalized:
+            return None
+
+        name = self._phrases.get(normalized)
+        if name:
+            return IntentMatch(name, text, normalized, 1.0)
+
+        for intent in self._intents.values():
+            for pattern in intent.patterns:
+                found = pattern.search(normalized)
+                if found:
+                    return IntentMatch(intent.name, text, normalized, self.PATTERN_CONFIDENCE, found.groupdict())
+
+        words = normalized.split()
+        if len(words) > self.config.max_keyword_words:
+            return None
+
+        best: Optional[IntentMatch] = None
+        vocabulary = set(words)
+        for intent in self._intents.values():
+            if not intent.keywords:
+                continue
+            score = sum(1 for k in intent.keywords if k in vocabulary) / len(intent.keywords)
+            if score >= self.config.min_confidence and (best is None or score > best.confidence):
+                best = IntentMatch(intent.name, text, normalized, score)
+        return best
+
+    async def handle(self, text: str) -> Optional[IntentResult]:
+        """
+        Answer `text` locally if an intent matches confidently.
+
+        Returns:
+            The handler's result, or None to fall through to the LLM
+        """
+        start = time.perf_counter()
+        match = self.classify(text) if self.config.enabled else None
+
+        if match is None or match.confidence < self.config.min_confidence:
+            self.misses += 1
+            metrics.increment("intent_miss")
+            return None
+
+        try:
+            response = self._intents[match.intent].handler(match)
+            if inspect.isawaitable(response):
+                response = await response
+        except Exception as e:
+            logger.error(f"Intent handler '{match.intent}' failed, falling back to LLM: {e}", exc_info=True)
+            self.misses += 1
+            metrics.increment("intent_miss")
+            return None
+
+        latency_ms = (time.perf_counter() - start) * 1000
+        self.hits += 1
+        if self._llm_latency_ms is not None:
+            self.latency_saved_ms += max(0.0, self._llm_latency_ms - latency_ms)
+        metrics.increment("intent_hit", tags={"intent": match.intent})
+        metrics.record_latency("intent_handle", latency_ms)
+        logger.info(
+            f"Intent fast-path: {match.intent} (confidence {match.confidence:.2f}, {latency_ms:.2f}ms, "
+            f"hit rate {self.hit_rate:.0%}, saved {self.latency_saved_ms / 1000:.1f}s so far)"
+        )
+        return IntentResult(match=match, response=response or "", latency_ms=latency_ms)
+
+    def observe_llm_latency(self, latency_ms: float) -> None:
+        """Feed the duration of an LLM turn; used to estimate the time saved by hits."""
+        if self._llm_latency_ms is None:
+            self._llm_latency_ms = latency_ms
+        else:
+            self._llm_latency_ms = 0.8 * self._llm_latency_ms + 0.2 * latency_ms
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
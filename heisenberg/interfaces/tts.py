@@ -20,3 +20,10 @@ class ABCTTS(ABC):
         Immediately stop speech playback and clear queues.
         """
         pass
+
+    async def wait_idle(self) -> None:
+        """
+        Wait until all queued speech has been played.
+        Engines that play synchronously in speak() need not override this.
+        """
+        pass
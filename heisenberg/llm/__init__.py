@@ -5,6 +5,7 @@ Integration of local language models via llama.cpp.
 
 Main Components:
 - LlamaCppLLM: Asynchronous LLM client with streaming support
+- GenerationHandle: Cancellable handle on an in-flight generation
 - PromptBuilder: Prompt construction with conversation history
 - SYSTEM_PROMPTS: Predefined personality templates
 
@@ -14,6 +15,7 @@ Example Usage:
     
     config = Config.load()
     llm = LlamaCppLLM(config.llm)
+    await llm.start()  # Open the pooled connection (optional, done lazily otherwise)
     
     # Simple generation
     response = await llm.generate_simple("Hello")
@@ -21,13 +23,22 @@ Example Usage:
     # Streaming generation
     async for token in llm.generate("Tell me a joke"):
         print(token, end='', flush=True)
+    
+    # Cancellable generation
+    handle = llm.start_generation("Tell me a story")
+    async for token in handle:
+        if should_stop():
+            await handle.cancel()
+    
+    await llm.aclose()
 """
 
-from heisenberg.llm.stream import LlamaCppLLM
+from heisenberg.llm.stream import LlamaCppLLM, GenerationHandle
 from heisenberg.llm.prompts import PromptBuilder, SYSTEM_PROMPTS
 
 __all__ = [
     "LlamaCppLLM",
+    "GenerationHandle",
     "PromptBuilder",
     "SYSTEM_PROMPTS",
 ]
@@ -0,0 +1,172 @@
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from heisenberg.core.config import LLMConfig
+from heisenberg.core.metrics import metrics
+from heisenberg.core.serialization import loads, dumps
+from heisenberg.core.text import normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    tokens: List[str]  # Replayed one by one so consumers see a normal stream
+    created_at: float  # Wall-clock time, so TTLs survive a restart
+    size: int
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of complete LLM responses.
+
+    Keys combine the normalized query with the context that changes the
+    answer: system prompt, prompt format, model and, optionally, the
+    conversation history. The cache is bounded both by entry count and by
+    the bytes of text it holds, and can be persisted to a JSON file.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        max_bytes: int = 1_000_000,
+        ttl_seconds: float = 3600.0,
+        path: str = "",
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.bytes_held = 0
+        self.hits = 0
+        self.misses = 0
+
+        if path and os.path.exists(path):
+            self.load()
+
+    @classmethod
+    def from_config(cls, config: LLMConfig) -> "ResponseCache":
+        return cls(
+            max_entries=config.response_cache_max_entries,
+            max_bytes=config.response_cache_max_bytes,
+            ttl_seconds=config.response_cache_ttl_seconds,
+            path=config.response_cache_path,
+        )
+
+    @staticmethod
+    def make_key(
+        query: str,
+        system_prompt: str,
+        preset: str,
+        history: Optional[List[Tuple[str, str]]] = None,
+    ) -> str:
+        """
+        Build a cache key.
+
+        Args:
+            query: The user's query (normalized here)
+            system_prompt: System prompt in use (hashed)
+            preset: Anything else shaping the answer (prompt format, model...)
+            history: Conversation history, or None when it should not matter
+        """
+        digest = hashlib.sha256()
+        for part in (normalize_text(query), system_prompt, preset):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x1f")
+        if history is not None:
+            for user_msg, assistant_msg in history:
+                digest.update(normalize_text(user_msg).encode("utf-8"))
+                digest.update(b"\x1e")
+                digest.update(assistant_msg.strip().encode("utf-8"))
+                digest.update(b"\x1e")
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[List[str]]:
+        """Return the cached tokens for `key`, or None if absent or expired."""
+        entry = self._entries.get(key)
+        if entry is not None and time.time() - entry.created_at > self.ttl_seconds:
+            self._remove(key)
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            metrics.increment("llm_cache_miss")
+            self._publish()
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        metrics.increment("llm_cache_hit")
+        self._publish()
+        return list(entry.tokens)
+
+    def put(self, key: str, tokens: List[str], created_at: Optional[float] = None) -> None:
+        """Store a complete response, evicting least-recently-used entries as needed."""
+        size = len(key) + sum(len(t.encode("utf-8")) for t in tokens)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+
+        self._entries[key] = CacheEntry(list(tokens), created_at or time.time(), size)
+        self.bytes_held += size
+        while len(self._entries) > self.max_entries or self.bytes_held > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+        self._publish()
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.bytes_held = 0
+        self._publish()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def load(self) -> None:
+        """Load persisted entries, skipping those already expired."""
+        try:
+            with open(self.path, "rb") as f:
+                data = loads(f.read())
+        except Exception as e:
+            logger.warning(f"Could not load LLM response cache from {self.path}: {e}")
+            return
+
+        now = time.time()
+        for key, item in data.items():
+            if now - item["created_at"] <= self.ttl_seconds:
+                self.put(key, item["tokens"], created_at=item["created_at"])
+        logger.info(f"Loaded {len(self)} cached LLM responses from {self.path}")
+
+    def save(self) -> None:
+        """Persist entries (oldest first, so LRU order survives a reload)."""
+        if not self.path:
+            return
+        data = {k: {"tokens": e.tokens, "created_at": e.created_at} for k, e in self._entries.items()}
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(dumps(data))
+            os.replace(tmp_path, self.path)
+            logger.info(f"Saved {len(self)} cached LLM responses to {self.path}")
+        except Exception as e:
+            logger.warning(f"Could not save LLM response cache to {self.path}: {e}")
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self.bytes_held -= entry.size
+
+    def _publish(self) -> None:
+        metrics.set_gauge("llm_cache_bytes", self.bytes_held)
+        metrics.set_gauge("llm_cache_entries", len(self._entries))
+        metrics.set_gauge("llm_cache_hit_rate", self.hit_rate)
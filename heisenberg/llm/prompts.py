@@ -1,6 +1,13 @@
-from typing import List, Tuple
+import asyncio
+import logging
+import re
+from typing import Awaitable, Callable, List, Tuple
 from dataclasses import dataclass
 
+logger = logging.getLogger(__name__)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+
 @dataclass
 class Message:
     """Represents a single message in a conversation."""
@@ -13,6 +20,8 @@ class PromptBuilder:
     Supports multiple prompt formats (ChatML, Llama, etc.)
     """
     
+    MESSAGE_OVERHEAD_TOKENS = 4  # Role markers and separators around each message
+    
     def __init__(self, system_prompt: str = "", format_style: str = "chatml"):
         """
         Args:
@@ -22,6 +31,120 @@ class PromptBuilder:
         self.system_prompt = system_prompt
         self.format_style = format_style
     
+    def window(self, history: List[Tuple[str, str]], max_turns: int) -> List[Tuple[str, str]]:
+        """
+        Trim history to at most `max_turns` turns, dropping old turns in blocks.
+        
+        A plain sliding window changes the first rendered turn on every call,
+        which invalidates llama.cpp's KV cache right after the system prompt.
+        Dropping half a window at a time keeps the rendered prefix byte-identical
+        between most consecutive turns.
+        
+        Args:
+            history: Full list of (user_message, assistant_response) tuples
+            max_turns: Maximum number of turns to keep
+            
+        Returns:
+            The retained, most recent turns
+        """
+        if max_turns is None or len(history) <= max_turns:
+            return list(history)
+        if max_turns <= 0:
+            return []
+        
+        step = max(1, max_turns // 2)
+        overflow = len(history) - max_turns
+        start = -(-overflow // step) * step  # Round up to a whole block
+        return list(history[start:])
+    
+    @staticmethod
+    def compact_turn(user_msg: str, assistant_msg: str, max_words: int = 24) -> Tuple[str, str]:
+        """
+        Shorten a turn to a compact summary: its first sentence, capped at `max_words`.
+        
+        Deterministic, so a compacted turn renders identically on every call.
+        """
+        def shorten(text: str) -> str:
+            text = text.strip()
+            first = _SENTENCE_END.split(text, maxsplit=1)[0]
+            words = first.split()
+            if len(words) > max_words:
+                return " ".join(words[:max_words]) + "…"
+            return first if first == text else first + " …"
+        
+        return shorten(user_msg), shorten(assistant_msg)
+    
+    async def fit_to_budget(
+        self,
+        history: List[Tuple[str, str]],
+        max_tokens: int,
+        count: Callable[[str], Awaitable[int]],
+        reserve_tokens: int = 64,
+        step: int = 1,
+        compact_words: int = 24,
+    ) -> List[Tuple[str, str]]:
+        """
+        Trim history so system prompt + history + query stay within `max_tokens`.
+        
+        Oldest turns are first replaced by compact summaries, then dropped.
+        Both happen in blocks of `step` turns and the decision does not depend
+        on the current query (a flat `reserve_tokens` is set aside for it), so
+        the rendered prefix stays byte-identical between most consecutive
+        turns and between speculative prefill and the final request.
+        
+        Args:
+            history: (user_message, assistant_response) tuples, oldest first
+            max_tokens: Token budget for the whole prompt
+            count: Async token counter (cached per text by the caller)
+            reserve_tokens: Tokens set aside for the current query
+            step: Number of turns compacted or dropped at a time
+            compact_words: Maximum words kept per compacted message
+            
+        Returns:
+            History that fits, with its oldest turns possibly compacted
+        """
+        turns = [(u.strip(), a.strip()) for u, a in history]
+        compacted = [self.compact_turn(u, a, compact_words) for u, a in turns]
+        overhead = self.MESSAGE_OVERHEAD_TOKENS
+        
+        counts = {}
+
+        async def count_all(texts: List[str]) -> None:
+            # One concurrent round of /tokenize requests instead of one per message
+            missing = list(dict.fromkeys(t for t in texts if t not in counts))
+            for text, n_tokens in zip(missing, await asyncio.gather(*(count(t) for t in missing))):
+                counts[text] = n_tokens
+
+        def cost(turn: Tuple[str, str]) -> int:
+            return counts[turn[0]] + counts[turn[1]] + 2 * overhead
+
+        await count_all([self.system_prompt] + [text for turn in turns for text in turn])
+        budget = max_tokens - reserve_tokens - overhead
+        if self.system_prompt:
+            budget -= counts[self.system_prompt] + overhead
+
+        full_costs = [cost(t) for t in turns]
+        if sum(full_costs) <= budget:
+            return list(history)
+        await count_all([text for turn in compacted for text in turn])
+        compact_costs = [cost(t) for t in compacted]
+        
+        n = len(turns)
+        step = max(1, step)
+        # Compact the oldest k turns, k growing a block at a time
+        for k in range(step, n + step, step):
+            k = min(k, n)
+            if sum(compact_costs[:k]) + sum(full_costs[k:]) <= budget:
+                return compacted[:k] + list(history[k:])
+        # Everything compacted and still too long: drop the oldest
+        for d in range(step, n + step, step):
+            d = min(d, n)
+            if sum(compact_costs[d:]) <= budget:
+                return compacted[d:]
+        
+        logger.warning(f"System prompt alone exceeds the {max_tokens} token prompt budget")
+        return []
+    
     def build(self, history: List[Tuple[str, str]], current_query: str) -> str:
         """
         Build a complete prompt from conversation history.
@@ -40,12 +163,13 @@ class PromptBuilder:
             messages.append(Message(role="system", content=self.system_prompt))
         
         # Add conversation history
+        # Contents are stripped so a turn renders identically every time it is re-sent
         for user_msg, assistant_msg in history:
-            messages.append(Message(role="user", content=user_msg))
-            messages.append(Message(role="assistant", content=assistant_msg))
+            messages.append(Message(role="user", content=user_msg.strip()))
+            messages.append(Message(role="assistant", content=assistant_msg.strip()))
         
         # Add current query
-        messages.append(Message(role="user", content=current_query))
+        messages.append(Message(role="user", content=current_query.strip()))
         
         # Format according to style
         if self.format_style == "chatml":
@@ -55,6 +179,25 @@ class PromptBuilder:
         else:
             return self._format_plain(messages)
     
+    def build_prefix(self, history: List[Tuple[str, str]], partial_query: str = "") -> str:
+        """
+        Render the prompt only up to the end of a (possibly partial) user query.
+        
+        The result is a byte-exact prefix of `build(history, query)` for any
+        query starting with `partial_query`, which makes it suitable for
+        warming llama.cpp's KV cache before the final transcript is known.
+        
+        Args:
+            history: List of (user_message, assistant_response) tuples
+            partial_query: The stable beginning of the user's query so far
+            
+        Returns:
+            Prompt prefix string
+        """
+        marker = "\x00"
+        rendered = self.build(history, partial_query.lstrip() + marker)
+        return rendered[:rendered.rindex(marker)]
+    
     def _format_chatml(self, messages: List[Message]) -> str:
         """Format messages in ChatML style (used by many modern models)."""
         formatted = []
@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from heisenberg.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Endpoint:
+    """One llama.cpp server, as seen by the router."""
+    url: str  # Completion URL, e.g. http://host:8080/completion
+    healthy: bool = True  # Optimistic until the first probe says otherwise
+    outstanding: int = 0  # Requests in flight from this client
+    idle_slots: Optional[int] = None  # From /slots, None if the server does not expose it
+    failures: int = 0  # Consecutive failed requests or probes
+    probe_ms: float = 0.0
+
+    def route(self, path: str) -> str:
+        """URL of another route on this server."""
+        parts = urlsplit(self.url)
+        return f"{parts.scheme}://{parts.netloc}{path}"
+
+
+class EndpointRouter:
+    """
+    Client-side router over several llama.cpp servers.
+
+    - Probes `/health` and `/slots` periodically; servers that are down or
+      still loading their model are skipped until a probe succeeds again.
+    - Sessions stick to the server that last answered them, so their
+      KV cache stays warm.
+    - New sessions (or sessions whose server went away) go to the server
+      with the fewest requests in flight, preferring servers reporting idle slots.
+    """
+
+    def __init__(
+        self,
+        urls: Iterable[str],
+        session_factory: Callable[[], Awaitable[aiohttp.ClientSession]],
+        probe_interval: float = 5.0,
+        probe_timeout: float = 2.0,
+    ):
+        self.endpoints: List[Endpoint] = [Endpoint(url) for url in urls]
+        if not self.endpoints:
+            raise ValueError("EndpointRouter needs at least one endpoint")
+        self._session_factory = session_factory
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self._affinity: Dict[str, Endpoint] = {}
+        self._probe_task: Optional[asyncio.Task] = None
+
+    @property
+    def primary(self) -> Endpoint:
+        return self.endpoints[0]
+
+    async def start(self) -> None:
+        """Probe every server once (pre-connecting the pool), then keep probing in the background."""
+        await self.probe_all()
+        if len(self.endpoints) > 1 and self.probe_interval > 0 and self._probe_task is None:
+            self._probe_task = asyncio.create_task(self._probe_loop())
+
+    async def stop(self) -> None:
+        if self._probe_task:
+            self._probe_task.cancel()
+            await asyncio.gather(self._probe_task, return_exceptions=True)
+            self._probe_task = None
+
+    async def probe_all(self) -> None:
+        await asyncio.gather(*(self.probe(e) for e in self.endpoints))
+
+    async def probe(self, endpoint: Endpoint) -> bool:
+        """Refresh an endpoint's health and slot availability."""
+        start = time.perf_counter()
+        timeout = aiohttp.ClientTimeout(total=self.probe_timeout)
+        try:
+            session = await self._session_factory()
+            async with session.get(endpoint.route("/health"), timeout=timeout) as response:
+                await response.read()
+                healthy = response.status == 200  # 503 while the model is loading
+            if healthy:
+                async with session.get(endpoint.route("/slots"), timeout=timeout) as response:
+                    if response.status == 200:
+                        slots = await response.json(content_type=None)
+                        endpoint.idle_slots = sum(1 for s in slots if not s.get("is_processing", False))
+                    else:
+                        await response.read()  # /slots is disabled on this server
+                        endpoint.idle_slots = None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug(f"LLM endpoint probe failed for {endpoint.url}: {e}")
+            healthy = False
+
+        endpoint.probe_ms = (time.perf_counter() - start) * 1000
+        if healthy != endpoint.healthy:
+            logger.info(f"LLM endpoint {endpoint.url} is now {'healthy' if healthy else 'unavailable'}")
+        endpoint.healthy = healthy
+        endpoint.failures = 0 if healthy else endpoint.failures + 1
+        return healthy
+
+    async def _probe_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.probe_interval)
+            await self.probe_all()
+
+    def pick(self, session_id: Optional[str] = None, exclude: Iterable[Endpoint] = ()) -> Optional[Endpoint]:
+        """
+        Choose the server for a request.
+
+        Returns:
+            The session's server if it is still usable, otherwise the least
+            loaded one; None if every candidate is excluded
+        """
+        excluded = set(id(e) for e in exclude)
+        candidates = [e for e in self.endpoints if id(e) not in excluded]
+        if not candidates:
+            return None
+
+        bound = self._affinity.get(session_id) if session_id is not None else None
+        if bound is not None and bound.healthy and id(bound) not in excluded:
+            return bound
+
+        healthy = [e for e in candidates if e.healthy] or candidates  # Nothing healthy: try anyway
+        # Fewest requests in flight, then most idle slots, then config order
+        return min(
+            healthy,
+            key=lambda e: (e.outstanding, -(e.idle_slots or 0), self.endpoints.index(e)),
+        )
+
+    def bind(self, session_id: Optional[str], endpoint: Endpoint) -> None:
+        """Pin a session to the server holding its KV cache."""
+        if session_id is not None:
+            self._affinity[session_id] = endpoint
+
+    def acquire(self, endpoint: Endpoint) -> None:
+        endpoint.outstanding += 1
+
+    def release(self, endpoint: Endpoint, ok: Optional[bool] = True) -> None:
+        """
+        End a request on `endpoint`.
+
+        Args:
+            ok: True if the server answered, False if it failed, None if the
+                request was abandoned by us (cancelled, hedge loser, prefill),
+                which says nothing about the server's health
+        """
+        endpoint.outstanding -= 1
+        if ok is None:
+            return
+        if ok:
+            endpoint.failures = 0
+        else:
+            endpoint.failures += 1
+            endpoint.healthy = False  # Until the next successful probe
+            metrics.increment("llm_endpoint_failure", tags={"endpoint": endpoint.url})
@@ -0,0 +1,78 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+from heisenberg.core.serialization import loads, DecodeError
+
+logger = logging.getLogger(__name__)
+
+
+class SSEParser:
+    """
+    Incremental parser for the llama.cpp Server-Sent Events stream.
+
+    Works directly on raw byte chunks as they come off the socket: events
+    split across reads are buffered until their line is complete, each batch
+    of complete lines is decoded once, and only `data:` payloads are parsed
+    as JSON (llama.cpp sends one JSON object per line).
+    The final event (`"stop": true`) is kept in `final_event` so its
+    `timings` block can be reported.
+    """
+
+    def __init__(self):
+        self._pending = b""
+        self.final_event: Optional[Dict[str, Any]] = None
+        self.events_parsed = 0
+
+    def feed(self, chunk: bytes) -> List[Dict[str, Any]]:
+        """
+        Consume a chunk of bytes and return the events it completed.
+
+        Args:
+            chunk: Raw bytes read from the HTTP response body
+
+        Returns:
+            Decoded JSON events, in stream order
+        """
+        if self._pending:
+            chunk = self._pending + chunk
+        complete, newline, self._pending = chunk.rpartition(b"\n")
+        if not newline:
+            # No full line yet: everything stays pending
+            self._pending = complete + self._pending
+            return []
+
+        # Complete lines never end inside a UTF-8 sequence, so decode them in one go
+        events = []
+        for line in complete.decode("utf-8").split("\n"):
+            event = self._parse_line(line)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """Parse whatever is left once the stream is closed."""
+        line, self._pending = self._pending, b""
+        event = self._parse_line(line.decode("utf-8", "replace"))
+        return [event] if event is not None else []
+
+    def _parse_line(self, line: str) -> Optional[Dict[str, Any]]:
+        if not line.startswith("data:"):
+            # Blank separators, ": keep-alive" comments and other SSE fields
+            if line.startswith("error:"):
+                logger.warning(f"LLM server error event: {line[6:].strip()}")
+            return None
+
+        payload = line[5:].strip()
+        if not payload or payload == "[DONE]":
+            return None
+
+        try:
+            event = loads(payload)
+        except DecodeError as e:
+            logger.warning(f"Failed to parse LLM response: {e}, line: {payload[:200]}")
+            return None
+
+        self.events_parsed += 1
+        if event.get("stop", False):
+            self.final_event = event
+        return event
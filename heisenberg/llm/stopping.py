@@ -0,0 +1,123 @@
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+
+class StopPolicy(ABC):
+    """
+    Client-side early-stop policy applied to the streamed text.
+
+    `feed` returns the part of the text that may be emitted now (policies may
+    hold text back until they can decide) and sets `stopped` once generation
+    should end. `flush` releases held text at the end of the stream.
+    """
+
+    def __init__(self):
+        self.stopped = False
+        self.reason: Optional[str] = None
+
+    @abstractmethod
+    def feed(self, text: str) -> str:
+        pass
+
+    def flush(self) -> str:
+        return ""
+
+
+class StopSequenceMatcher(StopPolicy):
+    """
+    Incremental stop-string detection across token boundaries.
+
+    The server only sees stop strings that fall inside its own detokenized
+    text; here text that could still be the beginning of a stop sequence is
+    held back until the next token confirms or rules out the match, so a
+    stop string is never partially spoken.
+    """
+
+    def __init__(self, stop_sequences: List[str]):
+        super().__init__()
+        self.stop_sequences = [s for s in stop_sequences if s]
+        self._held = ""
+
+    def feed(self, text: str) -> str:
+        if self.stopped:
+            return ""
+
+        buffer = self._held + text
+
+        # Earliest complete match wins
+        match_at = -1
+        for stop in self.stop_sequences:
+            index = buffer.find(stop)
+            if index != -1 and (match_at == -1 or index < match_at):
+                match_at = index
+                self.reason = stop
+        if match_at != -1:
+            self.stopped = True
+            self._held = ""
+            return buffer[:match_at]
+
+        # Hold back the longest tail that is a prefix of some stop sequence
+        hold = 0
+        for stop in self.stop_sequences:
+            for size in range(min(len(stop) - 1, len(buffer)), hold, -1):
+                if buffer.endswith(stop[:size]):
+                    hold = size
+                    break
+        self._held = buffer[len(buffer) - hold:] if hold else ""
+        return buffer[:len(buffer) - hold]
+
+    def flush(self) -> str:
+        held, self._held = self._held, ""
+        return held
+
+
+class SentenceBudget(StopPolicy):
+    """
+    Stop once `max_sentences` sentences have been generated.
+    Spoken answers should stay short: anything past the budget is wasted decode time.
+    """
+
+    TERMINATORS = ".!?…"
+    CLOSING = "\"'»)]"
+
+    def __init__(self, max_sentences: int):
+        super().__init__()
+        self.max_sentences = max_sentences
+        self.sentences = 0
+        self._after_terminator = False
+
+    def feed(self, text: str) -> str:
+        if self.stopped:
+            return ""
+
+        for i, char in enumerate(text):
+            if char in self.TERMINATORS:
+                self._after_terminator = True
+            elif self._after_terminator and char in self.CLOSING:
+                continue
+            elif self._after_terminator and char.isspace():
+                # Whitespace after a terminator: the sentence is complete ("3.5" is not)
+                self._after_terminator = False
+                self.sentences += 1
+                if self.sentences >= self.max_sentences:
+                    self.stopped = True
+                    self.reason = f"max_sentences={self.max_sentences}"
+                    return text[:i]
+            else:
+                self._after_terminator = False
+        return text
+
+
+def apply_policies(policies: List[StopPolicy], text: str) -> str:
+    """Run text through a chain of policies; later policies only see what earlier ones emit."""
+    for policy in policies:
+        text = policy.feed(text)
+    return text
+
+
+def flush_policies(policies: List[StopPolicy]) -> str:
+    """Release the text still held by a chain of policies at end of stream."""
+    text = ""
+    for policy in policies:
+        text = policy.feed(text) + policy.flush()
+    return text
@@ -1,15 +1,121 @@
-import json
 import logging
 import asyncio
-from typing import AsyncGenerator, Optional, Callable
+from typing import AsyncGenerator, Optional, Callable, Dict, List, Set, Tuple
+from urllib.parse import urlsplit
 import aiohttp
 
 from heisenberg.interfaces.llm import ABCLLM
 from heisenberg.core.config import LLMConfig
+from heisenberg.core.metrics import metrics
 from heisenberg.llm.prompts import PromptBuilder
+from heisenberg.llm.cache import ResponseCache
+from heisenberg.llm.tokens import TokenCounter
+from heisenberg.llm.router import Endpoint, EndpointRouter
+from heisenberg.llm.sse import SSEParser
+from heisenberg.llm.stopping import (
+    StopPolicy, StopSequenceMatcher, SentenceBudget, apply_policies, flush_policies
+)
 
 logger = logging.getLogger(__name__)
 
+_END = object()
+
+
+class GenerationHandle:
+    """
+    Handle on a generation running as its own engine-owned task.
+    
+    Iterate it (`async for token in handle`) to consume tokens. `cancel()`
+    stops the task wherever it is: the request context is exited, which
+    drops the unfinished HTTP connection so llama.cpp stops decoding and
+    frees the slot, and the tokens generated but never consumed are
+    recorded as wasted.
+    """
+    
+    def __init__(self, stream: AsyncGenerator[str, None], on_done: Callable[["GenerationHandle"], None]):
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._error: Optional[BaseException] = None
+        self._stream = stream
+        self._on_done = on_done
+        self._finished = False
+        self.tokens_received = 0
+        self.tokens_consumed = 0
+        self.tokens_wasted = 0
+        self.cancelled = False
+        self.session_id: Optional[str] = None
+        self.task = asyncio.create_task(self._pump())
+    
+    async def _pump(self):
+        try:
+            async for token in self._stream:
+                self.tokens_received += 1
+                self._queue.put_nowait(token)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._error = e
+        finally:
+            await self._finish()
+    
+    async def _finish(self):
+        if self._finished:
+            return
+        self._finished = True
+        # Finalize the generator now rather than at garbage collection
+        await self._stream.aclose()
+        self._queue.put_nowait(_END)
+        self._on_done(self)
+    
+    def __aiter__(self) -> "GenerationHandle":
+        return self
+    
+    async def __anext__(self) -> str:
+        if self.cancelled:
+            # Tokens still queued at cancellation are dropped, not delivered
+            raise StopAsyncIteration
+        item = await self._queue.get()
+        if item is _END:
+            # Keep the sentinel so later reads also end the iteration
+            self._queue.put_nowait(_END)
+            if self._error:
+                raise self._error
+            raise StopAsyncIteration
+        if self.cancelled:
+            raise StopAsyncIteration
+        self.tokens_consumed += 1
+        return item
+    
+    def done(self) -> bool:
+        return self.task.done()
+    
+    async def result(self) -> str:
+        """Consume the remaining tokens and return them joined."""
+        return "".join([token async for token in self])
+    
+    async def cancel(self) -> int:
+        """
+        Stop the generation and wait until its resources are released.
+        
+        Returns:
+            Number of tokens generated but never consumed
+        """
+        if self.cancelled:
+            return self.tokens_wasted
+        
+        self.cancelled = True
+        if not self.task.done():
+            self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+        # A task cancelled before its first step never ran its cleanup
+        await self._finish()
+        
+        self.tokens_wasted = self.tokens_received - self.tokens_consumed
+        metrics.increment("llm_generation_cancelled")
+        metrics.increment("llm_tokens_wasted", value=self.tokens_wasted)
+        logger.info(f"LLM generation cancelled ({self.tokens_wasted} tokens wasted)")
+        return self.tokens_wasted
+
+
 class LlamaCppLLM(ABCLLM):
     """
     LLM client for llama.cpp HTTP server.
@@ -27,11 +133,270 @@ class LlamaCppLLM(ABCLLM):
             system_prompt=config.system_prompt,
             format_style="plain"  # Adjust based on your model
         )
-        self._current_session: Optional[aiohttp.ClientSession] = None
-        self._current_task: Optional[asyncio.Task] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._active: Set[GenerationHandle] = set()
+        self._session_slots: Dict[str, int] = {}
+        self._stop_policy_factories: List[Callable[[], StopPolicy]] = []
+        self.last_timings: Dict[str, float] = {}
+        self.token_counter = TokenCounter(self._get_session, self._url("/tokenize"))
+        # `endpoint` is the primary server; `endpoints` adds more for failover and load spreading
+        self.router = EndpointRouter(
+            [config.endpoint] + [e for e in config.endpoints if e != config.endpoint],
+            self._get_session,
+            probe_interval=config.health_check_interval_seconds,
+        )
+        self.response_cache: Optional[ResponseCache] = (
+            ResponseCache.from_config(config) if config.response_cache_enabled else None
+        )
         self._on_token_callback: Optional[Callable[[str], None]] = None
         self._on_complete_callback: Optional[Callable[[str], None]] = None
     
+    async def start(self) -> None:
+        """
+        Create the long-lived HTTP session and pre-connect to the servers,
+        so the first generation already has a warm keep-alive socket.
+        """
+        if self._session and not self._session.closed:
+            return
+        
+        self._session = self._create_session()
+        
+        # The health probe doubles as the pre-connect; a server still loading
+        # its model is skipped until a later probe (or request) succeeds
+        await self.router.start()
+        for endpoint in self.router.endpoints:
+            if endpoint.healthy:
+                logger.info(f"LLM server pre-connected: {endpoint.url}")
+            else:
+                logger.warning(f"LLM pre-connect failed: {endpoint.url}")
+        
+        if self.config.slot_persist:
+            for slot in range(self.config.n_slots):
+                await self.restore_slot(slot)
+    
+    async def aclose(self) -> None:
+        """Close the pooled HTTP session and its connections."""
+        await self.router.stop()
+        if self._session and not self._session.closed:
+            if self.config.slot_persist:
+                for slot in range(self.config.n_slots):
+                    await self.save_slot(slot)
+            await self._session.close()
+            logger.info("Closed LLM HTTP session")
+        self._session = None
+        if self.response_cache is not None:
+            self.response_cache.save()
+    
+    async def __aenter__(self) -> "LlamaCppLLM":
+        await self.start()
+        return self
+    
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+    
+    def _create_session(self) -> aiohttp.ClientSession:
+        """Build a session with a keep-alive pool (TCP or Unix domain socket)."""
+        if self.config.unix_socket:
+            connector = aiohttp.UnixConnector(
+                path=self.config.unix_socket,
+                limit=self.config.pool_size,
+                keepalive_timeout=self.config.keepalive_seconds,
+            )
+            logger.info(f"LLM client using Unix socket: {self.config.unix_socket}")
+        else:
+            connector = aiohttp.TCPConnector(
+                limit=self.config.pool_size,
+                keepalive_timeout=self.config.keepalive_seconds,
+                ttl_dns_cache=300,
+            )
+        timeout = aiohttp.ClientTimeout(total=self.config.timeout_seconds)
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Return the pooled session, creating it lazily if start() was not called."""
+        if self._session is None or self._session.closed:
+            self._session = self._create_session()
+        return self._session
+    
+    def _url(self, path: str) -> str:
+        """Build a URL for another llama.cpp route on the same server as `endpoint`."""
+        parts = urlsplit(self.config.endpoint)
+        return f"{parts.scheme}://{parts.netloc}{path}"
+    
+    async def _prepare_history(self, conversation_history: Optional[list]) -> list:
+        """Apply the turn window, then the token budget, to the history about to be rendered."""
+        history = self.prompt_builder.window(conversation_history or [], self.config.max_history_turns)
+        if not self.config.max_prompt_tokens or not history:
+            return history
+        
+        fitted = await self.prompt_builder.fit_to_budget(
+            history,
+            self.config.max_prompt_tokens,
+            self.token_counter.count,
+            reserve_tokens=self.config.prompt_query_reserve_tokens,
+            step=max(1, self.config.max_history_turns // 2),
+            compact_words=self.config.compact_turn_words,
+        )
+        if fitted != history:
+            metrics.increment("llm_history_compacted")
+            logger.debug(f"History fitted to {self.config.max_prompt_tokens} tokens: {len(history)} -> {len(fitted)} turns")
+        return fitted
+    
+    async def _post_stream(self, endpoint: Endpoint, payload: dict) -> Tuple[aiohttp.ClientResponse, bytes]:
+        """POST a streaming request to one server and wait for the first bytes of its stream."""
+        session = await self._get_session()
+        self.router.acquire(endpoint)
+        response = None
+        try:
+            response = await session.post(endpoint.url, json=payload)
+            if response.status != 200:
+                error_text = await response.text()
+                logger.error(f"LLM API error {response.status} from {endpoint.url}: {error_text}")
+                raise RuntimeError(f"LLM request failed: {response.status}")
+            return response, await response.content.readany()
+        except BaseException as e:
+            if response is not None:
+                response.close()
+            self.router.release(endpoint, ok=None if isinstance(e, asyncio.CancelledError) else False)
+            raise
+    
+    async def _open_stream(
+        self, payload: dict, session_id: Optional[str]
+    ) -> Tuple[Endpoint, aiohttp.ClientResponse, bytes]:
+        """
+        Start a streaming request on the session's server, with failover and hedging.
+        
+        A server that fails is immediately replaced by the next candidate. If
+        no byte arrived after `hedge_after_ms`, the same request is also sent
+        to another server; whichever starts streaming first wins and the
+        other request is dropped.
+        
+        Returns:
+            The winning endpoint, its response and the first chunk of the body
+        """
+        tried: List[Endpoint] = []
+        pending: Dict[asyncio.Task, Endpoint] = {}
+        last_error: Optional[Exception] = None
+        
+        def launch() -> bool:
+            endpoint = self.router.pick(session_id, exclude=tried)
+            if endpoint is None:
+                return False
+            tried.append(endpoint)
+            pending[asyncio.create_task(self._post_stream(endpoint, payload))] = endpoint
+            return True
+        
+        hedge_delay = self.config.hedge_after_ms / 1000 if self.config.hedge_after_ms > 0 else None
+        launch()
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedge_delay = None  # Hedge once per request
+                    if launch():
+                        metrics.increment("llm_hedged_request")
+                        logger.info(f"No LLM token after {self.config.hedge_after_ms:.0f}ms, hedging to {tried[-1].url}")
+                    continue
+                
+                for task in done:
+                    endpoint = pending.pop(task)
+                    try:
+                        response, first_chunk = task.result()
+                    except Exception as e:
+                        last_error = e
+                        logger.warning(f"LLM endpoint {endpoint.url} failed: {e}")
+                        continue
+                    if len(tried) > 1:
+                        metrics.increment("llm_endpoint_won", tags={"endpoint": endpoint.url})
+                    self.router.bind(session_id, endpoint)
+                    return endpoint, response, first_chunk
+                
+                if not pending and launch():
+                    metrics.increment("llm_failover")
+                    logger.info(f"Failing over to LLM endpoint {tried[-1].url}")
+        finally:
+            # Drop the losing requests, including any that completed at the same time
+            for task in pending:
+                task.cancel()
+            results = await asyncio.gather(*pending, return_exceptions=True)
+            for result, endpoint in zip(results, pending.values()):
+                if isinstance(result, tuple):
+                    result[0].close()
+                    self.router.release(endpoint, ok=None)
+        
+        raise last_error or RuntimeError("No LLM endpoint available")
+    
+    def slot_for(self, session_id: Optional[str]) -> Optional[int]:
+        """
+        Pin a session to a server slot so its KV cache survives between turns.
+        Sessions are assigned round-robin over `n_slots` on first use.
+        """
+        if session_id is None:
+            return None
+        slot = self._session_slots.get(session_id)
+        if slot is None:
+            slot = len(self._session_slots) % max(1, self.config.n_slots)
+            self._session_slots[session_id] = slot
+            logger.debug(f"Session {session_id} pinned to LLM slot {slot}")
+        return slot
+    
+    async def save_slot(self, slot: int) -> bool:
+        """Persist a slot's KV cache to the server's --slot-save-path."""
+        return await self._slot_action(slot, "save")
+    
+    async def restore_slot(self, slot: int) -> bool:
+        """Reload a slot's KV cache saved by a previous run."""
+        return await self._slot_action(slot, "restore")
+    
+    async def _slot_action(self, slot: int, action: str) -> bool:
+        filename = f"{self.config.slot_file_prefix}-slot{slot}.bin"
+        try:
+            session = await self._get_session()
+            async with session.post(
+                self._url(f"/slots/{slot}"), params={"action": action}, json={"filename": filename}
+            ) as response:
+                if response.status != 200:
+                    logger.warning(f"LLM slot {action} failed for slot {slot}: {response.status} {await response.text()}")
+                    return False
+                logger.info(f"LLM slot {slot} {action} done ({filename})")
+                return True
+        except Exception as e:
+            logger.warning(f"LLM slot {action} failed for slot {slot}: {e}")
+            return False
+    
+    def _record_timings(self, data: dict) -> None:
+        """
+        Report llama.cpp's final `timings` block: prefill time, how much of the
+        prompt was served from the KV cache, and decode speed.
+        """
+        timings = data.get("timings") or {}
+        prompt_tokens = data.get("tokens_evaluated") or 0
+        # prompt_n counts the prompt tokens actually evaluated; the rest came from the cache
+        evaluated = timings.get("prompt_n", prompt_tokens)
+        cached = max(0, prompt_tokens - evaluated)
+        prefill_ms = timings.get("prompt_ms", 0.0)
+        
+        self.last_timings = {
+            "prefill_ms": prefill_ms,
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached,
+            "cached_ratio": cached / prompt_tokens if prompt_tokens else 0.0,
+            "prompt_per_second": timings.get("prompt_per_second", 0.0),
+            "predicted_tokens": timings.get("predicted_n", 0),
+            "predicted_ms": timings.get("predicted_ms", 0.0),
+            "predicted_per_second": timings.get("predicted_per_second", 0.0),
+        }
+        
+        metrics.record_latency("llm_prefill", prefill_ms)
+        metrics.record_latency("llm_decode", self.last_timings["predicted_ms"])
+        metrics.increment("llm_prompt_tokens", value=prompt_tokens)
+        metrics.increment("llm_cached_prompt_tokens", value=cached)
+        logger.info(
+            f"LLM prefill: {prefill_ms:.0f}ms for {evaluated}/{prompt_tokens} tokens "
+            f"({self.last_timings['cached_ratio']:.0%} cached), "
+            f"decode: {self.last_timings['predicted_per_second']:.1f} tok/s"
+        )
+    
     def on_token(self, callback: Callable[[str], None]):
         """Register callback for each token generated."""
         self._on_token_callback = callback
@@ -40,18 +405,63 @@ class LlamaCppLLM(ABCLLM):
         """Register callback when generation is complete."""
         self._on_complete_callback = callback
     
-    async def generate(self, prompt: str, conversation_history: list = None) -> AsyncGenerator[str, None]:
+    def register_stop_policy(self, factory: Callable[[], StopPolicy]):
+        """Register an extra client-side early-stop policy (a fresh one is built per generation)."""
+        self._stop_policy_factories.append(factory)
+    
+    def _build_stop_policies(self) -> List[StopPolicy]:
+        policies: List[StopPolicy] = [StopSequenceMatcher(self.config.stop_sequences)]
+        if self.config.max_sentences > 0:
+            policies.append(SentenceBudget(self.config.max_sentences))
+        policies.extend(factory() for factory in self._stop_policy_factories)
+        return policies
+    
+    def _emit(self, tokens: List[str], text: str) -> None:
+        """Book-keeping for a chunk of text about to be yielded."""
+        if not tokens:
+            # Log first token for latency tracking
+            logger.info("Received first LLM token")
+        tokens.append(text)
+        
+        # Call token callback if registered
+        if self._on_token_callback:
+            self._on_token_callback(text)
+    
+    async def generate(
+        self, prompt: str, conversation_history: list = None, session_id: Optional[str] = None
+    ) -> AsyncGenerator[str, None]:
         """
         Generate text response from a prompt with streaming.
         
         Args:
             prompt: The user's query
             conversation_history: Optional list of (user, assistant) tuples for context
+            session_id: Optional session identifier, pinned to a server slot for KV cache reuse
             
         Yields:
             Individual tokens as they are generated
         """
-        conversation_history = conversation_history or []
+        conversation_history = await self._prepare_history(conversation_history)
+        
+        # Repeated queries are replayed from the response cache, token by token
+        cache_key = None
+        if self.response_cache is not None:
+            cache_key = self.response_cache.make_key(
+                prompt,
+                self.prompt_builder.system_prompt,
+                f"{self.prompt_builder.format_style}|{self.config.model_name}",
+                conversation_history if self.config.response_cache_use_history else None,
+            )
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"LLM response cache hit (hit rate {self.response_cache.hit_rate:.0%})")
+                tokens: List[str] = []
+                for text in cached:
+                    self._emit(tokens, text)
+                    yield text
+                if self._on_complete_callback:
+                    self._on_complete_callback("".join(tokens))
+                return
         
         # Build complete prompt with history
         full_prompt = self.prompt_builder.build(conversation_history, prompt)
@@ -66,79 +476,97 @@ class LlamaCppLLM(ABCLLM):
             "top_p": self.config.top_p,
             "n_predict": self.config.max_tokens,
             "repeat_penalty": self.config.repeat_penalty,
-            "stop": ["User:", "user:", "<|im_end|>", "</s>"],  # Stop sequences
+            "stop": self.config.stop_sequences,
             "stream": True,
+            "cache_prompt": self.config.cache_prompt,
         }
+        slot = self.slot_for(session_id)
+        if slot is not None:
+            payload["id_slot"] = slot
         
-        full_response = ""
+        # Tokens are collected in a list and joined once, instead of O(n^2) concatenation
+        tokens: List[str] = []
         token_count = 0
-        first_token = True
+        parser = SSEParser()
+        policies = self._build_stop_policies()
+        
+        endpoint: Optional[Endpoint] = None
+        completed: Optional[bool] = None
         
         try:
-            timeout = aiohttp.ClientTimeout(total=self.config.timeout_seconds)
+            endpoint, response, chunk = await self._open_stream(payload, session_id)
             
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                self._current_session = session
+            async with response:
+                logger.info(f"Started receiving LLM stream from {endpoint.url}")
                 
-                async with session.post(self.config.endpoint, json=payload) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        logger.error(f"LLM API error {response.status}: {error_text}")
-                        raise RuntimeError(f"LLM request failed: {response.status}")
-                    
-                    logger.info("Started receiving LLM stream")
-                    
-                    # Parse SSE stream from llama.cpp
-                    async for line in response.content:
-                        line = line.decode('utf-8').strip()
+                # Parse the SSE stream from llama.cpp straight from raw byte chunks
+                done = False
+                while True:
+                    # At end of stream, a last event without its trailing newline is still pending
+                    events = parser.feed(chunk) if chunk else parser.flush()
+                    for data in events:
+                        token = data.get('content', '')
+                        if token:
+                            token_count += 1
                         
-                        if not line or line.startswith(':'):
-                            continue
+                        # Stop strings are matched client-side too, across token boundaries
+                        text = apply_policies(policies, token)
+                        server_stop = data.get('stop', False)
+                        if server_stop:
+                            # Release text the policies were holding back
+                            text += flush_policies(policies)
                         
-                        # llama.cpp sends "data: " prefix for SSE
-                        if line.startswith('data: '):
-                            data_str = line[6:]  # Remove "data: " prefix
-                            
-                            try:
-                                data = json.loads(data_str)
-                                
-                                # Extract token content
-                                token = data.get('content', '')
-                                
-                                if token:
-                                    full_response += token
-                                    token_count += 1
-                                    
-                                    # Log first token for latency tracking
-                                    if first_token:
-                                        logger.info("Received first LLM token")
-                                        first_token = False
-                                    
-                                    # Call token callback if registered
-                                    if self._on_token_callback:
-                                        self._on_token_callback(token)
-                                    
-                                    yield token
-                                
-                                # Check if generation is complete
-                                if data.get('stop', False):
-                                    logger.info(f"LLM generation complete. Tokens: {token_count}")
-                                    break
-                                    
-                            except json.JSONDecodeError as e:
-                                logger.warning(f"Failed to parse LLM response: {e}, line: {data_str}")
-                                continue
-        
+                        if text:
+                            self._emit(tokens, text)
+                            yield text
+                        
+                        # Check if generation is complete
+                        if server_stop:
+                            done = True
+                            break
+                        
+                        stopper = next((p for p in policies if p.stopped), None)
+                        if stopper:
+                            # Closing the connection makes llama.cpp stop decoding and free the slot now
+                            logger.info(f"Client-side stop ({stopper.reason}) after {token_count} tokens, aborting request")
+                            metrics.increment("llm_client_stop")
+                            response.close()
+                            done = True
+                            break
+                    
+                    if done or not chunk:
+                        break
+                    chunk = await response.content.readany()
+                
+                if not done:
+                    text = flush_policies(policies)
+                    if text:
+                        self._emit(tokens, text)
+                        yield text
+                
+                logger.info(f"LLM generation complete. Tokens: {token_count}")
+                if parser.final_event is not None:
+                    self._record_timings(parser.final_event)
+                
+                # Only complete answers are cached, never cancelled or failed ones
+                if cache_key is not None and tokens:
+                    self.response_cache.put(cache_key, tokens)
+                completed = True
+    
         except asyncio.CancelledError:
-            logger.info("LLM generation cancelled")
+            # Leaving the request context with an unfinished body closes the connection
+            logger.info(f"LLM generation interrupted after {token_count} tokens")
             raise
         
         except Exception as e:
             logger.error(f"Error during LLM generation: {e}", exc_info=True)
+            completed = False
             raise
         
         finally:
-            self._current_session = None
+            if endpoint is not None:
+                self.router.release(endpoint, ok=completed)
+            full_response = "".join(tokens)
             
             # Call completion callback
             if self._on_complete_callback:
@@ -146,31 +574,112 @@ class LlamaCppLLM(ABCLLM):
         
         logger.debug(f"Generated response: {full_response[:100]}...")
     
-    async def generate_simple(self, prompt: str, conversation_history: list = None) -> str:
+    async def generate_simple(
+        self, prompt: str, conversation_history: list = None, session_id: Optional[str] = None
+    ) -> str:
         """
         Generate complete response (non-streaming convenience method).
         
         Args:
             prompt: The user's query
             conversation_history: Optional conversation context
+            session_id: Optional session identifier for slot pinning
             
         Returns:
             Complete generated text
         """
-        full_response = ""
-        async for token in self.generate(prompt, conversation_history):
-            full_response += token
-        return full_response
+        tokens = []
+        async for token in self.generate(prompt, conversation_history, session_id):
+            tokens.append(token)
+        return "".join(tokens)
     
-    async def cancel(self) -> None:
-        """Cancel the current generation."""
-        if self._current_task and not self._current_task.done():
-            self._current_task.cancel()
-            logger.info("Cancelled LLM generation task")
-        
-        if self._current_session and not self._current_session.closed:
-            await self._current_session.close()
-            logger.info("Closed LLM session")
+    async def prefill(
+        self, partial_query: str = "", conversation_history: list = None, session_id: Optional[str] = None
+    ) -> bool:
+        """
+        Evaluate the prompt prefix without generating (`n_predict: 0`).
+        
+        Warms the session slot's KV cache with system prompt + history + the
+        stable part of the query, so the final request only has to evaluate
+        the remaining suffix. If the final query diverges, llama.cpp simply
+        reuses the common prefix and overwrites the rest.
+        
+        Args:
+            partial_query: Stable beginning of the user's query ("" = history only)
+            conversation_history: Same history the final generate() call will receive
+            session_id: Session identifier, must match the final request's slot
+            
+        Returns:
+            True if the server evaluated the prefix
+        """
+        if not self.config.cache_prompt:
+            return False
+        
+        history = await self._prepare_history(conversation_history)
+        payload = {
+            "prompt": self.prompt_builder.build_prefix(history, partial_query),
+            "n_predict": 0,
+            "cache_prompt": True,
+            "stream": False,
+        }
+        slot = self.slot_for(session_id)
+        if slot is not None:
+            payload["id_slot"] = slot
+        
+        # Warm the server the final request will go to, and keep the session there
+        endpoint = self.router.pick(session_id)
+        self.router.bind(session_id, endpoint)
+        session = await self._get_session()
+        self.router.acquire(endpoint)
+        try:
+            async with session.post(endpoint.url, json=payload) as response:
+                if response.status != 200:
+                    logger.warning(f"LLM prefill failed: {response.status} {await response.text()}")
+                    return False
+                data = await response.json(content_type=None)
+        finally:
+            self.router.release(endpoint, ok=None)
+        
+        timings = data.get("timings") or {}
+        metrics.increment("llm_speculative_prefill")
+        logger.debug(
+            f"LLM prefill of {len(payload['prompt'])} chars: "
+            f"{timings.get('prompt_n', '?')} tokens in {timings.get('prompt_ms', 0.0):.0f}ms"
+        )
+        return True
+    
+    def start_generation(
+        self, prompt: str, conversation_history: list = None, session_id: Optional[str] = None
+    ) -> GenerationHandle:
+        """
+        Start a generation as an engine-owned task and return its handle.
+        
+        Args:
+            prompt: The user's query
+            conversation_history: Optional conversation context
+            session_id: Optional session identifier for slot pinning
+            
+        Returns:
+            A cancellable handle, iterated to receive tokens
+        """
+        handle = GenerationHandle(
+            self.generate(prompt, conversation_history, session_id),
+            on_done=self._active.discard,
+        )
+        handle.session_id = session_id
+        self._active.add(handle)
+        return handle
+    
+    async def cancel(self, session_id: Optional[str] = None) -> None:
+        """
+        Cancel the in-flight generations started with start_generation().
+        
+        Args:
+            session_id: Only cancel this session's generations (None = all of them)
+        """
+        for handle in list(self._active):
+            if session_id is None or handle.session_id == session_id:
+                await handle.cancel()
 
 
 class LLMStream(ABCLLM):
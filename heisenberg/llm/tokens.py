@@ -0,0 +1,71 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+import aiohttp
+
+from heisenberg.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class TokenCounter:
+    """
+    Exact token counts from llama.cpp's `/tokenize` endpoint, cached per text.
+
+    History messages are re-sent on every turn, so each one is tokenized
+    once and then served from an LRU cache. If the server cannot be reached
+    a rough estimate is returned (and not cached, so the next call retries).
+    """
+
+    CHARS_PER_TOKEN = 4  # Fallback estimate only
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Awaitable[aiohttp.ClientSession]],
+        url: str,
+        max_entries: int = 4096,
+    ):
+        """
+        Args:
+            session_factory: Returns the pooled HTTP session to use
+            url: Full URL of the server's /tokenize route
+            max_entries: Number of texts whose counts are kept
+        """
+        self._session_factory = session_factory
+        self.url = url
+        self.max_entries = max_entries
+        self._counts: "OrderedDict[str, int]" = OrderedDict()
+
+    async def count(self, text: str) -> int:
+        """Number of tokens in `text` (without BOS/special tokens)."""
+        if not text:
+            return 0
+
+        cached = self._counts.get(text)
+        if cached is not None:
+            self._counts.move_to_end(text)
+            return cached
+
+        try:
+            session = await self._session_factory()
+            async with session.post(self.url, json={"content": text, "add_special": False}) as response:
+                if response.status != 200:
+                    raise RuntimeError(f"HTTP {response.status}")
+                data = await response.json(content_type=None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Tokenize request failed, estimating token count: {e}")
+            return len(text) // self.CHARS_PER_TOKEN + 1
+
+        n_tokens = len(data.get("tokens", []))
+        metrics.increment("llm_tokenize")
+        self._counts[text] = n_tokens
+        if len(self._counts) > self.max_entries:
+            self._counts.popitem(last=False)
+        return n_tokens
+
+    def __contains__(self, text: str) -> bool:
+        return text in self._counts
@@ -0,0 +1,554 @@
+import asyncio
+import dataclasses
+import logging
+import time
+from typing import Awaitable, Optional, Set
+
+from heisenberg.core.config import Config, DeviceConfig
+from heisenberg.core.logging import set_correlation_id
+from heisenberg.core.metrics import metrics
+from heisenberg.core.tracing import tracer
+from heisenberg.orchestrator.fsm import FSM
+from heisenberg.orchestrator.router import EventRouter
+from heisenberg.orchestrator.events import Event
+from heisenberg.orchestrator.state import State
+from heisenberg.orchestrator.speculation import SpeculativePrefill
+from heisenberg.audio.buffers import AudioBuffer
+from heisenberg.audio.pipeline import FrameBroadcaster, OverflowPolicy
+from heisenberg.audio.frontend import FrontendProcess
+from heisenberg.satellite.server import RemoteAudioIO
+from heisenberg.stt.service import STTService
+from heisenberg.llm.stream import LlamaCppLLM
+from heisenberg.llm.prompts import PromptBuilder
+from heisenberg.intents import IntentRouter, register_builtin_intents
+from heisenberg.tts.stream import TTSStream
+from heisenberg.tts.piper import PiperTTS
+from heisenberg.tts.voices import VoiceManager
+from heisenberg.tts.cache import PhraseCache
+from heisenberg.tts.chunker import SentenceChunker
+
+logger = logging.getLogger(__name__)
+
+
+class SharedResources:
+    """
+    Models and clients loaded once and used by every assistant pipeline.
+
+    The Whisper model (behind the STTService queue), the LLM client, the
+    Piper voices and phrase cache are shared as is. The wakeword and VAD
+    engines keep per-stream state: the first pipeline gets the loaded
+    engine and the others a `fork()` of it, which reuses its models.
+    """
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.stt = STTService(config.stt)
+        prompt_builder = PromptBuilder(
+            system_prompt=config.llm.system_prompt,
+            format_style="plain"  # Adjust based on your LFM2 model format
+        )
+        self.llm = LlamaCppLLM(config.llm, prompt_builder)
+        self.voices: Optional[VoiceManager] = None
+        self.phrase_cache: Optional[PhraseCache] = None
+        if config.tts.enabled and config.tts.engine == "piper":
+            self.voices = VoiceManager(config.tts)
+            if config.tts.cache_enabled:
+                self.phrase_cache = PhraseCache.from_config(config.tts)
+        self._wakeword = None
+        self._vad = None
+
+    def wakeword_engine(self):
+        """Wakeword detector for one more audio stream (loads the models on first call)."""
+        if self._wakeword is None:
+            from heisenberg.wakeword.engine import OpenWakeWordEngine
+            self._wakeword = OpenWakeWordEngine(self.config.wakeword)
+            return self._wakeword
+        return self._wakeword.fork()
+
+    def vad_engine(self):
+        """VAD for one more audio stream, or None if VAD is disabled."""
+        if not self.config.vad.enabled:
+            return None
+        if self._vad is None:
+            from heisenberg.audio.vad import SileroVADEngine
+            self._vad = SileroVADEngine(self.config.vad)
+            return self._vad
+        return self._vad.fork()
+
+    async def start(self) -> None:
+        await self.llm.start()
+        await self.stt.start()
+        if self.voices is not None and self.config.tts.preload_voice:
+            # Load the default voice off the event loop while the rest starts up
+            self.voices.preload()
+
+    async def close(self) -> None:
+        await self.llm.cancel()
+        await self.llm.aclose()
+        await self.stt.stop()
+        if self.voices is not None:
+            self.voices.close()
+
+
+class AssistantPipeline:
+    """
+    One room: audio devices, FSM, session and endpointing of its own,
+    on top of the SharedResources.
+
+    Several pipelines run side by side on the same event loop. Their
+    transcriptions are scheduled fairly by the shared STTService (one
+    session per pipeline), cancellations only touch the pipeline's own
+    LLM generations, and their metrics are tagged with `instance`.
+
+    Each turn gets a fresh correlation id when it starts (wakeword or
+    barge-in). It follows the turn through the router, the STT service, the
+    LLM and TTS tasks and the logs, and keys the turn's trace: milestones
+    from wakeword to playback end plus the spans of each stage, finished
+    when the FSM returns to IDLE.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        config: Config,
+        device: DeviceConfig,
+        shared: SharedResources,
+        remote: Optional[RemoteAudioIO] = None,
+    ):
+        """
+        Args:
+            name: Instance label (logs, metric tags, STT session)
+            config: Application configuration
+            device: Local audio devices and voice of the room
+            shared: Models and clients shared with the other pipelines
+            remote: Satellite to serve instead of local devices
+        """
+        self.name = name
+        self.config = config = dataclasses.replace(
+            config,
+            audio=dataclasses.replace(
+                config.audio,
+                input_device_index=device.input_device_index,
+                output_device_index=device.output_device_index,
+            ),
+        )
+        self.device = device
+        self.shared = shared
+        self.llm = shared.llm
+        self.tags = {"instance": name}
+        self.running = False  # Devices and FSM started (readiness)
+
+        self.router = EventRouter(tags=self.tags)
+        self.fsm = FSM(router=self.router, tags=self.tags)
+        self.policies = self.fsm.policies
+        self.timeouts = self.policies.timeouts
+
+        # Audio, VAD and engines
+        self.frontend: Optional[FrontendProcess] = None
+        self.remote = remote
+        if remote is not None:
+            # Capture, wakeword detection and playback happen on the satellite
+            self.audio_source = remote
+            self.wakeword_engine = remote.wakeword
+        elif config.audio.frontend_process:
+            # Capture and wakeword detection run in their own process; playback stays here
+            from heisenberg.audio.capture import PyAudioIO
+            self.frontend = FrontendProcess(config, output=PyAudioIO(config.audio))
+            self.audio_source = self.frontend
+            self.wakeword_engine = self.frontend.wakeword
+        else:
+            from heisenberg.audio.capture import PyAudioIO
+            self.audio_source = PyAudioIO(config.audio)
+            self.wakeword_engine = shared.wakeword_engine()
+        self.stt_engine = shared.stt.client(session_id=name)
+        self.vad_engine = shared.vad_engine()
+
+        # Warm the LLM's KV cache while the user is still speaking
+        self.speculation = SpeculativePrefill(self.llm)
+        self.stt_engine.on_partial(self.speculation.update)
+
+        # TTS setup (playback is only simulated when TTS is disabled)
+        if shared.voices is not None:
+            self.tts_engine = PiperTTS(
+                config.tts, self.audio_source, cache=shared.phrase_cache, voices=shared.voices
+            )
+        else:
+            self.tts_engine = TTSStream()
+
+        # Frequent commands are answered locally, without the LLM
+        self.intents = IntentRouter(config.intents)
+        register_builtin_intents(self.intents)
+
+        # Turn state
+        self.was_speaking = False
+        self.final_task: Optional[asyncio.Task] = None
+        self.current_user_query: Optional[str] = None
+        self.llm_response = ""
+        self.turn_epoch = 0  # Bumped on barge-in: the interrupted turn must not touch the FSM or capture
+        self.barge_in_speech_ms = 0.0
+        self.correlation_id: Optional[str] = None  # Current turn
+        self._tasks: Set[asyncio.Task] = set()  # Background work, finished or cancelled by close()
+
+        # The last moments of audio, handed to STT when the user barges in
+        self.preroll = AudioBuffer(self.policies.preroll_ms, sample_rate=16000)
+
+        self.wakeword_engine.on_detected(self._on_wakeword_detected)
+        # Handlers run on their own router tasks, so a turn never blocks the audio loop
+        self.router.subscribe(Event.WAKEWORD_DETECTED, self.on_wakeword)
+        self.router.subscribe(Event.INTERRUPT, self.on_interrupt, timeout=None)
+        self.router.subscribe(Event.TIMEOUT, self.on_timeout, timeout=None)
+        self.router.subscribe(
+            Event.TRANSCRIPTION_FINAL,
+            self.on_transcription_final,
+            timeout=self.timeouts.llm_generation + self.timeouts.tts_playback,
+        )
+        self.stt_engine.on_final(self._on_stt_final)
+        self.fsm.on_enter(State.IDLE, self._end_turn)
+        self.broadcaster = self._build_broadcaster()
+
+    @property
+    def session_id(self) -> str:
+        return self.fsm.session_manager.current_session.session_id
+
+    async def cancel_generation(self) -> None:
+        """Cancel this pipeline's LLM generations (other rooms keep theirs)."""
+        session = self.fsm.session_manager.current_session
+        if session is not None:
+            await self.llm.cancel(session.session_id)
+
+    def _build_broadcaster(self) -> FrameBroadcaster:
+        # Every stage gets each captured frame on its own task, behind its own queue;
+        # the FSM state decides which stages are listening
+        broadcaster = FrameBroadcaster(self.audio_source, tags=self.tags)
+        queue_frames = self.config.audio.consumer_queue_frames
+        barge_in_states = {State.THINKING, State.SPEAKING} if self.policies.allow_barge_in else set()
+        broadcaster.add_consumer("recorder", self.record_preroll, queue_size=queue_frames)
+        if self.remote:
+            # Streaming on through THINKING and SPEAKING keeps the pre-roll fresh for barge-in
+            self.remote.bind(
+                self.fsm, wakeword_states={State.IDLE} | barge_in_states,
+                stream_states={State.LISTENING} | barge_in_states,
+            )
+        elif self.frontend:
+            self.frontend.bind(self.fsm, wakeword_states={State.IDLE} | barge_in_states)
+        else:
+            broadcaster.add_consumer(
+                "wakeword", self.wakeword_engine.feed_audio,
+                states={State.IDLE} | barge_in_states, queue_size=queue_frames,
+            )
+        # A gap would corrupt the transcript: on overflow, keep the start of the utterance intact
+        broadcaster.add_consumer(
+            "stt", self.stt_engine.feed_audio, states={State.LISTENING},
+            queue_size=queue_frames, overflow=OverflowPolicy.DROP_NEWEST,
+        )
+        if self.vad_engine:
+            vad_states = {State.LISTENING}
+            if self.policies.allow_barge_in and self.policies.barge_in_vad:
+                vad_states.add(State.SPEAKING)
+            broadcaster.add_consumer("vad", self.detect_speech, states=vad_states, queue_size=queue_frames)
+        broadcaster.bind(self.fsm)
+        return broadcaster
+
+    def _begin_turn(self, trigger: str) -> None:
+        """Fresh correlation id and trace for the turn starting now."""
+        session = self.fsm.session_manager.current_session
+        self.correlation_id = session.fresh_correlation_id()
+        set_correlation_id(self.correlation_id)
+        tracer.start(self.correlation_id, instance=self.name, session_id=session.session_id, trigger=trigger)
+        tracer.mark("wakeword")
+
+    async def _end_turn(self, old_state: State, new_state: State) -> None:
+        record = self.fsm.history[-1] if self.fsm.history else None
+        outcome = record.event.name.lower() if record and record.event else "forced"
+        tracer.finish(self.correlation_id, outcome=outcome)
+
+    async def barge_in(self, source: str):
+        # Bumped before the FSM moves to LISTENING, so the running turn stands down at once
+        self.turn_epoch += 1
+        tracer.finish(self.correlation_id, outcome="interrupted")
+        self._begin_turn(f"barge_in:{source}")
+        await self.fsm.handle_event(Event.INTERRUPT, source, time.perf_counter())
+
+    async def _on_wakeword_detected(self):
+        if self.fsm.state in (State.THINKING, State.SPEAKING):
+            if self.policies.allow_barge_in:
+                await self.barge_in("wakeword")
+        else:
+            if self.fsm.state == State.IDLE:
+                self._begin_turn("wakeword")
+            await self.fsm.handle_event(Event.WAKEWORD_DETECTED)
+
+    async def begin_listening(self, preroll_audio: bytes = b""):
+        self.was_speaking = False
+        self.current_user_query = None
+        self.llm_response = ""
+        await self.stt_engine.start_stream()
+        if preroll_audio:
+            await self.stt_engine.feed_audio(preroll_audio)
+        if self.vad_engine:
+            self.vad_engine.reset()
+        self.speculation.begin(self.fsm.session_manager.get_conversation_history(), self.session_id)
+        # The FSM's LISTENING deadline (Policies.timeouts.stt_silence) is the fail-safe
+
+    async def on_wakeword(self):
+        logger.info(f"[{self.name}] Wakeword detected handler: Starting STT stream")
+        await self.begin_listening()
+
+    async def on_interrupt(self, source: str, detected_at: float):
+        # The FSM is already in LISTENING
+        logger.info(f"[{self.name}] Barge-in ({source}): cancelling the current turn")
+        await self.tts_engine.stop()
+        # Bounded: past barge_in seconds the generation finishes cancelling in the background
+        cancelling = self._spawn(self.cancel_generation(), "cancel generation")
+        done, _ = await asyncio.wait([cancelling], timeout=self.timeouts.barge_in)
+        if not done:
+            logger.warning(f"LLM cancellation still running after {self.timeouts.barge_in}s, listening anyway")
+        await self.audio_source.start()
+        await self.begin_listening(self.preroll.read())
+
+        metrics.increment("barge_in", {**self.tags, "source": source})
+        metrics.record_latency("barge_in_to_listening", (time.perf_counter() - detected_at) * 1000, self.tags)
+
+    async def on_transcription_final(self, text: str):
+        fsm = self.fsm
+        self.current_user_query = text
+        logger.info(f"[{self.name}] Transcription final: {text}")
+        if not text.strip():
+            # The FSM went straight back to IDLE: audio capture was never stopped
+            logger.info("Empty transcription, nothing to answer.")
+            return
+        received_at = time.perf_counter()
+        epoch = self.turn_epoch
+
+        def interrupted() -> bool:
+            return epoch != self.turn_epoch
+
+        # Text is spoken clause by clause as it streams in, not once the answer is complete
+        chunker = SentenceChunker.from_config(self.config.tts)
+
+        async def speak(chunks):
+            if interrupted():
+                return
+            for chunk in chunks:
+                if fsm.state != State.SPEAKING:
+                    metrics.record_latency(
+                        "time_to_first_audio", (time.perf_counter() - received_at) * 1000, self.tags
+                    )
+                    tracer.mark("tts_start")
+                    await fsm.handle_event(Event.TTS_START)
+                # Queued: the engine synthesizes the next chunk while this one plays
+                await self.tts_engine.speak(chunk)
+
+        try:
+            if not self.policies.allow_barge_in:
+                # Without barge-in, the mic is closed while thinking and speaking
+                # so that it does not pick up the TTS output
+                await self.audio_source.stop()
+
+            # Get conversation history from session manager
+            # (the LLM trims it to max_history_turns and max_prompt_tokens in KV-cache friendly blocks)
+            history = fsm.session_manager.get_conversation_history()
+            session_id = self.session_id
+
+            with tracer.span("intent_match") as span:
+                intent = await self.intents.handle(text)
+                span["matched"] = intent is not None
+            if intent is not None:
+                # Answered locally: the speculative prefill is not needed, and the
+                # exchange is kept out of the LLM history so its cached prefix stays valid
+                self.speculation.reset()
+                self.llm_response = intent.response
+                await speak(chunker.feed(self.llm_response) + chunker.flush())
+            else:
+                await self.speculation.resolve(text)
+
+                # Start LLM generation with streaming
+                logger.info("Starting LLM generation...")
+                turn_start = time.perf_counter()
+                response_tokens = []
+                first_token = True
+
+                # The engine owns the generation task; cancel_generation() stops it from anywhere
+                generation = self.llm.start_generation(text, conversation_history=history, session_id=session_id)
+                async for token in generation:
+                    response_tokens.append(token)
+
+                    # Emit LLM_TOKEN event for first token (for latency tracking)
+                    if first_token:
+                        logger.info("First LLM token received")
+                        tracer.mark("llm_first_token")
+                        await self.router.dispatch(Event.LLM_TOKEN, token)
+                        first_token = False
+
+                    await speak(chunker.feed(token))
+
+                self.llm_response = "".join(response_tokens)
+                tracer.record_span(
+                    "llm_generation", turn_start, time.perf_counter(),
+                    tokens=len(response_tokens), cancelled=generation.cancelled,
+                )
+                if generation.cancelled:
+                    logger.info("LLM generation was cancelled, dropping this turn.")
+                    if not interrupted():
+                        await self.tts_engine.stop()
+                        await self.audio_source.start()
+                        await fsm.transition(State.IDLE)
+                    return
+                await speak(chunker.flush())
+                logger.info(f"[{self.name}] LLM generation complete. Full response:\n{self.llm_response}")
+
+                # Emit LLM_COMPLETE event
+                await self.router.dispatch(Event.LLM_COMPLETE, self.llm_response)
+
+                # Store conversation turn in session
+                fsm.session_manager.add_conversation_turn(self.current_user_query, self.llm_response)
+                self.intents.observe_llm_latency((time.perf_counter() - turn_start) * 1000)
+
+            if interrupted():
+                return
+            if fsm.state != State.SPEAKING:
+                # Nothing was spoken (e.g. an empty answer)
+                await fsm.handle_event(Event.TTS_START)
+
+            # Wait for the queued audio to finish playing
+            await self.tts_engine.wait_idle()
+            if interrupted():
+                return
+            tracer.mark("playback_end")
+
+            # Send TTS_COMPLETE event
+            await fsm.handle_event(Event.TTS_COMPLETE)
+
+            # Restart audio capture ONLY after we are done speaking
+            # This prevents the mic from picking up the TTS output (Echo Cancellation via brute force)
+            logger.info("TTS complete. Re-opening ear (starting audio capture).")
+            await self.audio_source.start()
+
+            await fsm.transition(State.IDLE)
+            logger.info(f"[{self.name}] System returned to IDLE state. Ready for next command.")
+
+        except asyncio.CancelledError:
+            # Turn abandoned (handler timeout or shutdown): silence it and re-open the ear
+            logger.warning("Turn cancelled before completion.")
+            await self.cancel_generation()
+            if not interrupted():
+                await self.tts_engine.stop()
+                await self.audio_source.start()
+                await fsm.transition(State.IDLE)
+            raise
+        except Exception as e:
+            logger.error(f"Error during LLM processing: {e}", exc_info=True)
+            if not interrupted():
+                await fsm.transition(State.IDLE)
+
+    async def on_timeout(self, state: State):
+        if state == State.LISTENING:
+            logger.info(f"Fail-safe timeout reached ({self.timeouts.stt_silence}s). Force stopping STT.")
+            if self.final_task is not None and not self.final_task.done():
+                # The VAD already ended the utterance: its decode decides where the turn goes
+                await asyncio.gather(self.final_task, return_exceptions=True)
+            else:
+                tracer.mark("speech_end")
+                await self.stt_engine.stop_stream()
+            if self.fsm.state == State.LISTENING:
+                # Nothing was transcribed: go back to waiting for the wakeword
+                await self.fsm.transition(State.IDLE)
+        else:
+            # The FSM is already back to IDLE: cut the turn short, it restores audio capture
+            logger.warning(f"{state.name} timeout reached. Abandoning the turn.")
+            await self.cancel_generation()
+            await self.tts_engine.stop()
+
+    async def _on_stt_final(self, text: str):
+        tracer.mark("stt_done")
+        # Moves the FSM to THINKING and queues the turn; returns without waiting for it
+        await self.fsm.handle_event(Event.TRANSCRIPTION_FINAL, text)
+
+    async def record_preroll(self, frame: bytes):
+        self.preroll.write(frame)
+
+    async def detect_speech(self, frame: bytes):
+        is_currently_speaking = self.vad_engine.is_speech(frame)
+
+        if self.fsm.state == State.LISTENING:
+            # Detect transition from speaking to silent
+            if self.was_speaking and not is_currently_speaking:
+                # This consumer task outlives turns: the final decode must carry the current one
+                set_correlation_id(self.correlation_id)
+                tracer.mark("speech_end")
+                logger.info("Silence detected. Stopping STT stream.")
+                # The final decode runs in the background; capture goes on
+                self.final_task = self._spawn(self.stt_engine.stop_stream(), "final transcription")
+            self.was_speaking = is_currently_speaking
+
+        elif self.fsm.state == State.SPEAKING:
+            # Sustained speech over the answer interrupts it
+            if is_currently_speaking:
+                self.barge_in_speech_ms += len(frame) / 32  # 16kHz int16: 32 bytes per ms
+                if self.barge_in_speech_ms >= self.policies.barge_in_min_speech_ms:
+                    self.barge_in_speech_ms = 0.0
+                    await self.barge_in("vad")
+            else:
+                self.barge_in_speech_ms = 0.0
+
+    async def run(self) -> None:
+        """Start the room's devices and run its audio loop until stopped."""
+        try:
+            if isinstance(self.tts_engine, PiperTTS):
+                if self.device.voice:
+                    await self.tts_engine.set_voice(self.device.voice)
+                # Fixed prompts are synthesized once, then always played from the cache
+                self._spawn(self.tts_engine.prewarm(self.config.tts.prewarm_phrases), "TTS prewarm")
+            await self.audio_source.start()
+            await self.wakeword_engine.start()
+            await self.fsm.start()
+            self.running = True
+
+            logger.info(f"[{self.name}] Listening for wakeword...")
+
+            # Central audio loop: fans each frame out to the consumers' own tasks
+            await self.broadcaster.run()
+        except Exception as e:
+            logger.error(f"[{self.name}] Error in main loop: {e}", exc_info=True)
+        finally:
+            await self.close()
+
+    def request_stop(self) -> None:
+        """Stop the room from a signal handler, without waiting."""
+        self._spawn(self.audio_source.stop(), "stop audio")
+        self._spawn(self.wakeword_engine.stop(), "stop wakeword")
+        self._spawn(self.stt_engine.stop_stream(), "stop STT")
+        self._spawn(self.cancel_generation(), "cancel generation")
+        self._spawn(self.tts_engine.stop(), "stop TTS")
+
+    def _spawn(self, coro: Awaitable, what: str) -> asyncio.Task:
+        """Run `coro` in the background, keeping a reference and logging its failure."""
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+
+        def done(task: asyncio.Task) -> None:
+            self._tasks.discard(task)
+            if not task.cancelled() and task.exception() is not None:
+                logger.error(f"[{self.name}] {what} failed: {task.exception()}", exc_info=task.exception())
+
+        task.add_done_callback(done)
+        return task
+
+    async def close(self) -> None:
+        self.running = False
+        await self.broadcaster.stop()
+        await self.fsm.stop()
+        await self.router.close()
+        if isinstance(self.tts_engine, PiperTTS):
+            # Also hands its voice back to the pool shared with the other rooms
+            await self.tts_engine.close()
+        else:
+            await self.tts_engine.stop()
+        await self.audio_source.close()
+        await self.wakeword_engine.stop()
+        await self.cancel_generation()
+        # Everything above is stopped: what is left in the background is moot
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,61 +1,204 @@
 import logging
 import asyncio
-from typing import Optional
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
 
 from heisenberg.orchestrator.state import State
 from heisenberg.orchestrator.events import Event
 from heisenberg.orchestrator.router import EventRouter
 from heisenberg.orchestrator.policies import Policies
 from heisenberg.orchestrator.session import SessionManager
+from heisenberg.core.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
+Guard = Callable[..., bool]
+StateHook = Callable[[State, State], Awaitable[None]]
+
+
+@dataclass(frozen=True)
+class Transition:
+    """Row of the transition table: `event` in `source` moves to `target` if `guard` allows it."""
+    source: State
+    event: Event
+    target: State
+    guard: Optional[Guard] = None  # Called with the event arguments
+
+
+@dataclass(frozen=True)
+class TransitionRecord:
+    """Entry of the FSM history."""
+    timestamp: float  # time.time() of the transition
+    source: State
+    target: State
+    event: Optional[Event]  # None for forced transitions
+    duration_ms: float  # Time spent in `source`
+
+
+def _has_text(text: str = "", *args, **kwargs) -> bool:
+    return bool(text and text.strip())
+
+
+# First matching row wins
+TRANSITIONS: List[Transition] = [
+    Transition(State.IDLE, Event.WAKEWORD_DETECTED, State.LISTENING),
+    Transition(State.LISTENING, Event.TRANSCRIPTION_FINAL, State.THINKING, guard=_has_text),
+    Transition(State.LISTENING, Event.TRANSCRIPTION_FINAL, State.IDLE),  # Nothing understood
+    Transition(State.THINKING, Event.TTS_START, State.SPEAKING),
+    Transition(State.THINKING, Event.TTS_COMPLETE, State.IDLE),
+    Transition(State.SPEAKING, Event.TTS_COMPLETE, State.IDLE),
+    Transition(State.THINKING, Event.INTERRUPT, State.LISTENING),  # Barge-in
+    Transition(State.SPEAKING, Event.INTERRUPT, State.LISTENING),
+    Transition(State.THINKING, Event.TIMEOUT, State.IDLE),
+    Transition(State.SPEAKING, Event.TIMEOUT, State.IDLE),
+    Transition(State.LISTENING, Event.ERROR_OCCURRED, State.IDLE),
+    Transition(State.THINKING, Event.ERROR_OCCURRED, State.IDLE),
+    Transition(State.SPEAKING, Event.ERROR_OCCURRED, State.IDLE),
+]
+
+# Events that start work in the state they lead to: when none of their rows
+# applies (e.g. a final transcription arriving after the LISTENING deadline
+# sent the FSM back to IDLE), they are dropped instead of published
+TRANSITION_ONLY_EVENTS = frozenset({Event.TRANSCRIPTION_FINAL})
+
+# State -> Timeouts attribute holding its deadline in seconds (0 = none)
+STATE_TIMEOUTS: Dict[State, str] = {
+    State.IDLE: "wakeword_listen",
+    State.LISTENING: "stt_silence",
+    State.THINKING: "llm_generation",
+    State.SPEAKING: "tts_playback",
+}
+
+
 class FSM:
-    def __init__(self, router: EventRouter, policies: Policies = None):
+    """
+    Table-driven state machine of the conversation.
+
+    `handle_event` looks the (state, event) pair up in the transition table,
+    runs the on_exit hooks of the old state and the on_enter hooks of the
+    new one, then publishes the event to the router. Each state with a
+    deadline in `Policies.timeouts` arms a timer on entry that feeds
+    `Event.TIMEOUT` (with the expired state as argument) back into the FSM.
+    Time spent in each state is recorded as the `fsm_state_time` latency and
+    the last transitions are kept in `history`.
+    """
+
+    def __init__(
+        self,
+        router: EventRouter,
+        policies: Policies = None,
+        transitions: Optional[List[Transition]] = None,
+        history_size: int = 100,
+        tags: Optional[Dict[str, str]] = None,
+    ):
         self.state = State.IDLE
+        self.tags = dict(tags or {})  # Added to every metric (e.g. the pipeline instance)
         self.router = router
         self.policies = policies or Policies()
         self.session_manager = SessionManager()
+        self.transitions = list(transitions if transitions is not None else TRANSITIONS)
+        self.history: Deque[TransitionRecord] = deque(maxlen=history_size)
+        self._entered_at = time.perf_counter()
+        self._on_enter: Dict[State, List[StateHook]] = {}
+        self._on_exit: Dict[State, List[StateHook]] = {}
+        self._timer: Optional[asyncio.Task] = None
 
-    async def transition(self, new_state: State):
+    def on_enter(self, state: State, hook: StateHook) -> None:
+        """Run `hook(old_state, new_state)` each time `state` is entered."""
+        self._on_enter.setdefault(state, []).append(hook)
+
+    def on_exit(self, state: State, hook: StateHook) -> None:
+        """Run `hook(old_state, new_state)` each time `state` is left."""
+        self._on_exit.setdefault(state, []).append(hook)
+
+    def find_transition(self, event: Event, *args, **kwargs) -> Optional[Transition]:
+        for row in self.transitions:
+            if row.source == self.state and row.event == event:
+                if row.guard is None or row.guard(*args, **kwargs):
+                    return row
+        return None
+
+    def time_in_state_ms(self) -> float:
+        return (time.perf_counter() - self._entered_at) * 1000
+
+    async def transition(self, new_state: State, event: Optional[Event] = None):
+        """Move to `new_state`, bypassing the table (forced transitions use this directly)."""
         if self.state == new_state:
             return
 
         old_state = self.state
+        duration_ms = self.time_in_state_ms()
+        self._cancel_timer()
+        await self._run_hooks(self._on_exit.get(old_state, []), old_state, new_state)
+
         self.state = new_state
-        logger.info(f"FSM Transition: {old_state.name} -> {new_state.name}", 
+        self._entered_at = time.perf_counter()
+        self.history.append(TransitionRecord(time.time(), old_state, new_state, event, duration_ms))
+        metrics.record_latency("fsm_state_time", duration_ms, {**self.tags, "state": old_state.name})
+        logger.info(f"FSM Transition: {old_state.name} -> {new_state.name} "
+                    f"({event.name if event else 'forced'}, {duration_ms:.0f}ms in {old_state.name})",
                     extra={"old_state": old_state.name, "new_state": new_state.name})
 
-        # Hook for state entry logic if needed (or dispatch a STATE_CHANGED event)
+        self._arm_timer(new_state)
+        await self._run_hooks(self._on_enter.get(new_state, []), old_state, new_state)
 
-    async def handle_event(self, event: Event, *args, **kwargs):
+    async def handle_event(self, event: Event, *args, **kwargs) -> Optional[Transition]:
         """
-        Main entry point for events into the FSM. 
-        Validation of transitions can happen here.
+        Main entry point for events into the FSM.
+
+        Applies the matching transition, if any, then publishes the event to
+        the router's subscribers (whether or not the state changed, except
+        for `TRANSITION_ONLY_EVENTS`, which are dropped without a transition).
+
+        Returns:
+            The transition taken, or None
         """
-        # Example validation: simpler for now, just dispatch
-        if event == Event.WAKEWORD_DETECTED:
-            if self.state == State.IDLE: # Only valid from IDLE? Or barge-in?
-                await self.transition(State.LISTENING)
-        
-        elif event == Event.TRANSCRIPTION_FINAL:
-             if self.state == State.LISTENING:
-                 await self.transition(State.THINKING)
-        
-        elif event == Event.LLM_TOKEN and self.state == State.THINKING:
-             # First token signifies we might start speaking or buffering
-             pass 
-             
-        elif event == Event.TTS_START:
-             await self.transition(State.SPEAKING)
-
-        elif event == Event.TTS_COMPLETE:
-             await self.transition(State.IDLE)
-        
+        row = self.find_transition(event, *args, **kwargs)
+        if row is not None:
+            await self.transition(row.target, event)
+        else:
+            logger.debug(f"FSM: no transition for {event.name} in {self.state.name}")
+            if event in TRANSITION_ONLY_EVENTS:
+                metrics.increment("fsm_event_dropped", {**self.tags, "event": event.name, "state": self.state.name})
+                return None
+
         # Dispatch to registered handlers to do the actual work
         await self.router.dispatch(event, *args, **kwargs)
+        return row
 
     async def start(self):
         logger.info("FSM Started")
         self.session_manager.start_new_session()
         await self.transition(State.IDLE)
+
+    async def stop(self):
+        self._cancel_timer()
+
+    async def _run_hooks(self, hooks: List[StateHook], old_state: State, new_state: State) -> None:
+        for hook in hooks:
+            try:
+                await hook(old_state, new_state)
+            except Exception as e:
+                logger.error(f"FSM hook {getattr(hook, '__qualname__', hook)} failed: {e}", exc_info=True)
+
+    def _arm_timer(self, state: State) -> None:
+        attribute = STATE_TIMEOUTS.get(state)
+        seconds = getattr(self.policies.timeouts, attribute, 0.0) if attribute else 0.0
+        if seconds > 0:
+            self._timer = asyncio.create_task(self._expire(state, seconds))
+
+    def _cancel_timer(self) -> None:
+        if self._timer and self._timer is not asyncio.current_task():
+            self._timer.cancel()
+        self._timer = None
+
+    async def _expire(self, state: State, seconds: float) -> None:
+        await asyncio.sleep(seconds)
+        if self.state != state:
+            return
+        self._timer = None
+        logger.warning(f"FSM: {state.name} deadline of {seconds}s reached")
+        metrics.increment("fsm_timeout", {**self.tags, "state": state.name})
+        await self.handle_event(Event.TIMEOUT, state)
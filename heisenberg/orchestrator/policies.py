@@ -3,14 +3,18 @@ from dataclasses import dataclass, field
 @dataclass
 class Timeouts:
     wakeword_listen: float = 0.0 # 0 = infinite
-    stt_silence: float = 2.0
+    stt_silence: float = 10.0 # Fail-safe: STT is force-stopped after this long in LISTENING (VAD normally ends it first)
     llm_generation: float = 30.0
     tts_playback: float = 60.0
+    barge_in: float = 0.3 # Bound on cancelling the turn when interrupted; listening starts anyway
 
 @dataclass
 class Policies:
     timeouts: Timeouts = field(default_factory=Timeouts)
-    allow_barge_in: bool = True
+    allow_barge_in: bool = True # Wakeword interrupts THINKING/SPEAKING
+    barge_in_vad: bool = False # Sustained speech (VAD) also interrupts SPEAKING
+    barge_in_min_speech_ms: int = 300
+    preroll_ms: int = 1000 # Audio before the interrupt handed to STT
     
     # Retry policies could go here
     max_retries: int = 3
@@ -1,28 +1,192 @@
+import asyncio
 import logging
-from typing import Callable, Dict, Awaitable, Any
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Awaitable, Any, List, Optional
 
 from heisenberg.orchestrator.events import Event
-from heisenberg.core.logging import get_correlation_id
+from heisenberg.core.logging import get_correlation_id, set_correlation_id
+from heisenberg.core.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
 EventHandler = Callable[..., Awaitable[Any]]
 
+
+@dataclass
+class Subscription:
+    """One handler subscribed to one event, with its own queue and worker task."""
+    event: Event
+    handler: EventHandler
+    name: str
+    timeout: Optional[float]  # Seconds, None = no limit
+    queue: asyncio.Queue
+    task: Optional[asyncio.Task] = None
+    dropped: int = 0
+    max_depth: int = 0
+    tags: Dict[str, str] = field(default_factory=dict)
+
+
 class EventRouter:
-    def __init__(self):
-        self._handlers: Dict[Event, EventHandler] = {}
+    """
+    Publish/subscribe event bus.
+
+    Any number of handlers can subscribe to an event. `dispatch` never waits
+    for them: each event is put on a bounded queue per subscriber and the
+    subscriber's worker task runs its handler, events in order, one at a time.
+    A slow handler therefore only delays its own queue, never the publisher
+    (e.g. the audio loop); when its queue is full, new events for it are
+    dropped and counted. Handlers run with the correlation id active at
+    publish time, under an optional timeout, and their errors are logged
+    without affecting other subscribers.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = 32,
+        default_timeout: Optional[float] = 5.0,
+        tags: Optional[Dict[str, str]] = None,
+    ):
+        """
+        Args:
+            queue_size: Pending events kept per subscriber
+            default_timeout: Handler timeout in seconds when subscribe() gives none (None = no limit)
+            tags: Added to every metric (e.g. the pipeline instance)
+        """
+        self.queue_size = queue_size
+        self.default_timeout = default_timeout
+        self.tags = dict(tags or {})
+        self._subscriptions: Dict[Event, List[Subscription]] = {}
+
+    def subscribe(
+        self,
+        event: Event,
+        handler: EventHandler,
+        timeout: Optional[float] = -1,
+        queue_size: Optional[int] = None,
+        name: Optional[str] = None,
+    ) -> Subscription:
+        """
+        Add a handler for an event.
+
+        Args:
+            timeout: Handler timeout in seconds (-1 = router default, None = no limit)
+            queue_size: Pending events kept for this handler (router default if None)
+            name: Label used in logs and metrics (handler's name if None)
+        """
+        name = name or getattr(handler, "__qualname__", None) or repr(handler)
+        subscription = Subscription(
+            event=event,
+            handler=handler,
+            name=name,
+            timeout=self.default_timeout if timeout == -1 else timeout,
+            queue=asyncio.Queue(maxsize=queue_size or self.queue_size),
+            tags={**self.tags, "event": event.name, "handler": name},
+        )
+        self._subscriptions.setdefault(event, []).append(subscription)
+        return subscription
+
+    def register(self, event: Event, handler: EventHandler) -> Subscription:
+        """Alias of subscribe(); handlers registered for the same event all run."""
+        return self.subscribe(event, handler)
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscriptions.get(subscription.event, [])
+        if subscription in subscriptions:
+            subscriptions.remove(subscription)
+        if subscription.task:
+            subscription.task.cancel()
 
-    def register(self, event: Event, handler: EventHandler):
-        self._handlers[event] = handler
+    def subscribers(self, event: Event) -> List[Subscription]:
+        return list(self._subscriptions.get(event, []))
 
-    async def dispatch(self, event: Event, *args, **kwargs):
-        handler = self._handlers.get(event)
-        if handler:
+    def publish(self, event: Event, *args, **kwargs) -> int:
+        """
+        Queue an event for every subscriber and return immediately.
+
+        Returns:
+            Number of subscribers the event was queued for
+        """
+        subscriptions = self._subscriptions.get(event)
+        if not subscriptions:
+            logger.debug(f"No subscriber for event {event.name}")
+            return 0
+
+        item = (time.perf_counter(), get_correlation_id(), args, kwargs)
+        queued = 0
+        for subscription in subscriptions:
+            try:
+                subscription.queue.put_nowait(item)
+            except asyncio.QueueFull:
+                subscription.dropped += 1
+                metrics.increment("event_dropped", subscription.tags)
+                logger.warning(
+                    f"Event {event.name} dropped for {subscription.name}: queue full "
+                    f"({subscription.queue.maxsize} pending)"
+                )
+                continue
+            queued += 1
+            depth = subscription.queue.qsize()
+            subscription.max_depth = max(subscription.max_depth, depth)
+            metrics.set_gauge("event_queue_depth", depth, subscription.tags)
+            self._ensure_worker(subscription)
+        return queued
+
+    async def dispatch(self, event: Event, *args, **kwargs) -> int:
+        """Awaitable form of publish(); does not wait for the handlers either."""
+        return self.publish(event, *args, **kwargs)
+
+    def _ensure_worker(self, subscription: Subscription) -> None:
+        if subscription.task is None or subscription.task.done():
+            subscription.task = asyncio.get_running_loop().create_task(self._worker(subscription))
+
+    async def _worker(self, subscription: Subscription) -> None:
+        queue = subscription.queue
+        while True:
+            queued_at, correlation_id, args, kwargs = await queue.get()
+            metrics.set_gauge("event_queue_depth", queue.qsize(), subscription.tags)
+            metrics.record_latency(
+                "event_dispatch", (time.perf_counter() - queued_at) * 1000, subscription.tags
+            )
+            # The worker task has its own context: this does not leak to the publisher
+            set_correlation_id(correlation_id)
             try:
-                logger.debug(f"Dispatching event {event.name}", extra={"event": event.name})
-                await handler(*args, **kwargs)
+                logger.debug(f"Dispatching event {subscription.event.name} to {subscription.name}",
+                             extra={"event": subscription.event.name})
+                if subscription.timeout is None:
+                    await subscription.handler(*args, **kwargs)
+                else:
+                    await asyncio.wait_for(subscription.handler(*args, **kwargs), subscription.timeout)
+            except asyncio.TimeoutError:
+                metrics.increment("event_handler_timeout", subscription.tags)
+                logger.error(
+                    f"Handler {subscription.name} for event {subscription.event.name} "
+                    f"timed out after {subscription.timeout}s"
+                )
             except Exception as e:
-                logger.error(f"Error handling event {event.name}: {e}", exc_info=True)
-                # In a real app, we might want to re-raise or trigger an error event
-        else:
-            logger.warning(f"No handler for event {event.name}")
+                metrics.increment("event_handler_error", subscription.tags)
+                logger.error(f"Error handling event {subscription.event.name} in {subscription.name}: {e}",
+                             exc_info=True)
+            finally:
+                queue.task_done()
+
+    async def join(self) -> None:
+        """Wait until every event published so far has been handled."""
+        await asyncio.gather(
+            *(s.queue.join() for subscriptions in self._subscriptions.values() for s in subscriptions)
+        )
+
+    async def close(self) -> None:
+        """Stop all workers; pending events are discarded."""
+        tasks = [
+            s.task for subscriptions in self._subscriptions.values() for s in subscriptions if s.task
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for subscriptions in self._subscriptions.values():
+            for s in subscriptions:
+                s.task = None
+                while not s.queue.empty():
+                    s.queue.get_nowait()
+                    s.queue.task_done()
@@ -0,0 +1,101 @@
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+
+from heisenberg.core.metrics import metrics
+from heisenberg.llm.stream import LlamaCppLLM
+
+logger = logging.getLogger(__name__)
+
+
+class SpeculativePrefill:
+    """
+    Sends the prompt prefix to llama.cpp while the user is still speaking.
+
+    - On wakeword: prefill system prompt + history, known before the user speaks.
+    - On partial transcripts: prefill up to the words two consecutive partials
+      agree on (Whisper keeps rewriting the tail, the head is stable).
+    - On the final transcript: keep the work if the final text extends the
+      speculated prefix, otherwise cancel whatever is still in flight. The
+      final request overwrites the diverging part of the slot's cache.
+    """
+
+    def __init__(self, llm: LlamaCppLLM, min_new_words: int = 2):
+        self.llm = llm
+        self.min_new_words = min_new_words
+        self.active = False
+        self._history: List[Tuple[str, str]] = []
+        self._session_id: Optional[str] = None
+        self._previous_words: List[str] = []
+        self._speculated: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def begin(self, history: List[Tuple[str, str]], session_id: Optional[str]) -> None:
+        """Start speculating for a new turn (call when listening starts)."""
+        self.reset()
+        self.active = True
+        self._history = history
+        self._session_id = session_id
+        self._launch("")
+
+    async def update(self, partial_text: str) -> None:
+        """Feed a partial transcript; usable directly as an STT on_partial callback."""
+        if not self.active:
+            return
+
+        words = partial_text.split()
+        stable = []
+        for word, previous in zip(words, self._previous_words):
+            if word != previous:
+                break
+            stable.append(word)
+        self._previous_words = words
+
+        speculated_words = len(self._speculated.split()) if self._speculated else 0
+        if len(stable) - speculated_words >= self.min_new_words:
+            self._launch(" ".join(stable))
+
+    async def resolve(self, final_text: str) -> bool:
+        """
+        Settle speculation against the final transcript.
+
+        Returns:
+            True if the speculated prefix is a prefix of the final query
+        """
+        if not self.active:
+            return False
+        self.active = False
+
+        hit = self._speculated is not None and final_text.strip().startswith(self._speculated)
+        if not hit and self._task and not self._task.done():
+            # Diverged: stop evaluating a prefix the final request will not use
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+        metrics.increment("llm_speculation", tags={"outcome": "hit" if hit else "miss"})
+        logger.info(f"Speculative prefill {'hit' if hit else 'discarded'} (prefix: '{self._speculated}')")
+        return hit
+
+    def reset(self) -> None:
+        """Drop any in-flight speculation (e.g. on timeout or interruption)."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self.active = False
+        self._previous_words = []
+        self._speculated = None
+        self._task = None
+
+    def _launch(self, text: str) -> None:
+        # Only the most recent prefix is worth evaluating
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._speculated = text
+        self._task = asyncio.create_task(self._run(text))
+
+    async def _run(self, text: str) -> None:
+        try:
+            await self.llm.prefill(text, self._history, self._session_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug(f"Speculative prefill failed: {e}")
@@ -0,0 +1,267 @@
+import asyncio
+import logging
+import socket
+from collections import deque
+from typing import Deque, Optional
+
+import aiohttp
+
+from heisenberg.interfaces.audio import ABCAudioIO
+from heisenberg.interfaces.wakeword import ABCWakeword
+from heisenberg.core.config import Config, SatelliteConfig
+from heisenberg.core.exceptions import AudioError
+from heisenberg.core.metrics import metrics
+from heisenberg.satellite.protocol import SAMPLE_RATE, decode_audio, decode_control, encode_audio, encode_control
+
+logger = logging.getLogger(__name__)
+
+
+class PlayoutBuffer:
+    """
+    Jitter buffer in front of the speaker.
+
+    Playback starts once `prebuffer_ms` of audio is queued, so frames
+    arriving unevenly from the network still play back to back. A short
+    stream (the end of an answer) plays anyway once no more audio came for
+    `prebuffer_ms`. Beyond `max_ms`, the oldest audio is dropped.
+    """
+
+    def __init__(self, prebuffer_ms: int = 60, max_ms: int = 2000):
+        self.prebuffer_ms = prebuffer_ms
+        self.max_bytes = max_ms * SAMPLE_RATE // 1000 * 2
+        self.prebuffer_bytes = prebuffer_ms * SAMPLE_RATE // 1000 * 2
+        self.dropped = 0
+        self._frames: Deque[bytes] = deque()
+        self._bytes = 0
+        self._playing = False
+        self._ready = asyncio.Event()
+
+    @property
+    def buffered_ms(self) -> float:
+        return self._bytes / (SAMPLE_RATE * 2) * 1000
+
+    def put(self, frame: bytes) -> None:
+        self._frames.append(frame)
+        self._bytes += len(frame)
+        while self._bytes > self.max_bytes and len(self._frames) > 1:
+            self._bytes -= len(self._frames.popleft())
+            self.dropped += 1
+            metrics.increment("satellite_playout_dropped")
+        self._ready.set()
+
+    def clear(self) -> None:
+        self._frames.clear()
+        self._bytes = 0
+        self._playing = False
+
+    async def get(self) -> bytes:
+        while True:
+            if self._frames and (self._playing or self._bytes >= self.prebuffer_bytes):
+                self._playing = True
+                frame = self._frames.popleft()
+                self._bytes -= len(frame)
+                return frame
+            if not self._frames:
+                self._playing = False  # Drained: buffer up again before the next stream
+            self._ready.clear()
+            try:
+                timeout = self.prebuffer_ms / 1000 if self._frames else None
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                self._playing = True  # Nothing more is coming: play what is there
+
+
+class SatelliteClient:
+    """
+    Thin audio device: local microphone, speaker and wakeword detector,
+    with transcription, the LLM and synthesis on a central server.
+
+    The detector runs on every captured frame while the server allows it.
+    On detection the satellite notifies the server and starts streaming its
+    microphone right away; from then on the server decides, following its
+    FSM, when to stream and when to detect. Received audio goes through a
+    `PlayoutBuffer`. Lost connections are retried with exponential backoff
+    while capture and detection keep running locally.
+    """
+
+    def __init__(
+        self,
+        config: SatelliteConfig,
+        audio: ABCAudioIO,
+        wakeword: Optional[ABCWakeword] = None,
+        output: Optional[ABCAudioIO] = None,
+    ):
+        """
+        Args:
+            config: Satellite settings
+            audio: Microphone (and speaker unless `output` is given)
+            wakeword: Local detector (None = the server must enable streaming itself)
+            output: Speaker, if not `audio`
+        """
+        self.config = config
+        self.audio = audio
+        self.output = output or audio
+        self.wakeword = wakeword
+        self.name = config.name or socket.gethostname()
+        self.codec = config.codec
+        self.playout = PlayoutBuffer(config.playout_prebuffer_ms)
+        self.streaming = False
+        self.wakeword_active = True
+        self.connected = asyncio.Event()
+        self.connections = 0
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._send_seq = 0
+        self._expected_seq: Optional[int] = None
+        self._running = False
+        self._tasks: list[asyncio.Task] = []
+
+        if wakeword is not None:
+            wakeword.on_detected(self._on_wakeword)
+
+    async def run(self) -> None:
+        """Capture, play and stay connected to the server until stop()."""
+        self._running = True
+        await self.audio.start()
+        if self.wakeword is not None:
+            await self.wakeword.start()
+        self._tasks = [
+            asyncio.create_task(self._capture_loop()),
+            asyncio.create_task(self._playback_loop()),
+        ]
+        try:
+            await self._connection_loop()
+        finally:
+            await self.stop()
+
+    async def stop(self) -> None:
+        self._running = False
+        if self._ws is not None:
+            await self._ws.close()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.wakeword is not None:
+            await self.wakeword.stop()
+        await self.audio.stop()
+
+    async def _connection_loop(self) -> None:
+        backoff = 0.5
+        async with aiohttp.ClientSession() as session:
+            while self._running:
+                try:
+                    async with session.ws_connect(
+                        self.config.server_url, heartbeat=self.config.heartbeat_seconds or None
+                    ) as ws:
+                        backoff = 0.5
+                        await self._serve(ws)
+                except (aiohttp.ClientError, OSError, asyncio.TimeoutError) as e:
+                    logger.warning(f"Satellite {self.name}: server unreachable ({e})")
+                except Exception as e:
+                    # Anything else ends this connection, never the satellite
+                    logger.error(f"Satellite {self.name}: connection failed: {e}", exc_info=True)
+                if not self._running:
+                    break
+                logger.info(f"Satellite {self.name}: reconnecting in {backoff:.1f}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.config.reconnect_max_seconds)
+
+    async def _serve(self, ws: aiohttp.ClientWebSocketResponse) -> None:
+        self._ws = ws
+        self._expected_seq = None
+        await ws.send_str(encode_control("hello", name=self.name, codec=self.codec, sample_rate=SAMPLE_RATE))
+        self.connections += 1
+        self.connected.set()
+        logger.info(f"Satellite {self.name}: connected to {self.config.server_url}")
+        try:
+            async for message in ws:
+                try:
+                    self._on_message(ws, message)
+                except (AudioError, ValueError, KeyError, TypeError) as e:
+                    # A malformed (or newer protocol) message must not end the session
+                    metrics.increment("satellite_bad_messages")
+                    logger.warning(f"Satellite {self.name}: ignoring bad message from server: {e}")
+        finally:
+            self._ws = None
+            self.connected.clear()
+            # Nothing reaches the server while disconnected: fall back to waiting for the wakeword
+            self.streaming = False
+            self.wakeword_active = True
+
+    def _on_message(self, ws: aiohttp.ClientWebSocketResponse, message: aiohttp.WSMessage) -> None:
+        if message.type == aiohttp.WSMsgType.BINARY:
+            seq, frame = decode_audio(message.data, self.codec)
+            if self._expected_seq is not None and seq != self._expected_seq:
+                metrics.increment("satellite_frames_lost", value=(seq - self._expected_seq) & 0xFFFFFFFF)
+            self._expected_seq = (seq + 1) & 0xFFFFFFFF
+            self.playout.put(frame)
+        elif message.type == aiohttp.WSMsgType.TEXT:
+            self._on_control(decode_control(message.data))
+        elif message.type == aiohttp.WSMsgType.ERROR:
+            logger.warning(f"Satellite {self.name}: connection error: {ws.exception()}")
+
+    def _on_control(self, message: dict) -> None:
+        kind = message["type"]
+        if kind == "stream":
+            self.streaming = bool(message["active"])
+        elif kind == "wakeword":
+            self.wakeword_active = bool(message["active"])
+        elif kind == "flush":
+            self.playout.clear()
+        else:
+            logger.debug(f"Satellite {self.name}: ignoring {kind} message")
+
+    async def _on_wakeword(self) -> None:
+        if not self.wakeword_active:
+            return
+        if self._ws is None:
+            logger.warning(f"Satellite {self.name}: wakeword detected while disconnected")
+            return
+        logger.info(f"Satellite {self.name}: wakeword detected, streaming")
+        # Stream at once rather than after a round trip: the server confirms or stops it
+        self.streaming = True
+        await self._send(self._ws.send_str, encode_control("wakeword"))
+
+    async def _capture_loop(self) -> None:
+        while True:
+            frame = await self.audio.read_frame()
+            if not frame:
+                continue
+            if self.wakeword is not None and self.wakeword_active:
+                await self.wakeword.feed_audio(frame)
+            if self.streaming and self._ws is not None:
+                await self._send(self._ws.send_bytes, encode_audio(self._send_seq, frame, self.codec))
+                self._send_seq += 1
+
+    async def _playback_loop(self) -> None:
+        while True:
+            frame = await self.playout.get()
+            await self.output.play_frame(frame)
+
+    async def _send(self, send, message) -> None:
+        try:
+            await send(message)
+        except (ConnectionError, RuntimeError) as e:
+            logger.debug(f"Satellite {self.name}: send failed: {e}")
+
+
+async def main() -> None:
+    from heisenberg.core.logging import setup_logging
+    from heisenberg.audio.capture import PyAudioIO
+    from heisenberg.wakeword.engine import OpenWakeWordEngine
+
+    config = Config.load()
+    setup_logging(config=config.logging)
+    client = SatelliteClient(
+        config.satellite,
+        PyAudioIO(config.audio),
+        OpenWakeWordEngine(config.wakeword),
+    )
+    await client.run()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
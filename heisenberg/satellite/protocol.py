@@ -0,0 +1,67 @@
+"""
+Wire protocol between satellites and the server, over one websocket.
+
+- Binary messages carry audio, 16kHz mono: a little-endian uint32 sequence
+  number followed by the frame in the negotiated codec. Satellites send
+  captured audio, the server sends synthesized audio.
+- Text messages are JSON objects with a "type":
+  satellite -> server: hello {name, codec, sample_rate}, wakeword
+  server -> satellite: stream {active}, wakeword {active}, flush
+"""
+import json
+import struct
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+from heisenberg.core.exceptions import AudioError
+
+SAMPLE_RATE = 16000
+CODECS = ("pcm16", "ulaw")
+
+_AUDIO_HEADER = struct.Struct("<I")
+_ULAW_BIAS = 0x84
+_ULAW_CLIP = 32635
+
+
+def encode_audio(seq: int, pcm: bytes, codec: str = "pcm16") -> bytes:
+    return _AUDIO_HEADER.pack(seq & 0xFFFFFFFF) + (ulaw_encode(pcm) if codec == "ulaw" else pcm)
+
+
+def decode_audio(message: bytes, codec: str = "pcm16") -> Tuple[int, bytes]:
+    """Sequence number and 16-bit PCM of an audio message."""
+    if len(message) < _AUDIO_HEADER.size:
+        raise AudioError(f"Truncated audio message ({len(message)} bytes)")
+    (seq,) = _AUDIO_HEADER.unpack_from(message)
+    payload = message[_AUDIO_HEADER.size:]
+    return seq, ulaw_decode(payload) if codec == "ulaw" else payload
+
+
+def encode_control(kind: str, **fields: Any) -> str:
+    return json.dumps({"type": kind, **fields})
+
+
+def decode_control(message: str) -> Dict[str, Any]:
+    data = json.loads(message)
+    if not isinstance(data, dict) or "type" not in data:
+        raise ValueError(f"Invalid control message: {message[:80]!r}")
+    return data
+
+
+def ulaw_encode(pcm: bytes) -> bytes:
+    """G.711 mu-law: int16 PCM to one byte per sample."""
+    samples = np.frombuffer(pcm, dtype=np.int16).astype(np.int32)
+    sign = np.where(samples < 0, 0x80, 0)
+    magnitude = np.minimum(np.abs(samples), _ULAW_CLIP) + _ULAW_BIAS
+    exponent = np.floor(np.log2(magnitude)).astype(np.int32) - 7
+    mantissa = (magnitude >> (exponent + 3)) & 0x0F
+    return (~(sign | (exponent << 4) | mantissa) & 0xFF).astype(np.uint8).tobytes()
+
+
+def ulaw_decode(data: bytes) -> bytes:
+    """G.711 mu-law back to int16 PCM."""
+    codes = ~np.frombuffer(data, dtype=np.uint8).astype(np.int32) & 0xFF
+    exponent = (codes >> 4) & 0x07
+    mantissa = codes & 0x0F
+    magnitude = (((mantissa << 3) + _ULAW_BIAS) << exponent) - _ULAW_BIAS
+    return np.where(codes & 0x80, -magnitude, magnitude).astype(np.int16).tobytes()
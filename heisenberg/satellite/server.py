@@ -0,0 +1,304 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Iterable, Optional, Set
+
+from aiohttp import WSMsgType, web
+
+from heisenberg.interfaces.audio import ABCAudioIO
+from heisenberg.interfaces.wakeword import ABCWakeword
+from heisenberg.core.config import SatelliteConfig
+from heisenberg.core.exceptions import AudioError
+from heisenberg.core.metrics import metrics
+from heisenberg.orchestrator.state import State
+from heisenberg.satellite.protocol import (
+    CODECS,
+    SAMPLE_RATE,
+    decode_audio,
+    decode_control,
+    encode_audio,
+    encode_control,
+)
+
+logger = logging.getLogger(__name__)
+
+SatelliteCallback = Callable[["RemoteAudioIO"], Awaitable[None]]
+
+
+class RemoteWakeword(ABCWakeword):
+    """Server side of the wakeword detector running on a satellite."""
+
+    def __init__(self):
+        self.callback: Optional[Callable[[], Awaitable[None]]] = None
+
+    def on_detected(self, callback: Callable[[], Awaitable[None]]) -> None:
+        self.callback = callback
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def feed_audio(self, frame: bytes) -> None:
+        """Nothing to do: the satellite feeds the detector itself."""
+
+
+class RemoteAudioIO(ABCAudioIO):
+    """
+    Microphone and speaker of a satellite, seen from the server.
+
+    Captured frames arrive over the satellite's websocket into a bounded
+    queue (oldest dropped first); sequence gaps are counted as lost frames.
+    Played frames are sent back paced to real time, at most
+    `playout_lead_ms` ahead, so the TTS engine's notion of "done playing"
+    matches what the satellite actually plays. The satellite only streams
+    its microphone in the states set by `bind`; the instance outlives
+    connections, so a reconnecting satellite picks up where it left off.
+    """
+
+    def __init__(self, name: str, config: SatelliteConfig):
+        self.name = name
+        self.config = config
+        self.tags = {"instance": name}
+        self.wakeword = RemoteWakeword()
+        self.codec = "pcm16"
+        self.stream_states: Set[State] = {State.LISTENING}
+        self.wakeword_states: Set[State] = {State.IDLE}
+        self.streaming = False
+        self.wakeword_active = True
+        self.capturing = False
+        self.frames_lost = 0
+        self.frames_dropped = 0
+        self._ws: Optional[web.WebSocketResponse] = None
+        self._frames: Deque[bytes] = deque()
+        self._frame_ready = asyncio.Event()
+        self._expected_seq: Optional[int] = None
+        self._send_seq = 0
+        self._play_until = 0.0  # time.monotonic() at which the audio sent so far ends
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def connected(self) -> bool:
+        return self._ws is not None and not self._ws.closed
+
+    async def attach(self, ws: web.WebSocketResponse, codec: str) -> None:
+        """Serve the satellite on a new connection (replacing any previous one)."""
+        previous, self._ws = self._ws, ws
+        if previous is not None and not previous.closed:
+            await previous.close()
+        self.codec = codec
+        self._expected_seq = None
+        self._play_until = 0.0
+        # The satellite starts from its defaults: restate what it should do
+        await self._send_control("wakeword", active=self.wakeword_active)
+        await self._send_control("stream", active=self.capturing and self.streaming)
+
+    def detach(self, ws: web.WebSocketResponse) -> None:
+        if self._ws is ws:
+            self._ws = None
+
+    def on_audio(self, message: bytes) -> None:
+        seq, frame = decode_audio(message, self.codec)
+        if self._expected_seq is not None and seq != self._expected_seq:
+            lost = (seq - self._expected_seq) & 0xFFFFFFFF
+            if lost < 0x80000000:
+                self.frames_lost += lost
+                metrics.increment("satellite_frames_lost", self.tags, value=lost)
+        self._expected_seq = (seq + 1) & 0xFFFFFFFF
+        if not self.capturing:
+            return
+        if len(self._frames) >= self.config.queue_frames:
+            self._frames.popleft()
+            self.frames_dropped += 1
+            metrics.increment("satellite_frames_dropped", self.tags)
+        self._frames.append(frame)
+        self._frame_ready.set()
+
+    def on_control(self, message: dict) -> None:
+        if message["type"] == "wakeword":
+            # A detection sent just before the detector was paused is stale
+            if self.wakeword_active and self.wakeword.callback:
+                task = asyncio.ensure_future(self.wakeword.callback())
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        else:
+            logger.debug(f"Satellite {self.name}: ignoring {message['type']} message")
+
+    async def read_frame(self) -> Optional[bytes]:
+        """Next frame from the satellite, or None after a short wait if none arrived."""
+        if not self._frames:
+            self._frame_ready.clear()
+            try:
+                await asyncio.wait_for(self._frame_ready.wait(), timeout=0.1)
+            except asyncio.TimeoutError:
+                return None
+        return self._frames.popleft()
+
+    async def play_frame(self, frame: bytes) -> None:
+        if not self.connected:
+            return
+        now = time.monotonic()
+        self._play_until = max(self._play_until, now) + len(frame) / (SAMPLE_RATE * 2)
+        await self._send_audio(frame)
+        ahead = self._play_until - now - self.config.playout_lead_ms / 1000
+        if ahead > 0:
+            await asyncio.sleep(ahead)
+
+    async def start(self) -> None:
+        self.capturing = True
+        await self._update_stream()
+
+    async def stop(self) -> None:
+        self.capturing = False
+        self._frames.clear()
+        await self._update_stream()
+
+    async def close(self) -> None:
+        self.capturing = False
+        if self._ws is not None:
+            await self._ws.close()
+            self._ws = None
+
+    async def flush_playback(self) -> None:
+        """Drop the audio the satellite has not played yet (e.g. on barge-in)."""
+        self._play_until = 0.0
+        await self._send_control("flush")
+
+    def bind(self, fsm, wakeword_states: Iterable[State], stream_states: Iterable[State] = (State.LISTENING,)) -> None:
+        """Follow the FSM: detect the wakeword in `wakeword_states`, stream the microphone in `stream_states`."""
+        self.wakeword_states = set(wakeword_states)
+        self.stream_states = set(stream_states)
+
+        async def on_enter(old_state: State, new_state: State) -> None:
+            if new_state == State.LISTENING and old_state in (State.THINKING, State.SPEAKING):
+                await self.flush_playback()  # Barge-in
+            await self._apply_state(new_state)
+
+        for state in State:
+            fsm.on_enter(state, on_enter)
+        self.wakeword_active = fsm.state in self.wakeword_states
+        self.streaming = fsm.state in self.stream_states
+
+    async def _apply_state(self, state: State) -> None:
+        wakeword_active = state in self.wakeword_states
+        if wakeword_active != self.wakeword_active:
+            self.wakeword_active = wakeword_active
+            await self._send_control("wakeword", active=wakeword_active)
+        self.streaming = state in self.stream_states
+        await self._update_stream()
+
+    async def _update_stream(self) -> None:
+        await self._send_control("stream", active=self.capturing and self.streaming)
+
+    async def _send_audio(self, frame: bytes) -> None:
+        message = encode_audio(self._send_seq, frame, self.codec)
+        self._send_seq += 1
+        await self._send(self._ws.send_bytes, message)
+
+    async def _send_control(self, kind: str, **fields) -> None:
+        if self.connected:
+            await self._send(self._ws.send_str, encode_control(kind, **fields))
+
+    async def _send(self, send, message) -> None:
+        try:
+            await send(message)
+        except (ConnectionError, RuntimeError) as e:
+            # The connection went away: the satellite is told the state again when it comes back
+            logger.debug(f"Satellite {self.name} unreachable: {e}")
+
+
+class SatelliteServer:
+    """
+    Websocket endpoint for remote satellites.
+
+    Each satellite says hello with its name and codec. The first connection
+    of a name creates its `RemoteAudioIO` and hands it to `on_satellite`
+    (which typically starts an assistant pipeline on it); later connections
+    of the same name, after a network drop or a satellite restart, are
+    attached to the existing instance.
+    """
+
+    path = "/satellite"
+
+    def __init__(self, config: SatelliteConfig, on_satellite: Optional[SatelliteCallback] = None):
+        self.config = config
+        self.on_satellite = on_satellite
+        self.satellites: Dict[str, RemoteAudioIO] = {}
+        self.app = web.Application()
+        self.app.router.add_get(self.path, self.handle)
+        self._runner: Optional[web.AppRunner] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def port(self) -> int:
+        """Listening port (useful when started on port 0)."""
+        return self._runner.addresses[0][1]
+
+    async def start(self) -> None:
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.config.host, self.config.port).start()
+        logger.info(f"Satellite server listening on {self.config.host}:{self.port}{self.path}")
+
+    async def stop(self) -> None:
+        for satellite in self.satellites.values():
+            await satellite.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def handle(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(heartbeat=self.config.heartbeat_seconds or None)
+        await ws.prepare(request)
+
+        satellite: Optional[RemoteAudioIO] = None
+        try:
+            hello = await ws.receive(timeout=self.config.heartbeat_seconds * 2 or None)
+            if hello.type != WSMsgType.TEXT:
+                raise ValueError("expected hello")
+            hello = decode_control(hello.data)
+            name = str(hello.get("name") or request.remote)
+            codec = hello.get("codec", "pcm16")
+            if hello["type"] != "hello" or codec not in CODECS or hello.get("sample_rate", SAMPLE_RATE) != SAMPLE_RATE:
+                raise ValueError(f"unsupported hello {hello}")
+        except (asyncio.TimeoutError, ValueError) as e:
+            logger.warning(f"Rejecting satellite connection from {request.remote}: {e}")
+            await ws.close()
+            return ws
+
+        satellite = self.satellites.get(name)
+        is_new = satellite is None
+        if is_new:
+            satellite = self.satellites[name] = RemoteAudioIO(name, self.config)
+        await satellite.attach(ws, codec)
+        metrics.increment("satellite_connected", {"instance": name})
+        logger.info(f"Satellite {name} {'connected' if is_new else 'reconnected'} from {request.remote} ({codec})")
+        if is_new and self.on_satellite is not None:
+            task = asyncio.create_task(self.on_satellite(satellite))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        try:
+            async for message in ws:
+                try:
+                    self._on_message(satellite, ws, message)
+                except (AudioError, ValueError, KeyError, TypeError) as e:
+                    # A malformed (or newer protocol) message must not end the satellite's turn
+                    metrics.increment("satellite_bad_messages", satellite.tags)
+                    logger.warning(f"Satellite {name}: ignoring bad message: {e}")
+        except Exception as e:
+            logger.error(f"Satellite {name} connection failed: {e}", exc_info=True)
+        finally:
+            satellite.detach(ws)
+            logger.info(f"Satellite {name} disconnected")
+        return ws
+
+    def _on_message(self, satellite: RemoteAudioIO, ws: web.WebSocketResponse, message) -> None:
+        if message.type == WSMsgType.BINARY:
+            satellite.on_audio(message.data)
+        elif message.type == WSMsgType.TEXT:
+            satellite.on_control(decode_control(message.data))
+        elif message.type == WSMsgType.ERROR:
+            logger.warning(f"Satellite {satellite.name} connection error: {ws.exception()}")
@@ -1,3 +1,77 @@
+import logging
+import threading
+from typing import Optional
+
+import numpy as np
+
+from heisenberg.core.config import STTConfig
+from heisenberg.core.exceptions import STTError
+
+# Try to import pywhispercpp, handle missing dependency gracefully
+try:
+    from pywhispercpp.model import Model
+except ImportError:
+    Model = None
+
+logger = logging.getLogger(__name__)
+
+
 class STTModel:
-    """Manages the STT model lifecycle."""
-    pass
+    """
+    Manages the STT model lifecycle.
+    Wraps a single pywhispercpp Model (one whisper.cpp context) so it can be
+    shared by several sessions.
+    """
+
+    def __init__(self, config: STTConfig):
+        self.config = config
+        self._model: Optional[Model] = None
+        # A whisper.cpp context is not re-entrant: decodes on the same model are serialized
+        # (the STTService never has two workers on one context, so this lock is never contended there)
+        self._lock = threading.Lock()
+
+        if Model is None:
+            logger.error("pywhispercpp library not found. Please install it with 'pip install pywhispercpp'.")
+            return
+
+        try:
+            logger.info(f"Loading shared Whisper model: {config.model_path} (n_threads={config.n_threads})...")
+            self._model = Model(
+                config.model_path,
+                n_threads=config.n_threads,
+                params_sampling_strategy=config.sampling_strategy,
+                print_realtime=False,
+                print_progress=False,
+                print_timestamps=False
+            )
+            logger.info("Shared Whisper model loaded.")
+        except Exception as e:
+            logger.error(f"Failed to load Whisper model: {e}", exc_info=True)
+
+    @staticmethod
+    def key(config: STTConfig) -> tuple:
+        """Identity of a loaded model: sessions with the same key share one instance."""
+        return (config.model_path, config.n_threads, config.sampling_strategy)
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def transcribe(self, pcm: bytes, language: str, initial_prompt: str = "") -> str:
+        """
+        Blocking transcription of 16kHz mono int16 PCM.
+        Must be called from a worker thread, never from the event loop.
+        """
+        if self._model is None:
+            raise STTError("Whisper model not initialized")
+
+        audio_int16 = np.frombuffer(pcm, dtype=np.int16)
+        audio_float32 = audio_int16.astype(np.float32) / 32768.0
+
+        with self._lock:
+            segments = self._model.transcribe(
+                audio_float32,
+                language=language,
+                initial_prompt=initial_prompt
+            )
+        return " ".join([s.text for s in segments]).strip()
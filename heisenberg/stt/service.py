@@ -0,0 +1,327 @@
+import asyncio
+import itertools
+import logging
+import math
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Awaitable, Dict, List, Optional
+
+from heisenberg.interfaces.stt import ABCSTT
+from heisenberg.core.config import STTConfig
+from heisenberg.core.exceptions import STTError
+from heisenberg.core.logging import get_correlation_id, set_correlation_id
+from heisenberg.core.metrics import metrics
+from heisenberg.core.tracing import tracer
+from heisenberg.stt.model import STTModel
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(order=True)
+class TranscriptionRequest:
+    """
+    A queued decode. Ordered by priority (lower first), then deadline, then how
+    many requests its session already had pending (fairness), then arrival.
+    """
+    priority: int
+    deadline: float
+    turn: int
+    seq: int
+    audio: bytes = field(compare=False)
+    config: STTConfig = field(compare=False)
+    session_id: str = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    enqueued_at: float = field(default_factory=time.monotonic, compare=False)
+    correlation_id: Optional[str] = field(default=None, compare=False)  # Turn of the caller
+
+
+class STTService:
+    """
+    In-process transcription service shared by several assistant pipelines.
+
+    Requests from all sessions go through a single priority queue, and each
+    model is loaded once and shared by all sessions. whisper.cpp decodes
+    one utterance per context, so by default a single worker decodes on
+    that shared context. With `context_per_worker`, `thread_budget // n_threads`
+    workers decode in parallel, each on its own context (one copy of the
+    model in RAM per worker), so N rooms never spawn N decodes fighting
+    over cores. Either way a worker only takes the next request once its
+    decode is over, so the queue order is the decode order. Among equal
+    priorities and deadlines, a session's second pending request waits
+    behind every other session's first one, so a busy room cannot starve
+    the others.
+    """
+
+    def __init__(self, config: STTConfig):
+        self.config = config
+        self._models: Dict[tuple, STTModel] = {}  # (context, model key) -> whisper.cpp context
+        self._loading: Dict[tuple, asyncio.Future] = {}
+        self._queue: asyncio.PriorityQueue[TranscriptionRequest] = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+        self._pending: Dict[str, int] = {}  # Requests queued or decoding, per session
+        self._workers: List[asyncio.Task] = []
+        self.n_workers = max(1, config.thread_budget // max(1, config.n_threads)) if config.context_per_worker else 1
+        self._executor = ThreadPoolExecutor(max_workers=self.n_workers, thread_name_prefix="stt-service")
+
+    async def get_model(self, config: Optional[STTConfig] = None, worker: int = 0) -> STTModel:
+        """
+        Return the context `worker` decodes `config`'s model on, loading it on first use.
+
+        Loads run on a worker thread; concurrent requests for the same
+        context share a single load.
+        """
+        config = config or self.config
+        key = (worker if self.config.context_per_worker else 0, STTModel.key(config))
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        pending = self._loading.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._load(key, config))
+            self._loading[key] = pending
+            pending.add_done_callback(lambda _: self._loading.pop(key, None))
+        return await asyncio.shield(pending)
+
+    async def _load(self, key: tuple, config: STTConfig) -> STTModel:
+        loop = asyncio.get_running_loop()
+        model = await loop.run_in_executor(self._executor, STTModel, config)
+        self._models[key] = model
+        return model
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self) -> None:
+        if self._workers:
+            return
+        # Load the default model up-front so the first request does not pay for it
+        await asyncio.gather(*(self.get_model(self.config, worker) for worker in range(self.n_workers)))
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.n_workers)]
+        logger.info(f"STTService started with {self.n_workers} worker(s) (thread budget: {self.config.thread_budget})")
+
+    async def stop(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        # Fail whatever is still queued so callers do not hang
+        while not self._queue.empty():
+            request = self._queue.get_nowait()
+            if not request.future.done():
+                request.future.set_exception(STTError("STTService stopped"))
+
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        logger.info("STTService stopped")
+
+    async def transcribe(
+        self,
+        pcm: bytes,
+        config: Optional[STTConfig] = None,
+        priority: int = 0,
+        deadline: Optional[float] = None,
+        session_id: str = "",
+    ) -> str:
+        """
+        Queue a transcription and wait for its result.
+
+        Args:
+            pcm: 16kHz mono int16 audio
+            config: STT settings of the calling session (defaults to the service config)
+            priority: Lower values are decoded first
+            deadline: Absolute `time.monotonic()` after which the request is dropped
+            session_id: Caller identifier, used for logs and metrics
+
+        Returns:
+            The transcribed text
+        """
+        request = TranscriptionRequest(
+            priority=priority,
+            deadline=deadline if deadline is not None else math.inf,
+            turn=self._pending.get(session_id, 0),
+            seq=next(self._seq),
+            audio=pcm,
+            config=config or self.config,
+            session_id=session_id,
+            future=asyncio.get_running_loop().create_future(),
+            correlation_id=get_correlation_id(),
+        )
+        self._pending[session_id] = request.turn + 1
+        self._queue.put_nowait(request)
+        logger.debug(f"STT request queued (session: {session_id}, priority: {priority}, depth: {self._queue.qsize()})")
+        try:
+            return await request.future
+        finally:
+            remaining = self._pending.get(session_id, 1) - 1
+            if remaining > 0:
+                self._pending[session_id] = remaining
+            else:
+                self._pending.pop(session_id, None)
+
+    def client(
+        self,
+        config: Optional[STTConfig] = None,
+        priority: int = 0,
+        deadline_ms: Optional[float] = None,
+        session_id: Optional[str] = None,
+    ) -> "STTServiceClient":
+        """Create an ABCSTT-compatible session backed by this service."""
+        return STTServiceClient(self, config, priority, deadline_ms, session_id)
+
+    def _decode(self, request: TranscriptionRequest, model: STTModel) -> str:
+        return model.transcribe(request.audio, request.config.language, request.config.initial_prompt)
+
+    async def _worker(self, index: int):
+        loop = asyncio.get_running_loop()
+        while True:
+            request = await self._queue.get()
+            try:
+                if request.future.done():
+                    # Caller went away (cancelled) while queued
+                    continue
+
+                set_correlation_id(request.correlation_id)
+                started = time.monotonic()
+                if started > request.deadline:
+                    metrics.increment("stt_service_deadline_missed")
+                    logger.warning(f"Dropping STT request past its deadline (session: {request.session_id})")
+                    request.future.set_exception(STTError("Transcription deadline exceeded"))
+                    continue
+
+                model = await self.get_model(request.config, index)
+                decode_start = time.perf_counter()
+                text = await loop.run_in_executor(self._executor, self._decode, request, model)
+                finished = time.monotonic()
+
+                metrics.record_latency("stt_service_queue_wait", (started - request.enqueued_at) * 1000)
+                metrics.record_latency("stt_service_decode", (finished - started) * 1000)
+                if request.correlation_id:
+                    queued_at = decode_start - (started - request.enqueued_at)
+                    tracer.record_span("stt_queue", queued_at, decode_start, request.correlation_id)
+                    tracer.record_span(
+                        "stt_decode", decode_start, time.perf_counter(), request.correlation_id,
+                        priority=request.priority, audio_ms=len(request.audio) // 32,
+                    )
+
+                if not request.future.done():
+                    request.future.set_result(text)
+            except asyncio.CancelledError:
+                if not request.future.done():
+                    request.future.set_exception(STTError("STTService stopped"))
+                raise
+            except Exception as e:
+                logger.error(f"STT worker {index} failed: {e}", exc_info=True)
+                if not request.future.done():
+                    request.future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+
+class STTServiceClient(ABCSTT):
+    """
+    STT session that buffers its own audio and delegates decoding to a shared STTService.
+    """
+
+    def __init__(
+        self,
+        service: STTService,
+        config: Optional[STTConfig] = None,
+        priority: int = 0,
+        deadline_ms: Optional[float] = None,
+        session_id: Optional[str] = None,
+    ):
+        self.service = service
+        self.config = config or service.config
+        self.priority = priority
+        self.deadline_ms = deadline_ms
+        self.session_id = session_id or uuid.uuid4().hex[:8]
+        self._partial_callback: Optional[Callable[[str], Awaitable[None]]] = None
+        self._final_callback: Optional[Callable[[str], Awaitable[None]]] = None
+        self._buffer = bytearray()
+        self._is_running = False
+        self._partial_task: Optional[asyncio.Task] = None
+        self._partial_mark = 0
+
+    async def start_stream(self) -> None:
+        """Start the STT streaming session."""
+        self._buffer = bytearray()
+        self._partial_mark = 0
+        self._is_running = True
+        logger.info(f"STT client {self.session_id} session started")
+
+    async def stop_stream(self) -> None:
+        """Stop the session and submit the buffered audio to the shared service."""
+        if not self._is_running:
+            return
+
+        self._is_running = False
+        pcm = bytes(self._buffer)
+        self._buffer = bytearray()
+
+        if not pcm:
+            logger.warning("Audio buffer is empty, nothing to transcribe.")
+            return
+
+        deadline = None
+        if self.deadline_ms is not None:
+            deadline = time.monotonic() + self.deadline_ms / 1000
+
+        try:
+            text = await self.service.transcribe(
+                pcm,
+                config=self.config,
+                priority=self.priority,
+                deadline=deadline,
+                session_id=self.session_id,
+            )
+        except Exception as e:
+            logger.error(f"Transcription failed for session {self.session_id}: {e}")
+            return
+
+        logger.info(f"Full transcription ({self.session_id}): '{text}'")
+        if self._final_callback:
+            await self._final_callback(text)
+
+    async def feed_audio(self, frame: bytes) -> None:
+        """Feed audio data to the STT engine."""
+        if self._is_running:
+            self._buffer.extend(frame)
+            self._maybe_start_partial()
+
+    def _maybe_start_partial(self) -> None:
+        """Decode the audio heard so far every `partial_interval_ms`, one decode at a time."""
+        interval_bytes = self.config.partial_interval_ms * 32  # 16kHz * 2 bytes per ms
+        if interval_bytes <= 0 or self._partial_callback is None:
+            return
+        if self._partial_task and not self._partial_task.done():
+            return
+        if len(self._buffer) - self._partial_mark < interval_bytes:
+            return
+
+        self._partial_mark = len(self._buffer)
+        self._partial_task = asyncio.create_task(self._run_partial(bytes(self._buffer)))
+
+    async def _run_partial(self, pcm: bytes) -> None:
+        try:
+            # Partials yield to every final transcription in the service queue
+            text = await self.service.transcribe(
+                pcm, config=self.config, priority=self.priority + 1, session_id=self.session_id
+            )
+            # The session may have ended while decoding
+            if self._is_running and text:
+                logger.debug(f"Partial transcription ({self.session_id}): '{text}'")
+                await self._partial_callback(text)
+        except Exception as e:
+            logger.warning(f"Partial transcription failed: {e}")
+
+    def on_partial(self, callback: Callable[[str], Awaitable[None]]) -> None:
+        """Register callback for partial transcription updates."""
+        self._partial_callback = callback
+
+    def on_final(self, callback: Callable[[str], Awaitable[None]]) -> None:
+        """Register callback for final transcription results."""
+        self._final_callback = callback
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import os
 import wave
@@ -26,6 +27,8 @@ class WhisperSTT(ABCSTT):
         self._final_callback: Optional[Callable[[str], Awaitable[None]]] = None
         self._buffer = bytearray()
         self._is_running = False
+        self._partial_task: Optional[asyncio.Task] = None
+        self._partial_mark = 0
 
         if Model is None:
             logger.error("pywhispercpp library not found. Please install it with 'pip install pywhispercpp'.")
@@ -48,6 +51,7 @@ class WhisperSTT(ABCSTT):
     async def start_stream(self) -> None:
         """Start the STT streaming session."""
         self._buffer = bytearray()
+        self._partial_mark = 0
         self._is_running = True
         logger.info("WhisperSTT session started")
 
@@ -68,23 +72,13 @@ class WhisperSTT(ABCSTT):
             logger.warning("Audio buffer is empty, nothing to transcribe.")
             return
 
+        # The whisper context is not re-entrant: let an in-flight partial decode finish first
+        if self._partial_task and not self._partial_task.done():
+            await asyncio.gather(self._partial_task, return_exceptions=True)
+
         try:
-            # pywhispercpp can take a numpy array directly or a file.
-            # Convert buffer to numpy array (float32, normalized)
-            # whisper.cpp expects 16kHz mono. PyAudioIO provides 16kHz mono int16.
-            audio_int16 = np.frombuffer(self._buffer, dtype=np.int16)
-            audio_float32 = audio_int16.astype(np.float32) / 32768.0
-            
-            # Transcription using pywhispercpp
-            logger.debug("Calling pywhispercpp.model.transcribe")
-            segments = self._model.transcribe(
-                audio_float32, 
-                language=self.config.language,
-                initial_prompt=self.config.initial_prompt
-            )
-            
-            # Combine segments
-            full_text = " ".join([s.text for s in segments]).strip()
+            # Decoded on a worker thread: the event loop keeps ingesting audio meanwhile
+            full_text = await asyncio.to_thread(self._transcribe, bytes(self._buffer))
             logger.info(f"Full transcription: '{full_text}'")
             
             # Optional: Dump audio to WAV for debugging
@@ -107,12 +101,57 @@ class WhisperSTT(ABCSTT):
         except Exception as e:
             logger.error(f"Error during transcription: {e}", exc_info=True)
         finally:
-            self._buffer = bytearray()
+            # A new session may have started during the decode: keep its audio
+            if not self._is_running:
+                self._buffer = bytearray()
+
+    def _transcribe(self, pcm: bytes) -> str:
+        """Blocking whisper.cpp decode of 16kHz mono int16 PCM."""
+        # pywhispercpp can take a numpy array directly or a file.
+        # Convert buffer to numpy array (float32, normalized)
+        # whisper.cpp expects 16kHz mono. PyAudioIO provides 16kHz mono int16.
+        audio_int16 = np.frombuffer(pcm, dtype=np.int16)
+        audio_float32 = audio_int16.astype(np.float32) / 32768.0
+        
+        # Transcription using pywhispercpp
+        logger.debug("Calling pywhispercpp.model.transcribe")
+        segments = self._model.transcribe(
+            audio_float32, 
+            language=self.config.language,
+            initial_prompt=self.config.initial_prompt
+        )
+        
+        # Combine segments
+        return " ".join([s.text for s in segments]).strip()
 
     async def feed_audio(self, frame: bytes) -> None:
         """Feed audio data to the STT engine."""
         if self._is_running:
             self._buffer.extend(frame)
+            self._maybe_start_partial()
+
+    def _maybe_start_partial(self) -> None:
+        """Decode the audio heard so far every `partial_interval_ms`, one decode at a time."""
+        interval_bytes = self.config.partial_interval_ms * 32  # 16kHz * 2 bytes per ms
+        if interval_bytes <= 0 or self._partial_callback is None or self._model is None:
+            return
+        if self._partial_task and not self._partial_task.done():
+            return
+        if len(self._buffer) - self._partial_mark < interval_bytes:
+            return
+
+        self._partial_mark = len(self._buffer)
+        self._partial_task = asyncio.create_task(self._run_partial(bytes(self._buffer)))
+
+    async def _run_partial(self, pcm: bytes) -> None:
+        try:
+            text = await asyncio.to_thread(self._transcribe, pcm)
+            # The session may have ended while decoding
+            if self._is_running and text:
+                logger.debug(f"Partial transcription: '{text}'")
+                await self._partial_callback(text)
+        except Exception as e:
+            logger.warning(f"Partial transcription failed: {e}")
 
     def on_partial(self, callback: Callable[[str], Awaitable[None]]) -> None:
         """Register callback for partial transcription updates."""
@@ -0,0 +1,90 @@
+"""
+Microbenchmark: llama.cpp SSE stream parsing throughput.
+Compares the former per-line loop (aiohttp readline + decode/strip/json.loads
++ string concatenation) with SSEParser fed from iter_any(), both reading
+from a real aiohttp StreamReader.
+
+Run with: uv run python heisenberg/tests/bench_sse_parser.py
+"""
+
+import asyncio
+import json
+import random
+import time
+from aiohttp.base_protocol import BaseProtocol
+from aiohttp.streams import StreamReader
+from heisenberg.core.serialization import orjson
+from heisenberg.llm.sse import SSEParser
+
+N_TOKENS = 512
+N_RUNS = 200
+
+
+def build_chunks(seed: int = 0) -> list:
+    """A 512-token response, split into network-like reads of random sizes."""
+    rng = random.Random(seed)
+    words = ["Bonjour", " je", " suis", " Heisenberg", ",", " ton", " assistant", " vocal", "."]
+    events = [{"content": rng.choice(words), "stop": False, "id_slot": 0} for _ in range(N_TOKENS)]
+    events.append({"content": "", "stop": True, "timings": {"prompt_ms": 120.0, "predicted_per_second": 18.0}})
+    body = b"".join(b"data: " + json.dumps(e).encode() + b"\n\n" for e in events)
+
+    chunks, i = [], 0
+    while i < len(body):
+        size = rng.randint(16, 512)
+        chunks.append(body[i:i + size])
+        i += size
+    return chunks
+
+
+def make_reader(chunks: list) -> StreamReader:
+    loop = asyncio.get_running_loop()
+    reader = StreamReader(BaseProtocol(loop), 2 ** 16, loop=loop)
+    for chunk in chunks:
+        reader.feed_data(chunk)
+    reader.feed_eof()
+    return reader
+
+
+async def legacy_parse(chunks: list) -> str:
+    # Previous implementation: line iteration + str decoding + += concatenation
+    full_response = ""
+    async for line in make_reader(chunks):
+        line = line.decode("utf-8").strip()
+        if not line or line.startswith(":"):
+            continue
+        if line.startswith("data: "):
+            data = json.loads(line[6:])
+            full_response += data.get("content", "")
+    return full_response
+
+
+async def parser_parse(chunks: list) -> str:
+    parser = SSEParser()
+    tokens = []
+    async for chunk in make_reader(chunks).iter_any():
+        for event in parser.feed(chunk):
+            tokens.append(event.get("content", ""))
+    return "".join(tokens)
+
+
+async def bench(name: str, fn, chunks: list) -> float:
+    start = time.perf_counter()
+    for _ in range(N_RUNS):
+        await fn(chunks)
+    elapsed = time.perf_counter() - start
+    events_per_s = N_RUNS * (N_TOKENS + 1) / elapsed
+    print(f"{name:<10} {elapsed / N_RUNS * 1000:8.3f} ms/stream  {events_per_s:12,.0f} events/s")
+    return elapsed
+
+
+async def main():
+    chunks = build_chunks()
+    assert await legacy_parse(chunks) == await parser_parse(chunks)
+    print(f"JSON decoder: {'orjson' if orjson else 'json (stdlib)'}")
+    legacy = await bench("legacy", legacy_parse, chunks)
+    fast = await bench("SSEParser", parser_parse, chunks)
+    print(f"speedup: {legacy / fast:.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,228 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from heisenberg.core.config import Config, DeviceConfig, LLMConfig, SatelliteConfig
+from heisenberg.interfaces.stt import ABCSTT
+from heisenberg.interfaces.tts import ABCTTS
+from heisenberg.llm.stream import LlamaCppLLM
+from heisenberg.orchestrator.assistant import AssistantPipeline, SharedResources
+from heisenberg.orchestrator.events import Event
+from heisenberg.orchestrator.state import State
+from heisenberg.satellite.server import RemoteAudioIO
+
+
+class FakeSTT(ABCSTT):
+    """Session answering each stop_stream() with the next scripted transcript."""
+
+    def __init__(self):
+        self.transcripts = []
+        self.decoding = asyncio.Event()  # Cleared: the final decode waits
+        self.decoding.set()
+        self.running = False
+        self._final = None
+
+    async def start_stream(self):
+        self.running = True
+
+    async def stop_stream(self):
+        if not self.running:
+            return
+        self.running = False
+        await self.decoding.wait()
+        if self.transcripts and self._final:
+            await self._final(self.transcripts.pop(0))
+
+    async def feed_audio(self, frame):
+        pass
+
+    def on_partial(self, callback):
+        pass
+
+    def on_final(self, callback):
+        self._final = callback
+
+
+class FakeLLM(LlamaCppLLM):
+    """Streams scripted tokens instead of calling llama.cpp."""
+
+    def __init__(self, tokens, token_delay=0.0):
+        super().__init__(LLMConfig())
+        self.tokens = tokens
+        self.token_delay = token_delay
+        self.prompts = []
+        self.completed = []  # One flag per generation: False if it was cut short
+
+    async def generate(self, prompt, conversation_history=None, session_id=None):
+        self.prompts.append(prompt)
+        completed = False
+        try:
+            for token in self.tokens:
+                await asyncio.sleep(self.token_delay)
+                yield token
+            completed = True
+        finally:
+            self.completed.append(completed)
+
+    async def prefill(self, partial_query="", conversation_history=None, session_id=None):
+        return True
+
+
+class FakeTTS(ABCTTS):
+    """Records spoken chunks; playback lasts until `played` is set (or stop())."""
+
+    def __init__(self):
+        self.spoken = []
+        self.stops = 0
+        self.played = asyncio.Event()
+        self.played.set()
+
+    async def speak(self, text_chunk):
+        self.spoken.append(text_chunk)
+
+    async def stop(self):
+        self.stops += 1
+        self.played.set()
+
+    async def wait_idle(self):
+        await self.played.wait()
+
+
+class FakeVAD:
+    """Speech whenever the frame is not silence."""
+
+    def is_speech(self, frame):
+        return any(frame)
+
+    def reset(self):
+        pass
+
+
+@pytest_asyncio.fixture
+async def assistant():
+    config = Config()
+    config.vad.enabled = False
+    shared = SharedResources(config)
+    stt = FakeSTT()
+    shared.stt.client = lambda **kwargs: stt
+    shared.llm = FakeLLM(["Il est midi", "."])
+    pipeline = AssistantPipeline(
+        "kitchen", config, DeviceConfig(), shared, remote=RemoteAudioIO("kitchen", SatelliteConfig())
+    )
+    pipeline.tts_engine = FakeTTS()
+    await pipeline.fsm.start()
+    try:
+        yield pipeline
+    finally:
+        await pipeline.close()
+        await shared.close()
+
+
+async def _wait_for(condition, timeout=2.0):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+def _path(pipeline):
+    return [(record.source, record.target, record.event) for record in pipeline.fsm.history]
+
+
+@pytest.mark.asyncio
+async def test_wakeword_to_spoken_answer(assistant):
+    assistant.stt_engine.transcripts.append("quelle est la capitale du Pérou")
+
+    await assistant.wakeword_engine.callback()
+    await _wait_for(lambda: assistant.stt_engine.running)
+    await assistant.stt_engine.stop_stream()
+    await _wait_for(lambda: assistant.fsm.state == State.IDLE)
+
+    assert _path(assistant) == [
+        (State.IDLE, State.LISTENING, Event.WAKEWORD_DETECTED),
+        (State.LISTENING, State.THINKING, Event.TRANSCRIPTION_FINAL),
+        (State.THINKING, State.SPEAKING, Event.TTS_START),
+        (State.SPEAKING, State.IDLE, Event.TTS_COMPLETE),
+    ]
+    assert "".join(assistant.tts_engine.spoken) == "Il est midi."
+    assert assistant.fsm.session_manager.get_conversation_history()[-1] == (
+        "quelle est la capitale du Pérou", "Il est midi."
+    )
+
+
+@pytest.mark.asyncio
+async def test_barge_in_cancels_the_answer(assistant):
+    assistant.llm.tokens = ["Il était une fois un dragon."] + [" Il dormait."] * 50
+    assistant.llm.token_delay = 0.02
+    assistant.tts_engine.played.clear()  # The answer keeps playing
+    assistant.stt_engine.transcripts += ["raconte une histoire", "quelle heure est-il"]
+
+    await assistant.wakeword_engine.callback()
+    await _wait_for(lambda: assistant.stt_engine.running)
+    await assistant.stt_engine.stop_stream()
+    await _wait_for(lambda: assistant.fsm.state == State.SPEAKING)
+
+    # The wakeword again while speaking: silence, cancel, listen
+    await assistant.wakeword_engine.callback()
+    await _wait_for(lambda: assistant.stt_engine.running)
+    assert assistant.fsm.state == State.LISTENING
+    assert assistant.tts_engine.stops >= 1
+    await _wait_for(lambda: assistant.llm.completed == [False])
+
+    # The next question is answered by the intent fast-path
+    await assistant.stt_engine.stop_stream()
+    await _wait_for(lambda: assistant.fsm.state == State.IDLE)
+    assert assistant.tts_engine.spoken[-1].startswith("Il est")
+    assert _path(assistant)[-4:] == [
+        (State.SPEAKING, State.LISTENING, Event.INTERRUPT),
+        (State.LISTENING, State.THINKING, Event.TRANSCRIPTION_FINAL),
+        (State.THINKING, State.SPEAKING, Event.TTS_START),
+        (State.SPEAKING, State.IDLE, Event.TTS_COMPLETE),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_listening_timeout_without_speech(assistant):
+    assistant.timeouts.stt_silence = 0.05
+
+    await assistant.wakeword_engine.callback()
+    await _wait_for(lambda: assistant.fsm.state == State.IDLE)
+    await assistant.router.join()
+
+    assert _path(assistant) == [
+        (State.IDLE, State.LISTENING, Event.WAKEWORD_DETECTED),
+        (State.LISTENING, State.IDLE, None),
+    ]
+    assert assistant.llm.prompts == []
+    assert assistant.tts_engine.spoken == []
+
+
+@pytest.mark.asyncio
+async def test_listening_timeout_during_final_decode(assistant):
+    assistant.timeouts.stt_silence = 0.05
+    assistant.vad_engine = FakeVAD()
+    assistant.stt_engine.transcripts.append("quelle est la capitale du Pérou")
+    assistant.stt_engine.decoding.clear()
+
+    await assistant.wakeword_engine.callback()
+    await _wait_for(lambda: assistant.stt_engine.running)
+    # The VAD ends the utterance; its decode is still running at the deadline
+    await assistant.detect_speech(b"\x01\x00" * 160)
+    await assistant.detect_speech(bytes(320))
+    await asyncio.sleep(0.1)
+    assert assistant.fsm.state == State.LISTENING
+
+    assistant.stt_engine.decoding.set()
+    await _wait_for(lambda: assistant.fsm.state == State.IDLE and assistant.final_task.done())
+    await assistant.router.join()
+
+    # The late final runs the turn from THINKING, never from IDLE
+    assert _path(assistant) == [
+        (State.IDLE, State.LISTENING, Event.WAKEWORD_DETECTED),
+        (State.LISTENING, State.THINKING, Event.TRANSCRIPTION_FINAL),
+        (State.THINKING, State.SPEAKING, Event.TTS_START),
+        (State.SPEAKING, State.IDLE, Event.TTS_COMPLETE),
+    ]
+    assert "".join(assistant.tts_engine.spoken) == "Il est midi."
@@ -0,0 +1,33 @@
+from heisenberg.audio.buffers import AudioBuffer
+
+
+def test_audio_buffer_keeps_latest_audio():
+    buffer = AudioBuffer(capacity_ms=1, sample_rate=16000)  # 16 samples = 32 bytes
+    assert buffer.capacity == 32
+
+    buffer.write(bytes(range(20)))
+    assert buffer.read() == bytes(range(20))
+
+    buffer.write(bytes(range(20, 40)))
+    assert len(buffer) == 32
+    assert buffer.read() == bytes(range(8, 40))
+    assert buffer.duration_ms == 1.0
+
+
+def test_audio_buffer_read_recent_ms():
+    buffer = AudioBuffer(capacity_ms=10, sample_rate=1000)  # 2 bytes per ms
+    buffer.write(bytes(range(12)))
+    buffer.write(bytes(range(12, 24)))
+
+    assert buffer.read(ms=3) == bytes(range(18, 24))
+    assert buffer.read(ms=100) == bytes(range(4, 24))
+
+
+def test_audio_buffer_oversized_frame_and_clear():
+    buffer = AudioBuffer(capacity_ms=1, sample_rate=16000)
+    buffer.write(bytes(range(100)))
+    assert buffer.read() == bytes(range(68, 100))
+
+    buffer.clear()
+    assert len(buffer) == 0
+    assert buffer.read() == b""
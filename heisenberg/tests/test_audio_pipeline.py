@@ -0,0 +1,127 @@
+import asyncio
+import pytest
+from heisenberg.audio.pipeline import FrameBroadcaster, OverflowPolicy
+from heisenberg.orchestrator.fsm import FSM
+from heisenberg.orchestrator.router import EventRouter
+from heisenberg.orchestrator.events import Event
+from heisenberg.orchestrator.state import State
+from heisenberg.core.metrics import metrics
+
+
+class FakeSource:
+    """Audio source yielding numbered frames, then nothing."""
+
+    def __init__(self, count: int):
+        self.frames = [bytes([i]) * 4 for i in range(count)]
+
+    async def read_frame(self):
+        if self.frames:
+            return self.frames.pop(0)
+        await asyncio.sleep(0.001)
+        return None
+
+
+@pytest.mark.asyncio
+async def test_broadcaster_feeds_every_consumer():
+    broadcaster = FrameBroadcaster(FakeSource(0))
+    received = {"a": [], "b": []}
+
+    async def a(frame):
+        received["a"].append(frame)
+
+    async def b(frame):
+        received["b"].append(frame)
+
+    broadcaster.add_consumer("a", a)
+    broadcaster.add_consumer("b", b)
+    run = asyncio.create_task(broadcaster.run())
+    await asyncio.sleep(0)
+    for i in range(3):
+        broadcaster.publish(bytes([i]))
+    await broadcaster.join()
+
+    assert received["a"] == received["b"] == [b"\x00", b"\x01", b"\x02"]
+    await broadcaster.stop()
+    await run
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_does_not_hold_back_others():
+    broadcaster = FrameBroadcaster(FakeSource(20))
+    release = asyncio.Event()
+    fast_frames = []
+
+    async def slow(frame):
+        await release.wait()
+
+    async def fast(frame):
+        fast_frames.append(frame)
+
+    slow_consumer = broadcaster.add_consumer("slow", slow, queue_size=5, overflow=OverflowPolicy.DROP_OLDEST)
+    broadcaster.add_consumer("fast", fast)
+    run = asyncio.create_task(broadcaster.run())
+    await asyncio.sleep(0.05)
+
+    assert len(fast_frames) == 20
+    assert slow_consumer.dropped > 0
+
+    release.set()
+    await broadcaster.join()
+    # Only the most recent frames were kept for the slow stage
+    assert slow_consumer.processed == 20 - slow_consumer.dropped
+    assert slow_consumer.lag == 0
+    assert metrics.gauges["audio_consumer_lag[consumer=slow]"] == 0
+    await broadcaster.stop()
+    await run
+
+
+@pytest.mark.asyncio
+async def test_drop_newest_keeps_queue_head():
+    broadcaster = FrameBroadcaster(FakeSource(0))
+    frames = []
+
+    async def handler(frame):
+        frames.append(frame)
+
+    consumer = broadcaster.add_consumer("stt", handler, queue_size=2, overflow=OverflowPolicy.DROP_NEWEST)
+    for i in range(4):
+        broadcaster.publish(bytes([i]))
+    assert consumer.dropped == 2
+
+    run = asyncio.create_task(broadcaster.run())
+    await broadcaster.join()
+    assert frames == [b"\x00", b"\x01"]
+    await broadcaster.stop()
+    await run
+
+
+@pytest.mark.asyncio
+async def test_consumers_follow_fsm_state():
+    router = EventRouter()
+    fsm = FSM(router)
+    await fsm.start()
+    broadcaster = FrameBroadcaster(FakeSource(0))
+    wakeword_frames, stt_frames = [], []
+
+    async def wakeword(frame):
+        wakeword_frames.append(frame)
+
+    async def stt(frame):
+        stt_frames.append(frame)
+
+    broadcaster.add_consumer("wakeword", wakeword, states={State.IDLE})
+    broadcaster.add_consumer("stt", stt, states={State.LISTENING})
+    broadcaster.bind(fsm)
+    run = asyncio.create_task(broadcaster.run())
+
+    broadcaster.publish(b"idle")
+    await broadcaster.join()
+    await fsm.handle_event(Event.WAKEWORD_DETECTED)
+    broadcaster.publish(b"listening")
+    await broadcaster.join()
+
+    assert wakeword_frames == [b"idle"]
+    assert stt_frames == [b"listening"]
+    await broadcaster.stop()
+    await run
+    await fsm.stop()
@@ -0,0 +1,64 @@
+from heisenberg.tts.chunker import SentenceChunker
+
+
+def _stream(chunker, text, step=3):
+    """Feed text in small pieces, like LLM tokens."""
+    chunks = []
+    for i in range(0, len(text), step):
+        chunks.extend(chunker.feed(text[i:i + step]))
+    return chunks + chunker.flush()
+
+
+def test_short_first_chunk_then_sentences():
+    text = (
+        "D'accord, je regarde la météo pour demain matin. Il fera beau. "
+        "Les températures iront de 12 à 18 degrés. Pense quand même à prendre une veste !"
+    )
+    chunks = _stream(SentenceChunker(first_chunk_chars=5, min_chunk_chars=60), text)
+    assert chunks[0] == "D'accord,"
+    assert chunks[1] == "je regarde la météo pour demain matin. Il fera beau. Les températures iront de 12 à 18 degrés."
+    assert chunks[2] == "Pense quand même à prendre une veste !"
+
+
+def test_first_chunk_is_emitted_before_the_end():
+    chunker = SentenceChunker()
+    assert chunker.feed("Oui.") == []  # Not yet sure "." ends the sentence
+    assert chunker.feed(" Il") == ["Oui."]
+
+
+def test_french_punctuation_abbreviations_and_numbers():
+    text = (
+        "Bonjour ! M. Dupont a rendez-vous à 10:30, p.ex. avec J. K. Martin. "
+        "La facture est de 3,5 millions, soit 3.5 M€… « Incroyable ! » Voilà."
+    )
+    chunks = _stream(SentenceChunker(first_chunk_chars=200, min_chunk_chars=0), text)
+    assert chunks == [
+        "Bonjour !",
+        "M. Dupont a rendez-vous à 10:30, p.ex. avec J. K. Martin.",
+        "La facture est de 3,5 millions, soit 3.5 M€…",
+        "« Incroyable ! »",
+        "Voilà.",
+    ]
+
+
+def test_common_words_end_sentences():
+    text = "J'adore l'art. Mon vol. Il est 10:30. Lis l'art. 3 du vol. 2, no. 5 surtout."
+    chunks = _stream(SentenceChunker(first_chunk_chars=200, min_chunk_chars=0), text)
+    assert chunks == [
+        "J'adore l'art.",
+        "Mon vol.",
+        "Il est 10:30.",
+        "Lis l'art. 3 du vol. 2, no. 5 surtout.",
+    ]
+
+
+def test_list_items_and_long_sentences():
+    text = "Voici la recette :\n1. Casse les œufs.\n2. Bats-les.\n"
+    chunks = _stream(SentenceChunker(first_chunk_chars=200, min_chunk_chars=0), text)
+    assert chunks == ["Voici la recette :", "1. Casse les œufs.", "2. Bats-les."]
+
+    long_sentence = "Il était une fois " + "un très long récit, " * 12 + "qui finit."
+    chunks = _stream(SentenceChunker(first_chunk_chars=200, max_chunk_chars=100), long_sentence)
+    assert all(len(c) <= 100 for c in chunks)
+    assert all(c.endswith(",") for c in chunks[:-1])
+    assert " ".join(chunks) == long_sentence
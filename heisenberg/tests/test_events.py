@@ -1,18 +1,151 @@
+import asyncio
 import pytest
 from heisenberg.orchestrator.events import Event
 from heisenberg.orchestrator.router import EventRouter
+from heisenberg.core.logging import get_correlation_id, set_correlation_id
+from heisenberg.core.metrics import metrics
 
 @pytest.mark.asyncio
 async def test_event_router_dispatch():
     router = EventRouter()
-    
+
     received_event = None
-    
+
     async def handler():
         nonlocal received_event
         received_event = True
 
     router.register(Event.SPEECH_START, handler)
     await router.dispatch(Event.SPEECH_START)
-    
+    await router.join()
+
     assert received_event is True
+    await router.close()
+
+@pytest.mark.asyncio
+async def test_event_router_multiple_subscribers():
+    router = EventRouter()
+    received = []
+
+    async def first(text):
+        received.append(("first", text))
+
+    async def second(text):
+        received.append(("second", text))
+
+    router.register(Event.TRANSCRIPTION_FINAL, first)
+    router.register(Event.TRANSCRIPTION_FINAL, second)
+    assert await router.dispatch(Event.TRANSCRIPTION_FINAL, "bonjour") == 2
+    await router.join()
+
+    assert sorted(received) == [("first", "bonjour"), ("second", "bonjour")]
+    await router.close()
+
+@pytest.mark.asyncio
+async def test_slow_handler_does_not_block_dispatch():
+    router = EventRouter()
+    release = asyncio.Event()
+    fast_calls = []
+
+    async def slow():
+        await release.wait()
+
+    async def fast():
+        fast_calls.append(True)
+
+    router.subscribe(Event.SPEECH_END, slow, timeout=None)
+    router.subscribe(Event.SPEECH_END, fast)
+
+    # Returns at once although the slow handler has not finished
+    await asyncio.wait_for(router.dispatch(Event.SPEECH_END), timeout=0.1)
+    await asyncio.sleep(0.01)
+    assert fast_calls == [True]
+
+    release.set()
+    await router.join()
+    await router.close()
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_events():
+    router = EventRouter()
+    release = asyncio.Event()
+    calls = []
+
+    async def slow(i):
+        calls.append(i)
+        await release.wait()
+
+    subscription = router.subscribe(Event.LLM_TOKEN, slow, queue_size=2, timeout=None)
+    for i in range(5):
+        router.publish(Event.LLM_TOKEN, i)
+
+    assert subscription.dropped == 3
+    release.set()
+    await router.join()
+    assert calls == [0, 1]
+    await router.close()
+
+@pytest.mark.asyncio
+async def test_handler_timeout_and_error_are_isolated():
+    router = EventRouter(default_timeout=0.05)
+    calls = []
+
+    async def hangs():
+        await asyncio.sleep(10)
+
+    async def fails():
+        raise RuntimeError("boom")
+
+    async def works():
+        calls.append(True)
+
+    router.subscribe(Event.ERROR_OCCURRED, hangs, name="hangs")
+    router.register(Event.ERROR_OCCURRED, fails)
+    router.register(Event.ERROR_OCCURRED, works)
+    key = "event_handler_timeout[event=ERROR_OCCURRED,handler=hangs]"
+    timeouts_before = metrics.counters.get(key, 0)
+
+    await router.dispatch(Event.ERROR_OCCURRED)
+    await asyncio.wait_for(router.join(), timeout=1)
+    # The worker survives a failing handler
+    await router.dispatch(Event.ERROR_OCCURRED)
+    await asyncio.wait_for(router.join(), timeout=1)
+
+    assert calls == [True, True]
+    assert metrics.counters[key] == timeouts_before + 2
+    await router.close()
+
+@pytest.mark.asyncio
+async def test_handler_sees_publisher_correlation_id():
+    router = EventRouter()
+    seen = []
+
+    async def handler():
+        seen.append(get_correlation_id())
+
+    router.register(Event.SPEECH_START, handler)
+    set_correlation_id("turn-1")
+    await router.dispatch(Event.SPEECH_START)
+    set_correlation_id("turn-2")
+    await router.dispatch(Event.SPEECH_START)
+    await router.join()
+
+    assert seen == ["turn-1", "turn-2"]
+    await router.close()
+
+@pytest.mark.asyncio
+async def test_router_tags_metrics_with_instance():
+    router = EventRouter(default_timeout=0.05, tags={"instance": "kitchen"})
+
+    async def fails():
+        raise RuntimeError("boom")
+
+    router.subscribe(Event.ERROR_OCCURRED, fails, name="fails")
+    key = "event_handler_error[event=ERROR_OCCURRED,handler=fails,instance=kitchen]"
+    errors_before = metrics.counters.get(key, 0)
+
+    await router.dispatch(Event.ERROR_OCCURRED)
+    await asyncio.wait_for(router.join(), timeout=1)
+
+    assert metrics.counters[key] == errors_before + 1
+    await router.close()
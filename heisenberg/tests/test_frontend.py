@@ -0,0 +1,110 @@
+import multiprocessing
+import pytest
+from heisenberg.audio.frontend import SharedAudioRing
+from heisenberg.core.profiling import CpuSampler, JitterMeter
+
+
+def _write_frames(name: str, slots: int, slot_bytes: int, count: int) -> None:
+    ring = SharedAudioRing(slots, slot_bytes, name=name)
+    for i in range(count):
+        ring.write(bytes([i]) * 8, captured_at=float(i))
+    ring.close()
+
+
+@pytest.fixture
+def ring():
+    ring = SharedAudioRing(slots=4, slot_bytes=8)
+    yield ring
+    ring.close()
+
+
+def test_ring_round_trip(ring):
+    writer = SharedAudioRing(ring.slots, ring.slot_bytes, name=ring.name)
+    writer.write(b"abcd", captured_at=1.5)
+    writer.write(b"efgh", captured_at=2.5)
+
+    assert ring.read() == (b"abcd", 1.5)
+    assert ring.read() == (b"efgh", 2.5)
+    assert ring.read() is None
+    writer.close()
+
+
+def test_ring_splits_long_frames(ring):
+    ring.write(b"0123456789ab")
+    assert ring.read()[0] == b"01234567"
+    assert ring.read()[0] == b"89ab"
+
+
+def test_ring_reader_skips_overwritten_frames(ring):
+    for i in range(7):
+        ring.write(bytes([i]))
+
+    frames = []
+    while (item := ring.read()) is not None:
+        frames.append(item[0])
+    assert frames == [bytes([i]) for i in range(3, 7)]
+    assert ring.overruns == 3
+
+
+class _InterleavedReader(SharedAudioRing):
+    """Reader whose copy is interrupted halfway by `during_copy`."""
+
+    during_copy = None
+
+    def _copy(self, data, length):
+        first = bytes(self.shm.buf[data:data + length // 2])
+        if self.during_copy is not None:
+            self.during_copy()
+            self.during_copy = None
+        return first + bytes(self.shm.buf[data + length // 2:data + length])
+
+
+def test_ring_never_returns_torn_frames(ring):
+    reader = _InterleavedReader(ring.slots, ring.slot_bytes, name=ring.name)
+    for i in range(4):
+        ring.write(bytes([i]) * 8)  # Reader exactly one lap behind
+
+    # The writer laps the slot being copied
+    reader.during_copy = lambda: ring.write(b"\xff" * 8)
+    assert reader.read() is None
+    # The writer is paused halfway through rewriting the next slot
+    def paused_write():
+        data = ring._begin_slot(5)
+        ring.shm.buf[data:data + 4] = b"\xee" * 4
+    reader.during_copy = paused_write
+    assert reader.read() is None
+
+    frames = []
+    while (item := reader.read()) is not None:
+        frames.append(item[0])
+    assert frames == [bytes([2]) * 8, bytes([3]) * 8, b"\xff" * 8]
+    assert reader.overruns == 2
+    reader.close()
+
+
+def test_ring_across_processes(ring):
+    process = multiprocessing.get_context("spawn").Process(
+        target=_write_frames, args=(ring.name, ring.slots, ring.slot_bytes, 3)
+    )
+    process.start()
+    process.join(30)
+    assert process.exitcode == 0
+
+    assert [ring.read() for _ in range(3)] == [(bytes([i]) * 8, float(i)) for i in range(3)]
+
+
+def test_jitter_meter():
+    meter = JitterMeter(gain=1.0)
+    meter.observe(80, now=0.0)
+    assert meter.observe(80, now=0.080) == pytest.approx(0.0, abs=1e-6)
+    assert meter.observe(80, now=0.180) == pytest.approx(20.0)
+    assert meter.max_ms == pytest.approx(20.0)
+
+    meter.reset()
+    assert meter.observe(80, now=5.0) == pytest.approx(20.0)
+
+
+def test_cpu_sampler_measures_busy_work():
+    sampler = CpuSampler()
+    sum(i * i for i in range(200_000))
+    assert sampler.sample() > 0
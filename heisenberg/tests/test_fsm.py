@@ -1,8 +1,11 @@
+import asyncio
 import pytest
 from heisenberg.orchestrator.fsm import FSM
+from heisenberg.orchestrator.policies import Policies, Timeouts
 from heisenberg.orchestrator.state import State
 from heisenberg.orchestrator.events import Event
 from heisenberg.orchestrator.router import EventRouter
+from heisenberg.core.metrics import metrics
 
 @pytest.mark.asyncio
 async def test_fsm_initial_state():
@@ -19,3 +22,139 @@ async def test_fsm_wakeword_transition():
     
     await fsm.handle_event(Event.WAKEWORD_DETECTED)
     assert fsm.state == State.LISTENING
+
+@pytest.mark.asyncio
+async def test_fsm_ignores_events_without_transition():
+    router = EventRouter()
+    fsm = FSM(router)
+    await fsm.start()
+
+    assert await fsm.handle_event(Event.TTS_START) is None
+    assert fsm.state == State.IDLE
+
+@pytest.mark.asyncio
+async def test_fsm_guard_on_empty_transcription():
+    router = EventRouter()
+    fsm = FSM(router)
+    await fsm.start()
+
+    await fsm.handle_event(Event.WAKEWORD_DETECTED)
+    await fsm.handle_event(Event.TRANSCRIPTION_FINAL, "  ")
+    assert fsm.state == State.IDLE
+
+    await fsm.handle_event(Event.WAKEWORD_DETECTED)
+    await fsm.handle_event(Event.TRANSCRIPTION_FINAL, "quelle heure est-il")
+    assert fsm.state == State.THINKING
+    await fsm.stop()
+
+@pytest.mark.asyncio
+async def test_fsm_hooks_and_history():
+    router = EventRouter()
+    fsm = FSM(router)
+    await fsm.start()
+    calls = []
+
+    async def entered(old, new):
+        calls.append(("enter", old, new))
+
+    async def exited(old, new):
+        calls.append(("exit", old, new))
+
+    fsm.on_enter(State.LISTENING, entered)
+    fsm.on_exit(State.IDLE, exited)
+    await fsm.handle_event(Event.WAKEWORD_DETECTED)
+
+    assert calls == [
+        ("exit", State.IDLE, State.LISTENING),
+        ("enter", State.IDLE, State.LISTENING),
+    ]
+    record = fsm.history[-1]
+    assert (record.source, record.target, record.event) == (State.IDLE, State.LISTENING, Event.WAKEWORD_DETECTED)
+    assert record.duration_ms >= 0
+    assert "fsm_state_time[state=IDLE]" in metrics.latencies
+    await fsm.stop()
+
+@pytest.mark.asyncio
+async def test_fsm_state_deadline_fires_timeout():
+    router = EventRouter()
+    policies = Policies(timeouts=Timeouts(llm_generation=0.05))
+    fsm = FSM(router, policies)
+    await fsm.start()
+    expired = []
+
+    async def on_timeout(state):
+        expired.append(state)
+
+    router.subscribe(Event.TIMEOUT, on_timeout)
+    await fsm.handle_event(Event.WAKEWORD_DETECTED)
+    await fsm.handle_event(Event.TRANSCRIPTION_FINAL, "raconte une histoire")
+    assert fsm.state == State.THINKING
+
+    await asyncio.sleep(0.1)
+    await router.join()
+    assert fsm.state == State.IDLE
+    assert expired == [State.THINKING]
+    assert fsm.history[-1].event == Event.TIMEOUT
+    await router.close()
+
+@pytest.mark.asyncio
+async def test_fsm_timer_cancelled_on_exit():
+    router = EventRouter()
+    policies = Policies(timeouts=Timeouts(stt_silence=0.05))
+    fsm = FSM(router, policies)
+    await fsm.start()
+
+    await fsm.handle_event(Event.WAKEWORD_DETECTED)
+    await fsm.handle_event(Event.TRANSCRIPTION_FINAL, "bonjour")
+    await asyncio.sleep(0.1)
+    assert fsm.state == State.THINKING
+    assert all(record.event != Event.TIMEOUT for record in fsm.history)
+    await fsm.stop()
+
+@pytest.mark.asyncio
+async def test_fsm_interrupt_returns_to_listening():
+    router = EventRouter()
+    fsm = FSM(router)
+    await fsm.start()
+
+    await fsm.handle_event(Event.WAKEWORD_DETECTED)
+    await fsm.handle_event(Event.TRANSCRIPTION_FINAL, "raconte une histoire")
+    await fsm.handle_event(Event.TTS_START)
+    assert fsm.state == State.SPEAKING
+
+    await fsm.handle_event(Event.INTERRUPT, "wakeword", 0.0)
+    assert fsm.state == State.LISTENING
+
+    # No barge-in while idle
+    await fsm.transition(State.IDLE)
+    assert await fsm.handle_event(Event.INTERRUPT, "vad", 0.0) is None
+    await fsm.stop()
+
+@pytest.mark.asyncio
+async def test_fsm_drops_final_after_listening_timeout():
+    router = EventRouter()
+    policies = Policies(timeouts=Timeouts(stt_silence=0.05))
+    fsm = FSM(router, policies)
+    await fsm.start()
+    finals = []
+
+    async def on_timeout(state):
+        if state == State.LISTENING:
+            await fsm.transition(State.IDLE)
+
+    async def on_final(text):
+        finals.append(text)
+
+    router.subscribe(Event.TIMEOUT, on_timeout)
+    router.subscribe(Event.TRANSCRIPTION_FINAL, on_final)
+    await fsm.handle_event(Event.WAKEWORD_DETECTED)
+    await asyncio.sleep(0.1)
+    await router.join()
+    assert fsm.state == State.IDLE
+
+    # The decode finishes late: no turn may run while IDLE
+    assert await fsm.handle_event(Event.TRANSCRIPTION_FINAL, "quelle heure est-il") is None
+    await router.join()
+    assert fsm.state == State.IDLE
+    assert finals == []
+    await router.close()
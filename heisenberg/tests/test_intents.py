@@ -0,0 +1,56 @@
+import pytest
+from datetime import datetime
+from heisenberg.core.config import IntentConfig
+from heisenberg.intents import IntentRouter, register_builtin_intents
+
+@pytest.fixture
+def router():
+    router = IntentRouter(IntentConfig())
+    register_builtin_intents(router, clock=lambda: datetime(2026, 6, 1, 15, 5))
+    return router
+
+@pytest.mark.asyncio
+async def test_builtin_time_and_date(router):
+    result = await router.handle("Quelle heure est-il ?")
+    assert result.response == "Il est 15 h 05."
+    assert result.match.confidence == 1.0
+
+    result = await router.handle("Dis-moi, quelle heure il est")
+    assert result.match.intent == "time"
+
+    result = await router.handle("On est quel jour ?")
+    assert result.response == "Nous sommes le lundi 1er juin 2026."
+
+@pytest.mark.asyncio
+async def test_falls_through_to_llm(router):
+    assert await router.handle("À quelle heure ferme la boulangerie ?") is None
+    assert await router.handle("Raconte-moi une histoire sur un dragon") is None
+    assert router.hits == 0 and router.misses == 2
+
+@pytest.mark.asyncio
+async def test_user_handler_and_stats(router):
+    calls = []
+    async def lights_on(match):
+        calls.append(match.groups.get("room"))
+        return "C'est allumé."
+    router.register("lights_on", lights_on, patterns=[r"^allume (?:la lumiere|les lumieres)(?: (?:du|de la) (?P<room>\w+))?$"])
+
+    router.observe_llm_latency(1500.0)
+    result = await router.handle("Allume la lumière du salon.")
+    await router.handle("Quelle heure est-il ?")
+    await router.handle("Pourquoi le ciel est bleu ?")
+
+    assert result.response == "C'est allumé."
+    assert calls == ["salon"]
+    assert router.hits == 2
+    assert router.hit_rate == pytest.approx(2 / 3)
+    assert router.latency_saved_ms > 2900
+
+@pytest.mark.asyncio
+async def test_stop_only_as_a_whole_command(router):
+    for text in ("Stop !", "Arrête, stop.", "Tais-toi", "Laisse tomber"):
+        result = await router.handle(text)
+        assert result.match.intent == "stop" and result.response == ""
+
+    assert await router.handle("Comment on dit stop en anglais ?") is None
+    assert await router.handle("Stop la musique") is None
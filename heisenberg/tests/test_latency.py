@@ -4,4 +4,4 @@ from heisenberg.core.metrics import metrics
 def test_metrics_recording():
     metrics.record_latency("test_op", 100.0)
     assert "test_op" in metrics.latencies
-    assert metrics.latencies["test_op"][-1] == 100.0
+    assert metrics.latencies["test_op"].last == 100.0
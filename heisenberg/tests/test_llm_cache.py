@@ -0,0 +1,47 @@
+import time
+from heisenberg.llm.cache import ResponseCache
+
+
+def test_key_normalizes_query_and_tracks_context():
+    key = ResponseCache.make_key("Quelle heure est-il ?", "sys", "plain")
+    assert key == ResponseCache.make_key("quelle heure est il", "sys", "plain")
+    assert key != ResponseCache.make_key("Quelle heure est-il ?", "autre", "plain")
+    assert key != ResponseCache.make_key("Quelle heure est-il ?", "sys", "plain", [("Salut", "Bonjour")])
+
+
+def test_lru_eviction_by_count_and_bytes():
+    cache = ResponseCache(max_entries=2, max_bytes=10_000)
+    cache.put("a", ["un"])
+    cache.put("b", ["deux"])
+    assert cache.get("a") == ["un"]  # "a" is now most recently used
+    cache.put("c", ["trois"])
+    assert cache.get("b") is None
+    assert len(cache) == 2
+
+    small = ResponseCache(max_bytes=15)
+    small.put("k1", ["x" * 8])
+    small.put("k2", ["y" * 8])
+    assert small.get("k1") is None and small.get("k2") == ["y" * 8]
+    assert small.bytes_held == 10
+    small.put("big", ["z" * 50])  # Larger than the whole budget: not stored
+    assert small.get("big") is None
+
+
+def test_ttl_expiry_and_hit_rate():
+    cache = ResponseCache(ttl_seconds=60)
+    cache.put("old", ["périmé"], created_at=time.time() - 120)
+    cache.put("new", ["frais"])
+    assert cache.get("old") is None
+    assert cache.get("new") == ["frais"]
+    assert cache.hit_rate == 0.5
+    assert cache.bytes_held == len("new") + len("frais")
+
+
+def test_persistence_round_trip(tmp_path):
+    path = str(tmp_path / "responses.json")
+    cache = ResponseCache(path=path)
+    cache.put("k", ["Il est", " midi."])
+    cache.save()
+
+    reloaded = ResponseCache(path=path)
+    assert reloaded.get("k") == ["Il est", " midi."]
@@ -0,0 +1,390 @@
+import pytest
+import asyncio
+import json
+from aiohttp import web
+from heisenberg.core.config import LLMConfig
+from heisenberg.llm.stream import LlamaCppLLM
+
+
+def _sse(tokens, **final):
+    """Render a llama.cpp-style SSE body for the given tokens."""
+    events = [{"content": t, "stop": False} for t in tokens]
+    events.append({"content": "", "stop": True, **final})
+    return b"".join(b"data: " + json.dumps(e).encode() + b"\n\n" for e in events)
+
+
+class StubLlamaServer:
+    """Minimal llama.cpp stand-in recording requests and client connections."""
+
+    def __init__(self, tokens=("Bonjour", " !"), final=None, token_delay=None, first_token_delay=None):
+        self.tokens = list(tokens)
+        self.final = final or {}
+        self.token_delay = token_delay
+        self.first_token_delay = first_token_delay
+        self.health_status = 200
+        self.body = None
+        self.slots_state = [{"id": 0, "is_processing": False}]
+        self.tokens_sent = 0
+        self.disconnected = asyncio.Event()
+        self.payloads = []
+        self.peers = []
+        self.slot_actions = []
+        self.tokenized = []
+        self.app = web.Application()
+        self.app.router.add_get("/health", self.health)
+        self.app.router.add_get("/slots", self.slots_info)
+        self.app.router.add_post("/completion", self.completion)
+        self.app.router.add_post("/slots/{slot}", self.slots)
+        self.app.router.add_post("/tokenize", self.tokenize)
+        self.runner = None
+
+    async def health(self, request):
+        self.peers.append(request.transport.get_extra_info("peername"))
+        return web.json_response({"status": "ok"}, status=self.health_status)
+
+    async def slots_info(self, request):
+        return web.json_response(self.slots_state)
+
+    async def completion(self, request):
+        self.peers.append(request.transport.get_extra_info("peername"))
+        self.payloads.append(await request.json())
+        if self.payloads[-1].get("n_predict") == 0:  # Prefill
+            return web.json_response({"content": "", "timings": {"prompt_n": 3, "prompt_ms": 1.0}})
+        if self.token_delay is None and self.first_token_delay is None:
+            body = self.body if self.body is not None else _sse(self.tokens, **self.final)
+            return web.Response(body=body, content_type="text/event-stream")
+
+        # Stream token by token, like llama.cpp, and notice when the client hangs up
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        try:
+            await asyncio.sleep(self.first_token_delay or 0)
+            for token in self.tokens:
+                await response.write(b"data: " + json.dumps({"content": token, "stop": False}).encode() + b"\n\n")
+                self.tokens_sent += 1
+                await asyncio.sleep(self.token_delay or 0)
+            await response.write(b"data: " + json.dumps({"content": "", "stop": True}).encode() + b"\n\n")
+        except (ConnectionResetError, asyncio.CancelledError):
+            self.disconnected.set()
+        return response
+
+    async def slots(self, request):
+        body = await request.json()
+        self.slot_actions.append((int(request.match_info["slot"]), request.query["action"], body["filename"]))
+        return web.json_response({"id_slot": int(request.match_info["slot"])})
+
+    async def tokenize(self, request):
+        content = (await request.json())["content"]
+        self.tokenized.append(content)
+        return web.json_response({"tokens": list(range(len(content.split())))})
+
+    async def start_tcp(self) -> str:
+        self.runner = web.AppRunner(self.app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}/completion"
+
+    async def start_unix(self, path: str) -> None:
+        self.runner = web.AppRunner(self.app)
+        await self.runner.setup()
+        await web.UnixSite(self.runner, path).start()
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_pooled_session_reuses_connection():
+    server = StubLlamaServer()
+    endpoint = await server.start_tcp()
+    llm = LlamaCppLLM(LLMConfig(endpoint=endpoint))
+    try:
+        await llm.start()
+        first = await llm.generate_simple("Salut")
+        second = await llm.generate_simple("Encore")
+    finally:
+        await llm.aclose()
+        await server.stop()
+
+    assert first == second == "Bonjour !"
+    # Pre-connect + two turns all travel over the same keep-alive socket
+    assert len(server.peers) == 3
+    assert len(set(server.peers)) == 1
+
+
+@pytest.mark.asyncio
+async def test_unix_socket_transport(tmp_path):
+    server = StubLlamaServer()
+    socket_path = str(tmp_path / "llama.sock")
+    await server.start_unix(socket_path)
+    llm = LlamaCppLLM(LLMConfig(endpoint="http://localhost/completion", unix_socket=socket_path))
+    try:
+        async with llm:
+            response = await llm.generate_simple("Salut")
+    finally:
+        await server.stop()
+
+    assert response == "Bonjour !"
+    assert server.payloads[0]["stream"] is True
+
+
+@pytest.mark.asyncio
+async def test_prompt_cache_and_slot_pinning():
+    server = StubLlamaServer(final={
+        "tokens_evaluated": 200,
+        "timings": {"prompt_n": 20, "prompt_ms": 42.0},
+    })
+    endpoint = await server.start_tcp()
+    config = LLMConfig(endpoint=endpoint, n_slots=2, slot_persist=True)
+    llm = LlamaCppLLM(config)
+    try:
+        await llm.start()
+        await llm.generate_simple("Salut", session_id="kitchen")
+        await llm.generate_simple("Salut", session_id="bedroom")
+        await llm.generate_simple("Encore", session_id="kitchen")
+    finally:
+        await llm.aclose()
+        await server.stop()
+
+    assert all(p["cache_prompt"] for p in server.payloads)
+    assert [p["id_slot"] for p in server.payloads] == [0, 1, 0]
+    assert llm.last_timings["cached_tokens"] == 180
+    assert llm.last_timings["cached_ratio"] == pytest.approx(0.9)
+    assert server.slot_actions == [
+        (0, "restore", "heisenberg-slot0.bin"),
+        (1, "restore", "heisenberg-slot1.bin"),
+        (0, "save", "heisenberg-slot0.bin"),
+        (1, "save", "heisenberg-slot1.bin"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_response_cache_replays_stream():
+    server = StubLlamaServer(tokens=["Il est", " midi", "."])
+    endpoint = await server.start_tcp()
+    llm = LlamaCppLLM(LLMConfig(endpoint=endpoint, response_cache_enabled=True))
+    try:
+        async with llm:
+            first = [t async for t in llm.generate("Quelle heure est-il ?")]
+            second = [t async for t in llm.generate("quelle heure est-il")]
+            other = await llm.generate_simple("Quelle heure est-il ?", conversation_history=[("Salut", "Bonjour")])
+    finally:
+        await server.stop()
+
+    assert first == second == ["Il est", " midi", "."]
+    assert other == "Il est midi."
+    # The repeated query never reached the server; a different history did
+    assert len(server.payloads) == 2
+    assert llm.response_cache.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_token_budget_uses_cached_counts():
+    server = StubLlamaServer()
+    endpoint = await server.start_tcp()
+    config = LLMConfig(endpoint=endpoint, system_prompt="Tu es Heisenberg.", max_prompt_tokens=120, prompt_query_reserve_tokens=10)
+    llm = LlamaCppLLM(config)
+    history = [(f"question {i}", "Réponse courte. " + " ".join(["bla"] * 30)) for i in range(3)]
+    try:
+        async with llm:
+            await llm.generate_simple("Suite", conversation_history=history)
+            tokenized = len(server.tokenized)
+            await llm.generate_simple("Encore", conversation_history=history)
+    finally:
+        await server.stop()
+
+    # Each message is tokenized once; the second turn is served from the cache
+    assert tokenized == len(set(server.tokenized)) == len(server.tokenized)
+    prompt = server.payloads[-1]["prompt"]
+    # The two oldest turns are compacted together (blocks of max_history_turns // 2)
+    assert prompt.count("Assistant: Réponse courte. …") == 2
+    assert prompt.count("bla") == 30
+
+
+@pytest.mark.asyncio
+async def test_client_stop_aborts_request():
+    tokens = ["Il est midi", ".", " Bon", " appétit", " !", " Assis", "tant", ":"] + [" bla"] * 100
+    server = StubLlamaServer(tokens=tokens, token_delay=0.005)
+    endpoint = await server.start_tcp()
+    llm = LlamaCppLLM(LLMConfig(endpoint=endpoint, max_sentences=5))
+    try:
+        async with llm:
+            response = await llm.generate_simple("Quelle heure est-il ?")
+            await asyncio.wait_for(server.disconnected.wait(), timeout=2)
+    finally:
+        await server.stop()
+
+    # Text up to the bogus "Assistant:" turn; the request is dropped long before n_predict
+    assert response.rstrip() == "Il est midi. Bon appétit !"
+    assert server.tokens_sent < 20
+
+
+@pytest.mark.asyncio
+async def test_last_event_without_newline_is_kept():
+    server = StubLlamaServer()
+    # Connection closed right after the final event, before its line ended
+    server.body = _sse(["Bonjour"]).rsplit(b"data: ", 1)[0] + b'data: {"content": " !", "stop": true}'
+    endpoint = await server.start_tcp()
+    llm = LlamaCppLLM(LLMConfig(endpoint=endpoint, stop_sequences=["!!"]))
+    try:
+        async with llm:
+            response = await llm.generate_simple("Salut")
+    finally:
+        await server.stop()
+
+    assert response == "Bonjour !"
+
+
+@pytest.mark.asyncio
+async def test_cancel_generation_handle():
+    server = StubLlamaServer(tokens=[f" mot{i}" for i in range(200)], token_delay=0.005)
+    endpoint = await server.start_tcp()
+    llm = LlamaCppLLM(LLMConfig(endpoint=endpoint))
+    try:
+        async with llm:
+            handle = llm.start_generation("Raconte une histoire")
+            received = []
+            async for token in handle:
+                received.append(token)
+                if len(received) == 3:
+                    await asyncio.sleep(0.05)  # Tokens keep arriving while we dawdle
+                    await llm.cancel()
+
+            await asyncio.wait_for(server.disconnected.wait(), timeout=2)
+            sent_before_abort = server.tokens_sent
+            server.token_delay = None
+            follow_up = await llm.generate_simple("Encore")  # Pool still usable
+    finally:
+        await server.stop()
+
+    assert handle.cancelled and handle.done()
+    assert len(received) == 3
+    assert handle.tokens_wasted > 0
+    assert sent_before_abort < 200
+    assert follow_up.startswith(" mot0")
+
+
+@pytest.mark.asyncio
+async def test_cancel_before_first_step():
+    llm = LlamaCppLLM(LLMConfig(endpoint="http://127.0.0.1:9/completion"))
+    handle = llm.start_generation("Salut")
+    await handle.cancel()
+    assert await handle.result() == ""
+    assert not llm._active
+    await llm.aclose()
+
+
+@pytest.mark.asyncio
+async def test_cancel_only_one_session():
+    llm = LlamaCppLLM(LLMConfig(endpoint="http://127.0.0.1:9/completion"))
+    kitchen = llm.start_generation("Salut", session_id="kitchen")
+    office = llm.start_generation("Salut", session_id="office")
+    await llm.cancel("kitchen")
+    assert kitchen.cancelled
+    assert not office.cancelled and office in llm._active
+    await llm.cancel()
+    assert office.cancelled
+    await llm.aclose()
+
+@pytest.mark.asyncio
+async def test_router_fails_over_and_keeps_affinity():
+    dead = StubLlamaServer()
+    dead_endpoint = await dead.start_tcp()
+    await dead.stop()  # Nothing listens there any more
+    live = StubLlamaServer(tokens=["Présent"])
+    live_endpoint = await live.start_tcp()
+    llm = LlamaCppLLM(LLMConfig(endpoint=dead_endpoint, endpoints=[live_endpoint]))
+    try:
+        response = await llm.generate_simple("Tu es là ?", session_id="cuisine")
+        await llm.router.probe_all()
+        again = await llm.generate_simple("Toujours là ?", session_id="cuisine")
+    finally:
+        await llm.aclose()
+        await live.stop()
+
+    assert response == again == "Présent"
+    dead_ep, live_ep = llm.router.endpoints
+    assert not dead_ep.healthy and live_ep.healthy
+    assert llm.router.pick("cuisine") is live_ep
+    assert len(live.payloads) == 2
+    assert dead_ep.outstanding == live_ep.outstanding == 0
+
+
+@pytest.mark.asyncio
+async def test_router_hedges_slow_first_token():
+    slow = StubLlamaServer(tokens=["lent"], first_token_delay=0.5)
+    fast = StubLlamaServer(tokens=["rapide"])
+    slow_endpoint = await slow.start_tcp()
+    fast_endpoint = await fast.start_tcp()
+    llm = LlamaCppLLM(LLMConfig(endpoint=slow_endpoint, endpoints=[fast_endpoint], hedge_after_ms=50))
+    try:
+        async with llm:
+            start = asyncio.get_running_loop().time()
+            response = await llm.generate_simple("Vite", session_id="salon")
+            elapsed = asyncio.get_running_loop().time() - start
+            await asyncio.wait_for(slow.disconnected.wait(), timeout=2)
+    finally:
+        await slow.stop()
+        await fast.stop()
+
+    assert response == "rapide"
+    assert elapsed < 0.4
+    # The session now lives on the server that answered
+    assert llm.router.pick("salon").url == fast_endpoint
+    assert all(e.outstanding == 0 for e in llm.router.endpoints)
+
+
+@pytest.mark.asyncio
+async def test_router_least_loaded_dispatch():
+    busy = StubLlamaServer()
+    idle = StubLlamaServer()
+    busy.slots_state = [{"id": 0, "is_processing": True}, {"id": 1, "is_processing": False}]
+    idle.slots_state = [{"id": 0, "is_processing": False}, {"id": 1, "is_processing": False}]
+    busy_endpoint = await busy.start_tcp()
+    idle_endpoint = await idle.start_tcp()
+    llm = LlamaCppLLM(LLMConfig(endpoint=busy_endpoint, endpoints=[idle_endpoint]))
+    try:
+        async with llm:
+            busy_ep, idle_ep = llm.router.endpoints
+            assert (busy_ep.idle_slots, idle_ep.idle_slots) == (1, 2)
+            assert llm.router.pick("nouvelle") is idle_ep
+
+            llm.router.acquire(idle_ep)
+            assert llm.router.pick("autre") is busy_ep
+            llm.router.release(idle_ep)
+
+            idle.health_status = 503  # Reloading its model
+            await llm.router.probe_all()
+            assert llm.router.pick("nouvelle") is busy_ep
+    finally:
+        await busy.stop()
+        await idle.stop()
+
+
+@pytest.mark.asyncio
+async def test_abandoned_requests_keep_endpoint_healthy():
+    first = StubLlamaServer(tokens=[f" mot{i}" for i in range(200)], token_delay=0.005)
+    second = StubLlamaServer()
+    first_endpoint = await first.start_tcp()
+    second_endpoint = await second.start_tcp()
+    llm = LlamaCppLLM(LLMConfig(endpoint=first_endpoint, endpoints=[second_endpoint]))
+    try:
+        assert await llm.prefill("Raconte", session_id="salon")
+        bound = llm.router.pick("salon")
+
+        handle = llm.start_generation("Raconte une histoire", session_id="salon")
+        async for _ in handle:
+            await llm.cancel("salon")  # Barge-in
+        await asyncio.wait_for(first.disconnected.wait(), timeout=2)
+    finally:
+        await llm.aclose()
+        await first.stop()
+        await second.stop()
+
+    assert handle.cancelled
+    assert bound.url == first_endpoint
+    # Neither a prefill nor a cancelled generation says anything about the server
+    assert all(e.healthy and e.failures == 0 and e.outstanding == 0 for e in llm.router.endpoints)
+    assert llm.router.pick("salon") is bound
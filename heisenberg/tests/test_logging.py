@@ -0,0 +1,71 @@
+import json
+import logging
+import queue
+import sys
+import threading
+
+from heisenberg.core.logging import (
+    NonBlockingQueueHandler,
+    RateLimitFilter,
+    StructuredFormatter,
+    set_correlation_id,
+)
+from heisenberg.core.metrics import metrics
+
+
+def _record(level=logging.INFO, name="heisenberg.test", msg="hello %s", args=("world",), **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_extra_fields_are_serialized():
+    record = _record(old_state="IDLE", stages={"stt_done": 12.5})
+    data = json.loads(StructuredFormatter().format(record))
+    assert data["message"] == "hello world"
+    assert data["old_state"] == "IDLE"
+    assert data["stages"] == {"stt_done": 12.5}
+    assert "args" not in data and "lineno" not in data
+
+
+def test_queue_handler_captures_context_and_drops_when_full():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    key = "log_records_dropped[level=INFO]"
+    dropped_before = metrics.counters.get(key, 0)
+    set_correlation_id("turn-9")
+    try:
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            record = _record(exc_info=sys.exc_info())
+        handler.handle(record)
+        handler.handle(_record())
+    finally:
+        set_correlation_id(None)
+
+    queued = handler.queue.get_nowait()
+    # Formatted later on the listener thread, outside this context
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(json.loads(StructuredFormatter().format(queued))))
+    thread.start()
+    thread.join()
+    assert result["correlation_id"] == "turn-9"
+    assert result["message"] == "hello world"
+    assert "ValueError: boom" in result["exception"]
+    assert handler.dropped == 1
+    assert metrics.counters[key] == dropped_before + 1
+
+
+def test_rate_limit_per_module():
+    limiter = RateLimitFilter(rate=0.001, burst=3)
+    passed = [limiter.filter(_record(logging.DEBUG, name="heisenberg.audio")) for _ in range(10)]
+    assert passed == [True] * 3 + [False] * 7
+
+    # Other modules and higher levels are not affected
+    assert limiter.filter(_record(logging.DEBUG, name="heisenberg.llm"))
+    assert limiter.filter(_record(logging.INFO, name="heisenberg.audio"))
+
+    limiter._buckets["heisenberg.audio"][0] = 1.0  # Refilled
+    record = _record(logging.DEBUG, name="heisenberg.audio")
+    assert limiter.filter(record)
+    assert record.suppressed == 7
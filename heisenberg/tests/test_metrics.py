@@ -0,0 +1,98 @@
+import threading
+
+import aiohttp
+import pytest
+
+from heisenberg.core.config import MetricsConfig
+from heisenberg.core.metrics import Histogram, MetricsRegistry
+from heisenberg.core.metrics_server import MetricsServer
+
+
+def test_histogram_percentiles_in_fixed_memory():
+    histogram = Histogram()
+    size = len(histogram.buckets)
+    for value in range(1, 100_001):
+        histogram.record(value / 100)  # 0.01ms .. 1000ms, uniform
+
+    assert len(histogram.buckets) == size
+    assert histogram.count == 100_000
+    assert histogram.min == 0.01 and histogram.max == 1000
+    for q in (50, 95, 99):
+        assert histogram.percentile(q) == pytest.approx(q * 10, rel=0.05)
+    assert histogram.percentile(100) == 1000  # Clamped to what was seen
+
+
+def test_histogram_out_of_range_values():
+    histogram = Histogram()
+    histogram.record(0.0)
+    histogram.record(10 * 3_600_000)
+    assert histogram.percentile(1) == 0.0
+    assert histogram.percentile(99) == 10 * 3_600_000
+
+
+def test_prometheus_rendering():
+    registry = MetricsRegistry()
+    registry.increment("llm_requests", {"instance": "kitchen"})
+    registry.increment("llm_requests", {"instance": "office"}, value=2)
+    registry.set_gauge("tts_rtf", 0.25)
+    registry.record_latency("turn_stage", 120.0, {"stage": "stt_done", "instance": 'say "hi"'})
+
+    lines = registry.render_prometheus().splitlines()
+
+    assert lines[:3] == [
+        "# TYPE heisenberg_llm_requests_total counter",
+        'heisenberg_llm_requests_total{instance="kitchen"} 1',
+        'heisenberg_llm_requests_total{instance="office"} 2',
+    ]
+    assert "# TYPE heisenberg_tts_rtf gauge" in lines
+    assert "heisenberg_tts_rtf 0.25" in lines
+    assert "# TYPE heisenberg_turn_stage_ms summary" in lines
+    assert 'heisenberg_turn_stage_ms{instance="say \\"hi\\"",stage="stt_done",quantile="0.99"} 120' in lines
+    assert 'heisenberg_turn_stage_ms_count{instance="say \\"hi\\"",stage="stt_done"} 1' in lines
+
+
+def test_recording_from_threads():
+    registry = MetricsRegistry()
+
+    def work():
+        for _ in range(10_000):
+            registry.increment("frames")
+            registry.record_latency("decode", 5.0)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert registry.counters["frames"] == 40_000
+    assert registry.latencies["decode"].count == 40_000
+
+
+@pytest.mark.asyncio
+async def test_metrics_and_readiness_endpoints():
+    registry = MetricsRegistry()
+    registry.increment("wakeword_detections")
+    server = MetricsServer(MetricsConfig(port=0), registry)
+    ready = False
+    server.add_readiness_check("pipelines", lambda: ready)
+    await server.start()
+    try:
+        base = f"http://127.0.0.1:{server.port}"
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f"{base}/metrics") as response:
+                assert response.status == 200
+                assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+                assert "heisenberg_wakeword_detections_total 1" in await response.text()
+
+            async with session.get(f"{base}/healthz") as response:
+                assert response.status == 200
+
+            async with session.get(f"{base}/readyz") as response:
+                assert response.status == 503
+                assert await response.json() == {"ready": False, "checks": {"pipelines": False}}
+            ready = True
+            async with session.get(f"{base}/readyz") as response:
+                assert response.status == 200
+    finally:
+        await server.stop()
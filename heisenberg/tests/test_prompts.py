@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+from heisenberg.llm.prompts import PromptBuilder
+
+def _history(n):
+    return [(f"question {i}", f"réponse {i}") for i in range(n)]
+
+def test_window_drops_history_in_blocks():
+    builder = PromptBuilder(system_prompt="Tu es Heisenberg.", format_style="plain")
+
+    assert builder.window(_history(3), 5) == _history(3)
+    # The first retained turn only moves every max_turns // 2 turns
+    starts = [builder.window(_history(n), 4)[0][0] for n in range(5, 10)]
+    assert starts == ["question 2", "question 2", "question 4", "question 4", "question 6"]
+    assert all(len(builder.window(_history(n), 4)) <= 4 for n in range(20))
+
+def test_prefix_is_byte_stable_between_turns():
+    builder = PromptBuilder(system_prompt="Tu es Heisenberg.", format_style="chatml")
+    history = [("Bonjour ", " Salut !\n")]
+
+    first = builder.build(history, "Quelle heure est-il ?")
+    second = builder.build(history + [("Quelle heure est-il ?", "Il est midi.")], "Merci")
+
+    prefix = first[: first.rindex("<|im_start|>assistant")]
+    assert second.startswith(prefix)
+
+def test_prefix_matches_final_prompt():
+    for style in ("plain", "chatml", "llama2"):
+        builder = PromptBuilder(system_prompt="Tu es Heisenberg.", format_style=style)
+        history = [("Bonjour", "Salut !")]
+        final = builder.build(history, "quelle heure est-il ?")
+
+        assert final.startswith(builder.build_prefix(history, "quelle heure"))
+        assert final.startswith(builder.build_prefix(history, ""))
+
+async def _word_count(text):
+    return len(text.split())
+
+def test_compact_turn_keeps_first_sentence():
+    assert PromptBuilder.compact_turn("Salut", "Bonjour ! Comment vas-tu ?") == ("Salut", "Bonjour ! …")
+    assert PromptBuilder.compact_turn("a", " ".join(["mot"] * 10), max_words=3) == ("a", "mot mot mot…")
+
+@pytest.mark.asyncio
+async def test_fit_to_budget_compacts_then_drops_oldest():
+    builder = PromptBuilder(system_prompt="Tu es Heisenberg.", format_style="plain")
+    long_answer = "Première phrase. " + " ".join(["bla"] * 40) + "."
+    history = [(f"question {i}", long_answer) for i in range(4)]
+
+    assert await builder.fit_to_budget(history, 10_000, _word_count) == history
+
+    fitted = await builder.fit_to_budget(history, 170, _word_count, reserve_tokens=10, step=2)
+    assert fitted[:2] == [("question 0", "Première phrase. …"), ("question 1", "Première phrase. …")]
+    assert fitted[2:] == history[2:]
+
+    fitted = await builder.fit_to_budget(history, 60, _word_count, reserve_tokens=10, step=2)
+    assert fitted == [(f"question {i}", "Première phrase. …") for i in (2, 3)]
+
+@pytest.mark.asyncio
+async def test_fit_to_budget_prefix_is_mostly_stable():
+    builder = PromptBuilder(system_prompt="Tu es Heisenberg.", format_style="plain")
+    answer = "Oui. " + " ".join(["bla"] * 20)
+    heads = []
+    for n in range(4, 16):
+        history = [(f"question {i}", answer) for i in range(n)]
+        fitted = await builder.fit_to_budget(history, 300, _word_count, reserve_tokens=10, step=4)
+        prompt = builder.build(fitted, "Merci")
+        heads.append(prompt[: prompt.rindex("User: Merci")])
+    # Compaction moves in blocks: most new turns only append to the previous prompt
+    changes = sum(1 for before, after in zip(heads, heads[1:]) if not after.startswith(before))
+    assert 0 < changes <= 3
+
+@pytest.mark.asyncio
+async def test_fit_to_budget_counts_concurrently():
+    builder = PromptBuilder(system_prompt="Tu es Heisenberg.", format_style="plain")
+    history = [(f"question {i}", f"Réponse {i}. " + " ".join(["bla"] * 40)) for i in range(5)]
+    in_flight = peak = calls = 0
+
+    async def slow_count(text):
+        nonlocal in_flight, peak, calls
+        calls += 1
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)  # A /tokenize round trip
+        in_flight -= 1
+        return len(text.split())
+
+    await builder.fit_to_budget(history, 100, slow_count, reserve_tokens=10)
+    # System prompt and every message at once, then every compacted answer at once
+    assert peak == 11
+    assert calls == 11 + 5
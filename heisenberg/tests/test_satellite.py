@@ -0,0 +1,254 @@
+import asyncio
+import wave
+
+import aiohttp
+import numpy as np
+import pytest
+from aiohttp import web
+
+from heisenberg.audio.wavfile import WavFileAudioIO
+from heisenberg.core.config import SatelliteConfig
+from heisenberg.core.metrics import metrics
+from heisenberg.interfaces.wakeword import ABCWakeword
+from heisenberg.orchestrator.events import Event
+from heisenberg.orchestrator.fsm import FSM
+from heisenberg.orchestrator.router import EventRouter
+from heisenberg.orchestrator.state import State
+from heisenberg.satellite.client import PlayoutBuffer, SatelliteClient
+from heisenberg.satellite.protocol import decode_audio, encode_audio, encode_control, ulaw_decode, ulaw_encode
+from heisenberg.satellite.server import SatelliteServer
+
+
+class ManualWakeword(ABCWakeword):
+    """Detector fired by the test."""
+
+    def __init__(self):
+        self.callback = None
+        self.frames = 0
+
+    def on_detected(self, callback):
+        self.callback = callback
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def feed_audio(self, frame):
+        self.frames += 1
+
+
+def _write_wav(path, seconds: float = 1.0) -> bytes:
+    t = np.arange(int(16000 * seconds))
+    pcm = (np.sin(t * 2 * np.pi * 440 / 16000) * 8000).astype(np.int16).tobytes()
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes(pcm)
+    return pcm
+
+
+def test_audio_message_round_trip():
+    pcm = (np.linspace(-30000, 30000, 320)).astype(np.int16).tobytes()
+    assert decode_audio(encode_audio(7, pcm)) == (7, pcm)
+
+    seq, decoded = decode_audio(encode_audio(2**32 + 3, pcm, "ulaw"), "ulaw")
+    assert seq == 3
+    assert len(ulaw_encode(pcm)) == len(pcm) // 2
+    error = np.abs(np.frombuffer(decoded, np.int16).astype(int) - np.frombuffer(pcm, np.int16))
+    assert error.max() <= 1024  # mu-law keeps the error proportional to the amplitude
+    assert ulaw_decode(ulaw_encode(b"\x00\x00")) == b"\x00\x00"
+
+
+@pytest.mark.asyncio
+async def test_playout_buffer_waits_for_prebuffer():
+    playout = PlayoutBuffer(prebuffer_ms=40)
+    frame = b"\x01" * 640  # 20ms
+
+    playout.put(frame)
+    getter = asyncio.create_task(playout.get())
+    await asyncio.sleep(0.01)
+    assert not getter.done()
+    playout.put(frame)
+    assert await asyncio.wait_for(getter, 1) == frame
+    assert await playout.get() == frame
+
+    # The tail of a stream plays even below the prebuffer
+    playout.put(b"\x02" * 320)
+    assert await asyncio.wait_for(playout.get(), 1) == b"\x02" * 320
+
+
+def test_playout_buffer_drops_oldest_when_full():
+    playout = PlayoutBuffer(prebuffer_ms=20, max_ms=40)
+    for i in range(4):
+        playout.put(bytes([i]) * 640)
+    assert playout.dropped == 2
+    assert playout.buffered_ms == 40
+
+
+@pytest.mark.asyncio
+async def test_satellite_loopback(tmp_path):
+    pcm = _write_wav(tmp_path / "utterance.wav")
+    config = SatelliteConfig(host="127.0.0.1", port=0, name="kitchen", heartbeat_seconds=1.0)
+    remotes = []
+    connected = asyncio.Event()
+
+    async def on_satellite(remote):
+        remotes.append(remote)
+        connected.set()
+
+    server = SatelliteServer(config, on_satellite)
+    await server.start()
+    config.server_url = f"ws://127.0.0.1:{server.port}/satellite"
+
+    mic = WavFileAudioIO(str(tmp_path / "utterance.wav"), frame_ms=20)
+    wakeword = ManualWakeword()
+    client = SatelliteClient(config, mic, wakeword)
+    client_task = asyncio.create_task(client.run())
+    try:
+        await asyncio.wait_for(connected.wait(), 2)
+        remote = remotes[0]
+        fsm = FSM(EventRouter())
+        remote.bind(fsm, wakeword_states={State.IDLE})
+
+        async def on_detected():
+            await fsm.handle_event(Event.WAKEWORD_DETECTED)
+
+        remote.wakeword.on_detected(on_detected)
+        await remote.start()
+
+        # The detector runs on the satellite's microphone while idle
+        for _ in range(50):
+            if wakeword.frames:
+                break
+            await asyncio.sleep(0.02)
+        assert wakeword.frames > 0
+
+        # Wakeword on the satellite: the server is told and the microphone streams
+        await client.wakeword.callback()
+        for _ in range(50):
+            if fsm.state == State.LISTENING:
+                break
+            await asyncio.sleep(0.02)
+        assert fsm.state == State.LISTENING
+        async def collect(size: int) -> bytes:
+            received = b""
+            while len(received) < size:
+                received += await remote.read_frame() or b""
+            return received
+
+        assert await asyncio.wait_for(collect(16000), 2) in pcm  # 0.5s, in order
+
+        # Synthesized audio plays on the satellite, in order
+        answer = [bytes([i]) * 640 for i in range(5)]
+        for frame in answer:
+            await remote.play_frame(frame)
+        for _ in range(100):
+            if len(mic.played) == len(answer):
+                break
+            await asyncio.sleep(0.02)
+        assert mic.played == answer
+
+        # A dropped connection is re-established and served by the same pipeline
+        await remote.close()
+        for _ in range(100):
+            if client.connections == 2 and remote.connected:
+                break
+            await asyncio.sleep(0.02)
+        assert client.connections == 2 and remote.connected
+        assert remotes == [remote]
+        await fsm.stop()
+    finally:
+        await client.stop()
+        await asyncio.gather(client_task, return_exceptions=True)
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_client_survives_bad_server_messages(tmp_path):
+    _write_wav(tmp_path / "silence.wav")
+    good = bytes([7]) * 640
+
+    async def handle(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.receive()  # hello
+        await ws.send_bytes(b"\x01")  # Truncated audio
+        await ws.send_str("not json")
+        await ws.send_str('{"type": "stream"}')  # Missing field
+        await ws.send_bytes(encode_audio(0, good))
+        async for _ in ws:
+            pass
+        return ws
+
+    app = web.Application()
+    app.router.add_get("/satellite", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    config = SatelliteConfig(server_url=f"ws://127.0.0.1:{port}/satellite", name="hall", playout_prebuffer_ms=20)
+    mic = WavFileAudioIO(str(tmp_path / "silence.wav"), frame_ms=20)
+    client = SatelliteClient(config, mic)
+    client_task = asyncio.create_task(client.run())
+    try:
+        for _ in range(100):
+            if mic.played:
+                break
+            await asyncio.sleep(0.02)
+        assert mic.played == [good]
+        assert not client_task.done()
+        assert client.connections == 1 and client.connected.is_set()
+    finally:
+        await client.stop()
+        await asyncio.gather(client_task, return_exceptions=True)
+        await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_server_survives_bad_satellite_messages():
+    config = SatelliteConfig(host="127.0.0.1", port=0, heartbeat_seconds=1.0)
+    remotes = []
+
+    async def on_satellite(remote):
+        remotes.append(remote)
+
+    server = SatelliteServer(config, on_satellite)
+    await server.start()
+    good = bytes([7]) * 640
+    key = "satellite_bad_messages[instance=hall]"
+    bad_before = metrics.counters.get(key, 0)
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.ws_connect(f"ws://127.0.0.1:{server.port}/satellite") as ws:
+                await ws.send_str(encode_control("hello", name="hall", codec="pcm16", sample_rate=16000))
+                for _ in range(50):
+                    if remotes:
+                        break
+                    await asyncio.sleep(0.02)
+                remote = remotes[0]
+                await remote.start()
+                detected = asyncio.Event()
+
+                async def on_detected():
+                    detected.set()
+
+                remote.wakeword.on_detected(on_detected)
+
+                await ws.send_bytes(b"\x01")  # Truncated audio
+                await ws.send_str("not json")
+                await ws.send_str('{"active": true}')  # Missing field
+                await ws.send_bytes(encode_audio(0, good))
+                await ws.send_str(encode_control("wakeword"))
+
+                # The connection and the satellite's turn go on
+                await asyncio.wait_for(detected.wait(), 2)
+                assert await asyncio.wait_for(remote.read_frame(), 2) == good
+                assert remote.connected and not ws.closed
+                assert metrics.counters[key] == bad_before + 3
+    finally:
+        await server.stop()
@@ -0,0 +1,45 @@
+import pytest
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+from heisenberg.orchestrator.speculation import SpeculativePrefill
+
+@pytest.fixture
+def llm():
+    llm = MagicMock()
+    llm.prefill = AsyncMock(return_value=True)
+    return llm
+
+@pytest.mark.asyncio
+async def test_prefills_stable_partial_prefix(llm):
+    history = [("Bonjour", "Salut !")]
+    speculation = SpeculativePrefill(llm, min_new_words=2)
+
+    speculation.begin(history, "session-1")
+    await asyncio.sleep(0)  # History prefill runs while the user starts talking
+    await speculation.update("quelle heure")
+    await speculation.update("quelle heure est")        # "quelle heure" now stable
+    await speculation.update("quelle heure est-il")     # only "est" stable: too little new
+    await asyncio.sleep(0)
+
+    assert await speculation.resolve("quelle heure est-il ?") is True
+    prefixes = [call.args[0] for call in llm.prefill.await_args_list]
+    assert prefixes == ["", "quelle heure"]
+    assert all(call.args[1:] == (history, "session-1") for call in llm.prefill.await_args_list)
+
+@pytest.mark.asyncio
+async def test_divergent_final_discards_speculation(llm):
+    started = asyncio.Event()
+    async def slow_prefill(*args):
+        started.set()
+        await asyncio.sleep(10)
+    llm.prefill = AsyncMock(side_effect=slow_prefill)
+
+    speculation = SpeculativePrefill(llm, min_new_words=1)
+    speculation.begin([], None)
+    await speculation.update("allume la")
+    await speculation.update("allume la")
+    await started.wait()
+    task = speculation._task
+
+    assert await speculation.resolve("éteins la lumière") is False
+    assert task.cancelled()
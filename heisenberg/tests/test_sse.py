@@ -0,0 +1,27 @@
+import json
+from heisenberg.llm.sse import SSEParser
+
+def _stream(tokens, timings=None):
+    events = [{"content": t, "stop": False} for t in tokens]
+    events.append({"content": "", "stop": True, "timings": timings or {}})
+    return b"".join(b"data: " + json.dumps(e).encode() + b"\n\n" for e in events)
+
+def test_events_split_across_reads():
+    body = _stream(["Bon", "jour", " à", " toi"], timings={"predicted_per_second": 12.5})
+    parser = SSEParser()
+
+    events = []
+    # Feed in awkward 7-byte chunks so every event straddles reads
+    for i in range(0, len(body), 7):
+        events.extend(parser.feed(body[i:i + 7]))
+    events.extend(parser.flush())
+
+    assert "".join(e["content"] for e in events) == "Bonjour à toi"
+    assert parser.final_event["timings"]["predicted_per_second"] == 12.5
+    assert parser.events_parsed == 5
+
+def test_ignores_comments_and_bad_lines():
+    parser = SSEParser()
+    events = parser.feed(b": keep-alive\r\n\r\ndata: {not json}\ndata: [DONE]\ndata: {\"content\": \"ok\"}\r\n")
+    assert events == [{"content": "ok"}]
+    assert parser.final_event is None
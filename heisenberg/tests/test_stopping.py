@@ -0,0 +1,36 @@
+import pytest
+
+from heisenberg.llm.stopping import (
+    StopPolicy, StopSequenceMatcher, SentenceBudget, apply_policies, flush_policies
+)
+
+def _run(policies, tokens):
+    out = [apply_policies(policies, t) for t in tokens]
+    return "".join(out) + flush_policies(policies)
+
+def test_stop_sequence_across_token_boundaries():
+    matcher = StopSequenceMatcher(["Assistant:", "User:"])
+    emitted = [matcher.feed(t) for t in ["Il est midi.", "\n\nAssis", "tant", ":", " encore"]]
+
+    # "Assis" and "tant" are held back until the match is confirmed, never spoken
+    assert emitted == ["Il est midi.", "\n\n", "", "", ""]
+    assert matcher.stopped and matcher.reason == "Assistant:"
+
+def test_held_prefix_is_released_when_no_match():
+    matcher = StopSequenceMatcher(["User:"])
+    assert _run([matcher], ["Use", "r", " guide", " Us"]) == "User guide Us"
+    assert not matcher.stopped
+
+def test_sentence_budget():
+    budget = SentenceBudget(max_sentences=2)
+    text = _run([budget], ["Il fait 3.5", " degrés.", " Prends", " un manteau", " !", " Et", " aussi..."])
+
+    assert text == "Il fait 3.5 degrés. Prends un manteau !"
+    assert budget.stopped
+
+def test_policy_without_feed_cannot_be_created():
+    class Incomplete(StopPolicy):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,147 @@
+import pytest
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock, patch
+from heisenberg.stt.service import STTService
+from heisenberg.core.config import STTConfig
+from heisenberg.core.exceptions import STTError
+
+@pytest.fixture
+def stt_config():
+    return STTConfig(model_path="fake_model.bin", n_threads=2, thread_budget=4)
+
+def _segment(text):
+    segment = MagicMock()
+    segment.text = text
+    return segment
+
+@pytest.mark.asyncio
+async def test_clients_share_one_model(stt_config):
+    with patch("heisenberg.stt.model.Model") as MockModel:
+        MockModel.return_value.transcribe.return_value = [_segment("Bonjour")]
+
+        service = STTService(stt_config)
+        await service.start()
+
+        results = {}
+        clients = [service.client(session_id=f"room{i}") for i in range(3)]
+        for client in clients:
+            async def on_final(text, sid=client.session_id):
+                results[sid] = text
+            client.on_final(on_final)
+            await client.start_stream()
+            await client.feed_audio(bytes(320))
+
+        await asyncio.gather(*(client.stop_stream() for client in clients))
+        await service.stop()
+
+        # One whisper.cpp context, whatever the number of sessions
+        assert service.n_workers == 1
+        assert MockModel.call_count == 1
+        assert results == {"room0": "Bonjour", "room1": "Bonjour", "room2": "Bonjour"}
+
+@pytest.mark.asyncio
+async def test_context_per_worker_loads_concurrently(stt_config):
+    stt_config.context_per_worker = True
+    with patch("heisenberg.stt.model.Model") as MockModel:
+        loading = threading.Barrier(2, timeout=2)
+        def load(*args, **kwargs):
+            loading.wait()  # Both workers' contexts load at the same time
+            return MagicMock()
+        MockModel.side_effect = load
+
+        service = STTService(stt_config)
+        # Concurrent requests for one context share its load
+        await asyncio.gather(service.start(), service.get_model(stt_config, 1))
+        await service.stop()
+
+        assert service.n_workers == 2
+        assert MockModel.call_count == 2
+        assert all(model.loaded for model in service._models.values())
+
+@pytest.mark.asyncio
+async def test_priority_and_deadline_scheduling(stt_config):
+    stt_config.thread_budget = 2  # single worker -> strict ordering
+    with patch("heisenberg.stt.model.Model") as MockModel:
+        order = []
+        def transcribe(audio, **kwargs):
+            order.append(len(audio))
+            return [_segment(str(len(audio)))]
+        MockModel.return_value.transcribe.side_effect = transcribe
+
+        service = STTService(stt_config)
+        low = asyncio.create_task(service.transcribe(bytes(2), priority=5))
+        high = asyncio.create_task(service.transcribe(bytes(4), priority=0))
+        expired = asyncio.create_task(service.transcribe(bytes(6), deadline=time.monotonic() - 1))
+        await asyncio.sleep(0)
+
+        await service.start()
+        assert await high == "2"
+        assert await low == "1"
+        with pytest.raises(STTError):
+            await expired
+        await service.stop()
+
+        assert order == [2, 1]
+
+@pytest.mark.asyncio
+async def test_sessions_take_turns(stt_config):
+    stt_config.thread_budget = 2  # single worker -> strict ordering
+    with patch("heisenberg.stt.model.Model") as MockModel:
+        order = []
+        def transcribe(audio, **kwargs):
+            order.append(len(audio))
+            return [_segment(str(len(audio)))]
+        MockModel.return_value.transcribe.side_effect = transcribe
+
+        service = STTService(stt_config)
+        # A busy room queues three decodes before a quiet one queues its first
+        busy = [asyncio.create_task(service.transcribe(bytes(2 * n), session_id="kitchen")) for n in (1, 2, 3)]
+        await asyncio.sleep(0)
+        quiet = asyncio.create_task(service.transcribe(bytes(20), session_id="bedroom"))
+        await asyncio.sleep(0)
+
+        await service.start()
+        await asyncio.gather(*busy, quiet)
+        await service.stop()
+
+        assert order == [1, 10, 2, 3]
+
+@pytest.mark.asyncio
+async def test_final_overtakes_waiting_partials(stt_config):
+    stt_config.n_threads = 1  # Two workers, decoding in parallel
+    stt_config.thread_budget = 2
+    stt_config.context_per_worker = True
+    with patch("heisenberg.stt.model.Model") as MockModel:
+        order = []
+        release = {}
+        def transcribe(audio, **kwargs):
+            order.append(len(audio) * 2)  # Float samples -> PCM bytes
+            release.setdefault(len(audio) * 2, threading.Event()).wait(2)
+            return [_segment(str(len(audio)))]
+        MockModel.return_value.transcribe.side_effect = transcribe
+
+        service = STTService(stt_config)
+        await service.start()
+        # Two partials decoding, two more waiting; then a final comes in
+        partials = [asyncio.create_task(service.transcribe(bytes(2 * n), priority=1, session_id=f"room{n}")) for n in (1, 2, 3, 4)]
+        for _ in range(100):
+            if len(order) == 2:
+                break
+            await asyncio.sleep(0.01)
+        assert sorted(order) == [2, 4]  # Both decode at once, no worker waits on a shared context
+        final = asyncio.create_task(service.transcribe(bytes(20), priority=0, session_id="room5"))
+        await asyncio.sleep(0.01)
+
+        release.setdefault(2, threading.Event()).set()  # The first worker frees up
+        for _ in range(100):
+            if len(order) == 3:
+                break
+            await asyncio.sleep(0.01)
+        for n in (4, 6, 8, 20):
+            release.setdefault(n, threading.Event()).set()
+        await asyncio.gather(*partials, final)
+        await service.stop()
+
+        assert order[2] == 20  # Before the partials that were already waiting
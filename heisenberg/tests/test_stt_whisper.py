@@ -38,3 +38,24 @@ async def test_whisper_stt_flow(stt_config):
         assert final_text == "Hello world"
         assert MockModel.called
         assert mock_instance.transcribe.called
+
+@pytest.mark.asyncio
+async def test_whisper_stt_partials(stt_config):
+    stt_config.partial_interval_ms = 100
+    with patch("heisenberg.stt.whisper.Model") as MockModel:
+        mock_segment = MagicMock()
+        mock_segment.text = "Bonjour"
+        MockModel.return_value.transcribe.return_value = [mock_segment]
+
+        stt = WhisperSTT(stt_config)
+        partials = []
+        async def on_partial(text):
+            partials.append(text)
+        stt.on_partial(on_partial)
+
+        await stt.start_stream()
+        await stt.feed_audio(bytes(3200))  # 100ms of 16kHz int16
+        await asyncio.sleep(0.05)
+        await stt.stop_stream()
+
+        assert partials == ["Bonjour"]
@@ -0,0 +1,111 @@
+import asyncio
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from heisenberg.core.config import STTConfig
+from heisenberg.core.logging import set_correlation_id
+from heisenberg.core.metrics import metrics
+from heisenberg.core.tracing import ChromeTraceExporter, JsonlTraceExporter, Tracer, tracer
+from heisenberg.orchestrator.events import Event
+from heisenberg.orchestrator.router import EventRouter
+from heisenberg.stt.service import STTService
+
+
+def _turn(tracer: Tracer, correlation_id: str = "turn-1"):
+    trace = tracer.start(correlation_id, instance="kitchen")
+    start = trace.start
+    for offset, stage in enumerate(["wakeword", "speech_end", "stt_done", "llm_first_token", "playback_end"]):
+        trace.mark(stage, at=start + offset * 0.1)
+    tracer.record_span("stt_decode", start + 0.1, start + 0.2, correlation_id, priority=0)
+    return trace
+
+
+def test_stages_and_metrics():
+    local = Tracer()
+    trace = _turn(local)
+    assert not trace.mark("wakeword")  # Only the first occurrence counts
+    key = "turn_stage[instance=kitchen,stage=stt_done]"
+    count_before = metrics.latencies[key].count if key in metrics.latencies else 0
+
+    finished = local.finish("turn-1", outcome="tts_complete")
+
+    assert finished is trace and local.get("turn-1") is None
+    assert list(trace.stages()) == ["speech_end", "stt_done", "llm_first_token", "playback_end"]
+    assert trace.stages()["stt_done"] == pytest.approx(100)
+    assert metrics.latencies[key].count == count_before + 1
+    assert trace.attributes["outcome"] == "tts_complete"
+
+
+def test_marks_follow_the_context_correlation_id():
+    local = Tracer()
+    local.start("turn-2")
+    assert not local.mark("wakeword")  # No turn in this context yet
+    set_correlation_id("turn-2")
+    try:
+        assert local.mark("wakeword")
+        with local.span("intent_match") as span:
+            span["matched"] = False
+        assert local.get().spans[0].attributes == {"matched": False}
+    finally:
+        set_correlation_id(None)
+
+
+def test_unfinished_traces_are_bounded():
+    local = Tracer(max_open=2)
+    for i in range(3):
+        local.start(f"turn-{i}")
+    assert local.get("turn-0") is None
+    assert local.get("turn-2") is not None
+
+
+def test_jsonl_and_chrome_export(tmp_path):
+    local = Tracer()
+    local.add_exporter(JsonlTraceExporter(str(tmp_path / "turns.jsonl")))
+    local.add_exporter(ChromeTraceExporter(str(tmp_path / "turns.json")))
+    _turn(local)
+    local.finish("turn-1")
+
+    record = json.loads((tmp_path / "turns.jsonl").read_text().splitlines()[0])
+    assert record["correlation_id"] == "turn-1"
+    assert record["marks"]["stt_done"] == pytest.approx(200)
+    assert record["spans"][0]["name"] == "stt_decode"
+
+    # The array is left open while running; viewers accept it, json needs it closed
+    events = json.loads((tmp_path / "turns.json").read_text().rstrip(",\n") + "]")
+    kinds = {(event["name"], event["ph"]) for event in events}
+    assert {("thread_name", "M"), ("turn", "X"), ("stt_decode", "X"), ("playback_end", "i")} <= kinds
+    assert all(event["args"]["correlation_id"] == "turn-1" for event in events if event["ph"] != "M")
+
+
+@pytest.mark.asyncio
+async def test_correlation_id_reaches_router_handlers_and_stt():
+    router = EventRouter()
+    tracer.start("turn-3")
+
+    with patch("heisenberg.stt.model.Model") as MockModel:
+        segment = MagicMock()
+        segment.text = "Bonjour"
+        MockModel.return_value.transcribe.return_value = [segment]
+        service = STTService(STTConfig(model_path="fake_model.bin"))
+        await service.start()
+
+        async def on_final(text):
+            tracer.mark("stt_done")
+            await service.transcribe(bytes(320), session_id="kitchen")
+
+        router.subscribe(Event.TRANSCRIPTION_FINAL, on_final)
+
+        async def publish():
+            set_correlation_id("turn-3")
+            await router.dispatch(Event.TRANSCRIPTION_FINAL, "Bonjour")
+
+        await asyncio.create_task(publish())
+        await asyncio.wait_for(router.join(), timeout=1)
+        await service.stop()
+        await router.close()
+
+    trace = tracer.finish("turn-3")
+    assert "stt_done" in trace.marks
+    assert [span.name for span in trace.spans] == ["stt_queue", "stt_decode"]
@@ -0,0 +1,33 @@
+import os
+from heisenberg.tts.cache import PhraseCache
+
+
+def test_key_depends_on_voice_text_and_params():
+    key = PhraseCache.key("fr_FR-siwis-medium", "Bonjour !", {"length_scale": 1.0})
+    assert key == PhraseCache.key("fr_FR-siwis-medium", " Bonjour  ! ", {"length_scale": 1.0})
+    assert key != PhraseCache.key("fr_FR-siwis-medium", "bonjour !", {"length_scale": 1.0})
+    assert key != PhraseCache.key("fr_FR-upmc-medium", "Bonjour !", {"length_scale": 1.0})
+    assert key != PhraseCache.key("fr_FR-siwis-medium", "Bonjour !", {"length_scale": 1.2})
+
+
+def test_memory_mapped_hits_and_lru_budget(tmp_path):
+    cache = PhraseCache(str(tmp_path), max_bytes=250)
+    cache.put("a", b"\x01" * 100)
+    cache.put("b", b"\x02" * 100)
+    audio = cache.get("a")
+    assert bytes(audio[:4]) == b"\x01" * 4 and len(audio) == 100
+
+    cache.put("c", b"\x03" * 100)  # Over budget: "b" is the least recently used
+    assert "b" not in cache and "a" in cache and "c" in cache
+    assert sorted(os.listdir(tmp_path)) == ["a.pcm", "c.pcm"]
+    assert cache.bytes_held == 200
+    assert bytes(audio[-1:]) == b"\x01"  # Views stay valid while mapped
+
+
+def test_index_survives_restart(tmp_path):
+    cache = PhraseCache(str(tmp_path))
+    cache.put("phrase", b"\x00\x01" * 50)
+
+    reloaded = PhraseCache(str(tmp_path), max_bytes=1000)
+    assert len(reloaded) == 1 and reloaded.bytes_held == 100
+    assert bytes(reloaded.get("phrase")) == b"\x00\x01" * 50
@@ -0,0 +1,172 @@
+import asyncio
+import time
+import numpy as np
+import pytest
+from types import SimpleNamespace
+from heisenberg.core.config import TTSConfig
+from heisenberg.core.metrics import metrics
+from heisenberg.interfaces.audio import ABCAudioIO
+from heisenberg.tts.piper import PiperTTS
+from heisenberg.tts.voices import VoiceManager
+
+
+class FakeVoice:
+    """Piper stand-in: 22.05kHz audio, 10ms of audio per character, synthesized 5x faster than real time."""
+
+    def __init__(self):
+        self.config = SimpleNamespace(sample_rate=22050)
+        self.started = []
+
+    def synthesize_stream_raw(self, text, length_scale=1.0):
+        self.started.append((text, time.perf_counter()))
+        for piece in text.split(" "):  # Piper yields sentence by sentence; finer here
+            piece += " "
+            time.sleep(len(piece) * 0.002)
+            yield np.full(22050 * len(piece) // 100, 1000, dtype=np.int16).tobytes()
+
+
+class FakeOutput(ABCAudioIO):
+    """Records frames, taking real time to 'play' them."""
+
+    def __init__(self):
+        self.frames = []
+        self.first_frame_at = None
+
+    async def read_frame(self):
+        return None
+
+    async def play_frame(self, frame):
+        if self.first_frame_at is None:
+            self.first_frame_at = time.perf_counter()
+        self.frames.append(frame)
+        await asyncio.sleep(len(frame) / 2 / 16000)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_synthesis_overlaps_playback():
+    voice, output = FakeVoice(), FakeOutput()
+    tts = PiperTTS(TTSConfig(frame_ms=20, cache_enabled=False), output, voice=voice)
+    try:
+        await tts.speak("Bonjour, je suis Heisenberg.")
+        await tts.speak("Il fait beau aujourd'hui.")
+        await asyncio.wait_for(tts.wait_idle(), timeout=5)
+    finally:
+        await tts.close()
+
+    # The second chunk was synthesized while the first one was still playing
+    first_audio_ms = len("Bonjour, je suis Heisenberg.") * 10
+    assert voice.started[1][1] - output.first_frame_at < first_audio_ms / 1000
+    # Resampled to 16kHz and cut into 20ms frames
+    assert sum(1 for f in output.frames if len(f) != 640) <= 2  # Only each chunk's tail is short
+    total_ms = sum(len(f) for f in output.frames) / 2 / 16
+    assert abs(total_ms - (29 + 26) * 10) < 10
+    assert 0 < tts.last_rtf < 1
+    assert metrics.gauges["tts_rtf"] == tts.last_rtf
+
+
+@pytest.mark.asyncio
+async def test_stop_flushes_queues_within_a_frame():
+    voice, output = FakeVoice(), FakeOutput()
+    tts = PiperTTS(TTSConfig(frame_ms=20, cache_enabled=False), output, voice=voice)
+    try:
+        await tts.speak("Une très longue phrase " * 10)
+        await tts.speak("Et une autre derrière.")
+        await asyncio.sleep(0.1)
+        await tts.stop()
+        played = len(output.frames)
+        await asyncio.wait_for(tts.wait_idle(), timeout=0.01)
+        await asyncio.sleep(0.1)
+    finally:
+        await tts.close()
+
+    assert played > 0
+    assert len(output.frames) <= played + 1  # At most the frame being written when stop() came
+
+
+@pytest.mark.asyncio
+async def test_phrase_cache_hit_skips_synthesis(tmp_path):
+    voice, output = FakeVoice(), FakeOutput()
+    config = TTSConfig(frame_ms=20, cache_dir=str(tmp_path))
+    tts = PiperTTS(config, output, voice=voice)
+    try:
+        assert await tts.prewarm(["Oui ?", "Oui ?"]) == 1
+        start = time.perf_counter()
+        await tts.speak("Oui ?")
+        await asyncio.sleep(0.005)
+        hit_latency = output.first_frame_at - start
+
+        await tts.wait_idle()
+        before = len(output.frames)
+        await tts.speak("C'est noté.")
+        await tts.wait_idle()
+        synthesized = b"".join(output.frames[before:])
+        before = len(output.frames)
+        await tts.speak("C'est  noté.")  # Same phrase up to whitespace
+        await tts.wait_idle()
+        replayed = b"".join(bytes(f) for f in output.frames[before:])
+    finally:
+        await tts.close()
+
+    assert [text for text, _ in voice.started] == ["Oui ?", "C'est noté."]
+    assert hit_latency < 0.005
+    assert tts.cache.hits == 2
+    assert replayed == synthesized
+
+
+@pytest.mark.asyncio
+async def test_voices_loaded_lazily_and_switched(tmp_path):
+    for name in ("fr_FR-siwis-medium", "fr_FR-upmc-medium"):
+        (tmp_path / f"{name}.onnx").write_bytes(b"\0" * 10)
+    loaded = {}
+    config = TTSConfig(frame_ms=20, cache_enabled=False, voices_dir=str(tmp_path))
+    voices = VoiceManager(config, loader=lambda info: loaded.setdefault(info.name, FakeVoice()))
+    tts = PiperTTS(config, FakeOutput(), voices=voices)
+    try:
+        await tts.speak("Bonjour.")
+        await tts.wait_idle()
+        assert voices.in_use("fr_FR-siwis-medium")
+        await tts.set_voice("fr_FR-upmc-medium")
+        await tts.speak("Salut.")
+        await tts.wait_idle()
+        # Only the voice being spoken with is held in the pool
+        assert not voices.in_use("fr_FR-siwis-medium")
+        assert voices.in_use("fr_FR-upmc-medium")
+    finally:
+        await tts.close()
+
+    assert not voices.in_use("fr_FR-upmc-medium")
+    assert [t for t, _ in loaded["fr_FR-siwis-medium"].started] == ["Bonjour."]
+    assert [t for t, _ in loaded["fr_FR-upmc-medium"].started] == ["Salut."]
+
+
+@pytest.mark.asyncio
+async def test_length_scale_reaches_piper_1_3(monkeypatch):
+    class ChunkVoice:
+        """piper >= 1.3 API: synthesize() yields AudioChunk objects."""
+
+        config = SimpleNamespace(sample_rate=22050)
+
+        def __init__(self):
+            self.syn_configs = []
+
+        def synthesize(self, text, syn_config=None):
+            self.syn_configs.append(syn_config)
+            yield SimpleNamespace(audio_int16_bytes=np.zeros(2205, dtype=np.int16).tobytes())
+
+    monkeypatch.setattr("heisenberg.tts.piper.SynthesisConfig", SimpleNamespace)
+    voice, output = ChunkVoice(), FakeOutput()
+    tts = PiperTTS(TTSConfig(frame_ms=20, cache_enabled=False, length_scale=1.3), output, voice=voice)
+    try:
+        await tts.speak("Plus lentement.")
+        await asyncio.wait_for(tts.wait_idle(), timeout=5)
+    finally:
+        await tts.close()
+
+    assert [c.length_scale for c in voice.syn_configs] == [1.3]
+    assert output.frames
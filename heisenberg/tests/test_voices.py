@@ -0,0 +1,114 @@
+import asyncio
+import json
+import threading
+import time
+import pytest
+from heisenberg.core.config import TTSConfig
+from heisenberg.core.exceptions import TTSError
+from heisenberg.tts.voices import VoiceManager
+
+
+def _voice_files(directory, name, size, language):
+    (directory / f"{name}.onnx").write_bytes(b"\0" * size)
+    (directory / f"{name}.onnx.json").write_text(json.dumps({"language": {"code": language}}))
+
+
+@pytest.fixture
+def voices_dir(tmp_path):
+    _voice_files(tmp_path, "fr_FR-siwis-medium", 400_000, "fr_FR")
+    _voice_files(tmp_path, "fr_FR-upmc-medium", 400_000, "fr_FR")
+    _voice_files(tmp_path, "en_US-lessac-medium", 400_000, "en_US")
+    return tmp_path
+
+
+class SlowLoader:
+    """Records loads; each takes 50ms on the loader thread."""
+
+    def __init__(self):
+        self.loads = []
+        self.threads = set()
+
+    def __call__(self, info):
+        self.loads.append(info.name)
+        self.threads.add(threading.current_thread().name)
+        time.sleep(0.05)
+        return object()
+
+
+def test_discovery_and_languages(voices_dir):
+    manager = VoiceManager(TTSConfig(voices_dir=str(voices_dir)), loader=SlowLoader())
+    assert sorted(manager.voices) == ["en_US-lessac-medium", "fr_FR-siwis-medium", "fr_FR-upmc-medium"]
+    assert manager.voices["fr_FR-siwis-medium"].size_bytes == 400_000
+    assert manager.voices_for_language("en") == ["en_US-lessac-medium"]
+    assert len(manager.voices_for_language("fr_FR")) == 2
+
+
+@pytest.mark.asyncio
+async def test_lazy_shared_loading_off_the_loop(voices_dir):
+    loader = SlowLoader()
+    manager = VoiceManager(TTSConfig(voices_dir=str(voices_dir)), loader=loader)
+
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+    tick_task = asyncio.create_task(ticker())
+    first, second = await asyncio.gather(manager.get(), manager.get("fr_FR-siwis-medium"))
+    tick_task.cancel()
+
+    assert first is second
+    assert loader.loads == ["fr_FR-siwis-medium"]  # One load for both callers
+    assert ticks >= 5  # The event loop kept running during the load
+    assert threading.main_thread().name not in loader.threads
+
+    start = time.perf_counter()
+    assert await manager.get() is first  # Resident: no reload
+    assert time.perf_counter() - start < 0.01
+
+    with pytest.raises(TTSError):
+        await manager.get("de_DE-thorsten-medium")
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_under_budget(voices_dir):
+    loader = SlowLoader()
+    # 1 MB budget: two 400 kB voices fit, not three
+    manager = VoiceManager(TTSConfig(voices_dir=str(voices_dir), voice_memory_budget_mb=1), loader=loader)
+    await manager.get("fr_FR-siwis-medium")
+    await manager.get("fr_FR-upmc-medium")
+    await manager.get("fr_FR-siwis-medium")  # Most recently used again
+    await manager.get("en_US-lessac-medium")
+
+    assert manager.is_loaded("fr_FR-siwis-medium")
+    assert not manager.is_loaded("fr_FR-upmc-medium")
+    assert manager.loaded_bytes == 800_000
+
+    await manager.preload("fr_FR-upmc-medium")
+    assert loader.loads == ["fr_FR-siwis-medium", "fr_FR-upmc-medium", "en_US-lessac-medium", "fr_FR-upmc-medium"]
+
+
+@pytest.mark.asyncio
+async def test_voices_in_use_are_not_evicted(voices_dir):
+    loader = SlowLoader()
+    manager = VoiceManager(TTSConfig(voices_dir=str(voices_dir), voice_memory_budget_mb=1), loader=loader)
+    siwis = await manager.acquire("fr_FR-siwis-medium")  # An engine speaks with it
+    await manager.get("fr_FR-upmc-medium")
+    await manager.get("en_US-lessac-medium")
+
+    # The least recently used voice is held by an engine: the next one goes instead
+    assert manager.is_loaded("fr_FR-siwis-medium")
+    assert not manager.is_loaded("fr_FR-upmc-medium")
+    assert await manager.get("fr_FR-siwis-medium") is siwis
+    assert loader.loads == ["fr_FR-siwis-medium", "fr_FR-upmc-medium", "en_US-lessac-medium"]
+
+    # Everything in use: over budget until a voice is handed back
+    await manager.acquire("en_US-lessac-medium")
+    await manager.acquire("fr_FR-upmc-medium")
+    assert manager.loaded_bytes == 1_200_000
+    manager.release("fr_FR-siwis-medium")
+    assert not manager.is_loaded("fr_FR-siwis-medium")
+    assert manager.loaded_bytes == 800_000
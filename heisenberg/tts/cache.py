@@ -0,0 +1,127 @@
+import hashlib
+import logging
+import mmap
+import os
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from heisenberg.core.config import TTSConfig
+from heisenberg.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class PhraseCache:
+    """
+    Content-addressed on-disk cache of synthesized speech.
+
+    Each entry is a raw 16kHz int16 PCM file named after the hash of
+    (voice, text, synthesis params). Hits are memory-mapped, so playback
+    slices the page cache directly instead of reading or copying the file.
+    Files are evicted least-recently-used first to stay under `max_bytes`;
+    file mtimes carry the LRU order across restarts.
+    """
+
+    SUFFIX = ".pcm"
+
+    def __init__(self, directory: str, max_bytes: int = 50_000_000):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._sizes: "OrderedDict[str, int]" = OrderedDict()
+        self.bytes_held = 0
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(directory, exist_ok=True)
+        entries = []
+        for name in os.listdir(directory):
+            if name.endswith(self.SUFFIX):
+                stat = os.stat(os.path.join(directory, name))
+                entries.append((stat.st_mtime, name[: -len(self.SUFFIX)], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._sizes[key] = size
+            self.bytes_held += size
+        self._evict()
+        logger.info(f"TTS phrase cache: {len(self._sizes)} phrases, {self.bytes_held / 1e6:.1f} MB in {directory}")
+
+    @classmethod
+    def from_config(cls, config: TTSConfig) -> "PhraseCache":
+        return cls(config.cache_dir, config.cache_max_bytes)
+
+    @staticmethod
+    def key(voice: str, text: str, params: Optional[Dict[str, object]] = None) -> str:
+        """
+        Cache key of a phrase. Only whitespace is normalized: case, accents and
+        punctuation change the pronunciation, so they are part of the key.
+        """
+        canonical = " ".join(text.split())
+        params_repr = ",".join(f"{k}={v}" for k, v in sorted((params or {}).items()))
+        return hashlib.sha256(f"{voice}\x1f{canonical}\x1f{params_repr}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._sizes
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+    def get(self, key: str) -> Optional[memoryview]:
+        """Memory-mapped PCM of a cached phrase, or None."""
+        if key not in self._sizes:
+            self.misses += 1
+            metrics.increment("tts_cache_miss")
+            return None
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                # The mapping outlives the file object; it is unmapped once no view refers to it
+                audio = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            os.utime(path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"TTS cache entry {key[:12]} unreadable, dropping it: {e}")
+            self._remove(key)
+            self.misses += 1
+            metrics.increment("tts_cache_miss")
+            return None
+
+        self._sizes.move_to_end(key)
+        self.hits += 1
+        metrics.increment("tts_cache_hit")
+        return audio
+
+    def put(self, key: str, pcm: bytes) -> None:
+        """Store synthesized PCM (written atomically), evicting old phrases as needed."""
+        size = len(pcm)
+        if size == 0 or size > self.max_bytes:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(pcm)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write TTS cache entry: {e}")
+            return
+
+        if key in self._sizes:
+            self.bytes_held -= self._sizes.pop(key)
+        self._sizes[key] = size
+        self.bytes_held += size
+        self._evict()
+
+    def _evict(self) -> None:
+        while self.bytes_held > self.max_bytes and self._sizes:
+            self._remove(next(iter(self._sizes)))
+        metrics.set_gauge("tts_cache_bytes", self.bytes_held)
+
+    def _remove(self, key: str) -> None:
+        self.bytes_held -= self._sizes.pop(key)
+        try:
+            # Safe while mapped: the data stays readable until the mapping is released
+            os.unlink(self._path(key))
+        except OSError:
+            pass
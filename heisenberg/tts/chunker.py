@@ -0,0 +1,147 @@
+import re
+from typing import List, Optional
+
+from heisenberg.core.config import TTSConfig
+
+# Sentence terminators or clause punctuation, optionally followed by closing
+# quotes/brackets (French puts a space before "»"), and only counted once
+# followed by whitespace and the next word: "3.5", "3,5", "10:30" and
+# "M.Dupont" never split.
+_BOUNDARY = re.compile(
+    r"(?P<sentence>[.!?…]+)?(?P<clause>[,;:]|(?<=\s)[—–])?"
+    r"(?P<closing>(?:[ \u00a0\u202f]*[»”)\]]|[\"'’])*)"
+    r"(?=\s)"
+)
+
+# Lowercased titles and reference abbreviations that are not French words
+ABBREVIATIONS = frozenset({
+    "m", "mm", "mme", "mmes", "mlle", "mlles", "dr", "drs", "pr", "mgr",
+    "st", "ste", "av", "bd", "boul", "cf", "env", "fig", "chap",
+    "p", "pp", "hab", "éd", "réf", "approx",
+})
+
+# Abbreviations that are also ordinary words ("l'art.", "mon vol.", "tel."):
+# only one followed by a number ("art. 3", "no. 5") is not a sentence end
+NUMBERED_ABBREVIATIONS = frozenset({"n", "no", "art", "vol", "ex", "tél", "tel"})
+
+_WORD = re.compile(r"\w")
+_WORD_BEFORE = re.compile(r"([\w.\-]+)$")
+_LIST_MARKER = re.compile(r"(?:^|\n)[ \t]*\d+$")
+_NUMBER_AFTER = re.compile(r"\s*\d")
+
+
+class SentenceChunker:
+    """
+    Incremental segmentation of streamed LLM text into speakable chunks.
+
+    - The first chunk ends at the first sentence end, or at the first clause
+      (",", ";", ":", " — ") once it has `first_chunk_chars` characters, so
+      audio starts after the first clause rather than the full answer.
+    - Later chunks group whole sentences up to `min_chunk_chars`, which gives
+      the synthesizer enough context for natural prosody.
+    - Nothing grows past `max_chunk_chars`: long sentences are split at their
+      last clause, or at a space as a last resort.
+
+    Abbreviations ("M. Dupont", "p.ex.", "art. 3"), initials ("J. K."), decimals and
+    times ("3,5", "10:30") and numbered list markers ("1. ") are not boundaries.
+    """
+
+    def __init__(self, first_chunk_chars: int = 20, min_chunk_chars: int = 80, max_chunk_chars: int = 200):
+        self.first_chunk_chars = first_chunk_chars
+        self.min_chunk_chars = min_chunk_chars
+        self.max_chunk_chars = max_chunk_chars
+        self.chunks_emitted = 0
+        self._buffer = ""
+
+    @classmethod
+    def from_config(cls, config: TTSConfig) -> "SentenceChunker":
+        return cls(config.first_chunk_chars, config.min_chunk_chars, config.max_chunk_chars)
+
+    def feed(self, text: str) -> List[str]:
+        """Add streamed text; returns the chunks that became complete."""
+        self._buffer += text
+        chunks = []
+        while True:
+            cut = self._find_cut()
+            if cut is None:
+                break
+            chunk = self._buffer[:cut].strip()
+            self._buffer = self._buffer[cut:].lstrip()
+            if chunk:
+                self.chunks_emitted += 1
+                chunks.append(chunk)
+        return chunks
+
+    def flush(self) -> List[str]:
+        """End of stream: return whatever text is left as a last chunk."""
+        chunk, self._buffer = self._buffer.strip(), ""
+        if not chunk:
+            return []
+        self.chunks_emitted += 1
+        return [chunk]
+
+    def reset(self) -> None:
+        self.chunks_emitted = 0
+        self._buffer = ""
+
+    def _find_cut(self) -> Optional[int]:
+        buffer = self._buffer
+        first = self.chunks_emitted == 0
+        last_sentence = last_clause = None
+
+        for match in _BOUNDARY.finditer(buffer):
+            end = match.end()
+            if not _WORD.search(buffer, end):
+                break  # A closing quote may still follow: wait for the next word
+            if "\n" in buffer[match.start():end + 1] and buffer[:match.start()].strip():
+                # Line breaks separate list items and paragraphs
+                sentence = True
+            elif match.group("sentence"):
+                sentence = not self._is_abbreviation(buffer, match.start(), match.group("sentence"), end)
+                if not sentence:
+                    continue
+            elif match.group("clause"):
+                sentence = False
+            else:
+                continue
+
+            length = len(buffer[:end].strip())
+            if first:
+                if sentence or length >= self.first_chunk_chars:
+                    return end
+            elif sentence and length >= self.min_chunk_chars:
+                return end
+            if end <= self.max_chunk_chars:
+                if sentence:
+                    last_sentence = end
+                else:
+                    last_clause = end
+
+        if len(buffer) > self.max_chunk_chars:
+            for cut in (last_sentence, last_clause):
+                if cut:
+                    return cut
+            space = buffer.rfind(" ", 0, self.max_chunk_chars)
+            return space if space > 0 else self.max_chunk_chars
+        return None
+
+    @staticmethod
+    def _is_abbreviation(buffer: str, index: int, terminator: str, after: int) -> bool:
+        """True if the "." at `index` (text resuming at `after`) belongs to an abbreviation, initial or list marker."""
+        if terminator != ".":
+            return False
+        before = buffer[:index]
+        if _LIST_MARKER.search(before):
+            return True
+        word = _WORD_BEFORE.search(before)
+        if not word:
+            return False
+        word = word.group(1)
+        if "." in word:
+            return True  # "p.ex.", "c.-à-d.", "U.S."
+        if len(word) == 1 and word.isupper():
+            return True  # Initial, as in "J. K. Rowling"
+        word = word.lower()
+        if word in NUMBERED_ABBREVIATIONS:
+            return _NUMBER_AFTER.match(buffer, after) is not None
+        return word in ABBREVIATIONS
@@ -0,0 +1,311 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator, Optional
+
+import numpy as np
+
+from heisenberg.interfaces.tts import ABCTTS
+from heisenberg.interfaces.audio import ABCAudioIO
+from heisenberg.core.config import TTSConfig
+from heisenberg.core.logging import get_correlation_id, set_correlation_id
+from heisenberg.core.metrics import metrics
+from heisenberg.core.tracing import tracer
+from heisenberg.tts.cache import PhraseCache
+from heisenberg.tts.voices import VoiceManager
+
+# piper >= 1.3 takes synthesis settings as a SynthesisConfig
+try:
+    from piper import SynthesisConfig
+except ImportError:
+    SynthesisConfig = None
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_RATE = 16000  # Playback rate, same as the rest of the audio pipeline
+
+
+@dataclass
+class _ChunkStart:
+    """Marker queued before the first frame of a text chunk."""
+    correlation_id: Optional[str]
+
+
+@dataclass
+class _ChunkDone:
+    """Marker queued after the last frame of a text chunk."""
+    text: str
+
+
+def resample(audio: np.ndarray, from_rate: int, to_rate: int) -> np.ndarray:
+    """Linear resampling of int16 mono audio."""
+    if from_rate == to_rate or len(audio) == 0:
+        return audio
+    target_len = int(len(audio) * to_rate / from_rate)
+    return np.interp(
+        np.linspace(0, len(audio), target_len, endpoint=False),
+        np.arange(len(audio)),
+        audio,
+    ).astype(np.int16)
+
+
+class PiperTTS(ABCTTS):
+    """
+    Local streaming TTS with Piper.
+
+    Two stages connected by queues:
+    - synthesis runs on a dedicated worker thread and pushes 16kHz frames as
+      soon as Piper produces them, chunk after chunk;
+    - playback writes those frames to the audio output.
+    Chunk N+1 is therefore synthesized while chunk N plays. `stop()` empties
+    both queues and aborts the synthesis in progress; audio stops after the
+    frame being written, i.e. within one `frame_ms` period.
+
+    With a `PhraseCache`, chunks already spoken once are played straight
+    from their memory-mapped audio file, skipping synthesis.
+
+    Voices come from a `VoiceManager` (shareable between engines) and are
+    loaded on first use; `set_voice()` switches voice for the next chunks.
+    The engine holds a lease on the voice it speaks with, so the pool never
+    evicts it from under the engine.
+    """
+
+    def __init__(
+        self,
+        config: TTSConfig,
+        audio_io: ABCAudioIO,
+        voice: Optional[Any] = None,
+        cache: Optional[PhraseCache] = None,
+        voices: Optional[VoiceManager] = None,
+    ):
+        """
+        Args:
+            config: TTS configuration
+            audio_io: Output device (play_frame)
+            voice: Preloaded voice for `config.voice` (fetched from `voices` on first use if None)
+            cache: Phrase cache (created from config if None and `cache_enabled`)
+            voices: Voice pool (a private one is created if None)
+        """
+        self.config = config
+        self.audio_io = audio_io
+        self.voices = voices or VoiceManager(config)
+        self.voice_name = config.voice
+        self.voice = voice
+        self._leased: Optional[str] = None  # Voice acquired from the pool, released on switch or close
+        if cache is None and config.cache_enabled:
+            cache = PhraseCache.from_config(config)
+        self.cache = cache
+        self.frame_bytes = OUTPUT_RATE * config.frame_ms // 1000 * 2
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts")
+        self._text_queue: asyncio.Queue = asyncio.Queue()
+        self._audio_queue: asyncio.Queue = asyncio.Queue()
+        self._epoch = 0  # Bumped by stop(): synthesis of older chunks is abandoned
+        self._pending = 0  # Chunks queued or playing
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._tasks: list[asyncio.Task] = []
+        self._playing_for: Optional[str] = None  # Turn whose first audio is about to play
+        self.last_rtf: Optional[float] = None
+
+    async def set_voice(self, name: str) -> None:
+        """
+        Speak the next chunks with another voice (e.g. per session or language).
+        Loads off the event loop, and is immediate if the voice is already resident.
+        """
+        if name == self.voice_name and self.voice is not None:
+            return
+        voice = await self.voices.acquire(name)
+        self._release_voice()
+        self.voice, self.voice_name, self._leased = voice, name, name
+
+    async def _current_voice(self) -> Any:
+        if self.voice is None:
+            voice = await self.voices.acquire(self.voice_name)
+            if self.voice is None:
+                self.voice, self._leased = voice, self.voice_name
+            else:
+                # set_voice() won the race while the voice was loading
+                self.voices.release(self.voice_name)
+        return self.voice
+
+    def _release_voice(self) -> None:
+        if self._leased is not None:
+            self.voices.release(self._leased)
+            self._leased = None
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._synthesis_loop()),
+            asyncio.create_task(self._playback_loop()),
+        ]
+
+    async def close(self) -> None:
+        await self.stop()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._executor.shutdown(wait=False)
+        self._release_voice()
+        self.voice = None
+
+    async def speak(self, text_chunk: str) -> None:
+        """Queue a chunk of text; returns immediately."""
+        if not text_chunk.strip():
+            return
+        await self.start()
+        self._pending += 1
+        self._idle.clear()
+        self._text_queue.put_nowait((self._epoch, text_chunk, get_correlation_id()))
+
+    async def stop(self) -> None:
+        """Drop queued text and audio and abort the synthesis in progress."""
+        self._epoch += 1
+        for queue in (self._text_queue, self._audio_queue):
+            while not queue.empty():
+                queue.get_nowait()
+        if self._pending:
+            metrics.increment("tts_stopped")
+        self._pending = 0
+        self._idle.set()
+
+    async def wait_idle(self) -> None:
+        """Wait until everything queued so far has been played."""
+        await self._idle.wait()
+
+    def cache_key(self, text: str) -> str:
+        return PhraseCache.key(
+            self.voice_name, text, {"length_scale": self.config.length_scale, "rate": OUTPUT_RATE}
+        )
+
+    async def prewarm(self, phrases: Iterable[str]) -> int:
+        """
+        Synthesize fixed phrases into the cache ahead of time (e.g. the wake acknowledgement).
+        
+        Returns:
+            Number of phrases synthesized (already cached ones are skipped)
+        """
+        if self.cache is None:
+            return 0
+        loop = asyncio.get_running_loop()
+        synthesized = 0
+        for phrase in phrases:
+            key = self.cache_key(phrase)
+            if key in self.cache:
+                continue
+            voice = await self._current_voice()
+            pcm = await loop.run_in_executor(self._executor, self._synthesize, loop, None, voice, phrase)
+            if pcm:
+                self.cache.put(key, pcm)
+                synthesized += 1
+        logger.info(f"TTS cache pre-warmed with {synthesized} new phrases")
+        return synthesized
+
+    async def _synthesis_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            epoch, text, correlation_id = await self._text_queue.get()
+            if epoch != self._epoch:
+                continue
+            # Logs and spans of this chunk belong to the turn that queued it
+            set_correlation_id(correlation_id)
+            self._audio_queue.put_nowait((epoch, _ChunkStart(correlation_id)))
+            key = self.cache_key(text) if self.cache is not None else None
+            audio = self.cache.get(key) if key is not None else None
+            if audio is not None:
+                # Cache hit: frames are slices of the mapped file, queued at once
+                for i in range(0, len(audio), self.frame_bytes):
+                    self._audio_queue.put_nowait((epoch, audio[i:i + self.frame_bytes]))
+                logger.debug(f"TTS cache hit for '{text[:40]}'")
+            else:
+                try:
+                    with tracer.span("tts_synthesis", correlation_id, chars=len(text)):
+                        voice = await self._current_voice()
+                        pcm = await loop.run_in_executor(self._executor, self._synthesize, loop, epoch, voice, text)
+                    if pcm and key is not None:
+                        self.cache.put(key, pcm)
+                except Exception as e:
+                    logger.error(f"TTS synthesis failed for '{text[:40]}': {e}", exc_info=True)
+            if epoch == self._epoch:
+                self._audio_queue.put_nowait((epoch, _ChunkDone(text)))
+
+    def _synthesize(
+        self, loop: asyncio.AbstractEventLoop, epoch: Optional[int], voice: Any, text: str
+    ) -> Optional[bytes]:
+        """
+        Worker thread: synthesize `text`, handing frames to the event loop as they come.
+        
+        Args:
+            epoch: Epoch the frames belong to, or None to synthesize without playing
+            voice: Piper voice to use
+            
+        Returns:
+            The complete 16kHz audio, or None if aborted by stop()
+        """
+        start = time.perf_counter()
+        samples = 0
+        remainder = b""
+        parts = []
+        for pcm in self._iter_audio(voice, text):
+            if epoch is not None and epoch != self._epoch:
+                logger.debug("TTS synthesis aborted")
+                return None
+            audio = resample(np.frombuffer(pcm, dtype=np.int16), voice.config.sample_rate, OUTPUT_RATE).tobytes()
+            samples += len(audio) // 2
+            parts.append(audio)
+            if epoch is None:
+                continue
+            data = remainder + audio
+            cut = len(data) - len(data) % self.frame_bytes
+            for i in range(0, cut, self.frame_bytes):
+                loop.call_soon_threadsafe(self._audio_queue.put_nowait, (epoch, data[i:i + self.frame_bytes]))
+            remainder = data[cut:]
+        if remainder:
+            loop.call_soon_threadsafe(self._audio_queue.put_nowait, (epoch, remainder))
+
+        synthesis_ms = (time.perf_counter() - start) * 1000
+        audio_ms = samples * 1000 / OUTPUT_RATE
+        if audio_ms > 0:
+            self.last_rtf = synthesis_ms / audio_ms
+            metrics.record_latency("tts_synthesis", synthesis_ms)
+            metrics.set_gauge("tts_rtf", self.last_rtf)
+            logger.info(
+                f"TTS chunk synthesized: {audio_ms:.0f}ms of audio in {synthesis_ms:.0f}ms "
+                f"(RTF {self.last_rtf:.2f}, {len(text)} chars)"
+            )
+        return b"".join(parts)
+
+    def _iter_audio(self, voice: Any, text: str) -> Iterator[bytes]:
+        """Raw int16 audio from Piper, one sentence at a time."""
+        if hasattr(voice, "synthesize_stream_raw"):
+            yield from voice.synthesize_stream_raw(text, length_scale=self.config.length_scale)
+        else:
+            # piper >= 1.3 yields AudioChunk objects
+            syn_config = SynthesisConfig(length_scale=self.config.length_scale) if SynthesisConfig else None
+            for chunk in voice.synthesize(text, syn_config=syn_config):
+                yield chunk.audio_int16_bytes
+
+    async def _playback_loop(self) -> None:
+        while True:
+            epoch, item = await self._audio_queue.get()
+            if epoch != self._epoch:
+                continue
+            if isinstance(item, _ChunkStart):
+                self._playing_for = item.correlation_id
+                continue
+            if isinstance(item, _ChunkDone):
+                self._pending = max(0, self._pending - 1)
+                if self._pending == 0:
+                    self._idle.set()
+                continue
+            if self._playing_for is not None:
+                tracer.mark("tts_first_audio", self._playing_for)
+                self._playing_for = None
+            try:
+                await self.audio_io.play_frame(item)
+            except Exception as e:
+                logger.error(f"TTS playback failed: {e}")
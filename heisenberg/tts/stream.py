@@ -1,8 +1,28 @@
+import asyncio
+import time
+
 from heisenberg.interfaces.tts import ABCTTS
 
+
 class TTSStream(ABCTTS):
+    """
+    Placeholder engine used when no real TTS is enabled.
+
+    Nothing is played, but playback time is simulated (0.05s per character)
+    so mic gating and FSM timing behave as they would with a real engine.
+    """
+
+    SECONDS_PER_CHAR = 0.05
+
+    def __init__(self):
+        self._playback_end = 0.0
+
     async def speak(self, text_chunk: str) -> None:
-        pass
+        now = time.monotonic()
+        self._playback_end = max(self._playback_end, now) + len(text_chunk) * self.SECONDS_PER_CHAR
 
     async def stop(self) -> None:
-        pass
+        self._playback_end = 0.0
+
+    async def wait_idle(self) -> None:
+        await asyncio.sleep(max(0.0, self._playback_end - time.monotonic()))
@@ -1,3 +1,204 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from heisenberg.core.config import TTSConfig
+from heisenberg.core.exceptions import TTSError
+from heisenberg.core.metrics import metrics
+
+# Try to import piper, handle missing dependency gracefully
+try:
+    from piper import PiperVoice
+except ImportError:
+    PiperVoice = None
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class VoiceInfo:
+    """A voice model found on disk."""
+    name: str  # e.g. "fr_FR-siwis-medium"
+    model_path: str
+    language: str  # e.g. "fr_FR"
+    size_bytes: int  # Model file size, used as the RAM estimate of a loaded voice
+
+
+def load_piper_voice(info: VoiceInfo) -> Any:
+    """Default loader (blocking): a Piper voice from its .onnx file and .onnx.json config."""
+    if PiperVoice is None:
+        raise TTSError("piper library not found. Please install it with 'pip install piper-tts'.")
+    return PiperVoice.load(info.model_path)
+
+
 class VoiceManager:
-    """Manages TTS voices."""
-    pass
+    """
+    Manages TTS voice models.
+
+    Voices are discovered in `voices_dir` (`<name>.onnx` + `<name>.onnx.json`)
+    and loaded on first use, on a worker thread so the event loop keeps
+    running. Loaded voices stay in a pool bounded by `voice_memory_budget_mb`;
+    the least recently used ones are dropped when a new one does not fit.
+    Concurrent requests for a voice share a single load.
+
+    Engines that keep a voice take it with `acquire()` and hand it back with
+    `release()`; a voice in use is never evicted (dropping it from the pool
+    would not free it, and the next `get()` would load a second copy), so
+    the pool may exceed the budget until its users release their voices.
+    """
+
+    def __init__(self, config: TTSConfig, loader: Callable[[VoiceInfo], Any] = load_piper_voice):
+        """
+        Args:
+            config: TTS configuration (voices_dir, default voice, memory budget)
+            loader: Blocking function turning a VoiceInfo into a voice object
+        """
+        self.config = config
+        self.loader = loader
+        self.budget_bytes = config.voice_memory_budget_mb * 1024 * 1024
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="voices")
+        self._voices: Optional[Dict[str, VoiceInfo]] = None
+        self._loaded: "OrderedDict[str, Any]" = OrderedDict()
+        self._users: Dict[str, int] = {}  # Voice name -> engines holding it
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._preload_task: Optional[asyncio.Task] = None
+
+    def discover(self) -> Dict[str, VoiceInfo]:
+        """(Re)scan `voices_dir` for voice models."""
+        voices = {}
+        directory = self.config.voices_dir
+        names = sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+        for filename in names:
+            if not filename.endswith(".onnx"):
+                continue
+            name = filename[: -len(".onnx")]
+            model_path = os.path.join(directory, filename)
+            language = name.split("-", 1)[0]
+            try:
+                with open(model_path + ".json", encoding="utf-8") as f:
+                    language = json.load(f).get("language", {}).get("code", language)
+            except (OSError, ValueError):
+                logger.warning(f"Voice {name} has no readable {filename}.json config")
+            voices[name] = VoiceInfo(name, model_path, language, os.path.getsize(model_path))
+        self._voices = voices
+        logger.info(f"Discovered {len(voices)} TTS voices in {directory}")
+        return voices
+
+    @property
+    def voices(self) -> Dict[str, VoiceInfo]:
+        if self._voices is None:
+            self.discover()
+        return self._voices
+
+    def voices_for_language(self, language: str) -> List[str]:
+        """Names of the voices for a language ("fr" or "fr_FR"), resident ones first."""
+        language = language.lower().replace("-", "_")
+        names = [
+            name for name, info in self.voices.items()
+            if info.language.lower() == language or info.language.lower().split("_")[0] == language
+        ]
+        return sorted(names, key=lambda name: name not in self._loaded)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._loaded
+
+    @property
+    def loaded_bytes(self) -> int:
+        return sum(self.voices[name].size_bytes for name in self._loaded)
+
+    async def get(self, name: Optional[str] = None) -> Any:
+        """
+        Return a loaded voice (the default voice if `name` is None), loading it if needed.
+
+        Raises:
+            TTSError: If the voice does not exist or fails to load
+        """
+        name = name or self.config.voice
+        voice = self._loaded.get(name)
+        if voice is not None:
+            self._loaded.move_to_end(name)
+            metrics.increment("tts_voice_hit")
+            return voice
+
+        pending = self._loading.get(name)
+        if pending is None:
+            pending = asyncio.ensure_future(self._load(name))
+            self._loading[name] = pending
+            pending.add_done_callback(lambda _: self._loading.pop(name, None))
+        return await asyncio.shield(pending)
+
+    async def acquire(self, name: Optional[str] = None) -> Any:
+        """Like `get()`, but the voice stays resident until the matching `release()`."""
+        name = name or self.config.voice
+        voice = await self.get(name)
+        self._users[name] = self._users.get(name, 0) + 1
+        return voice
+
+    def release(self, name: Optional[str] = None) -> None:
+        """Hand back a voice taken with `acquire()`; it may be evicted again."""
+        name = name or self.config.voice
+        users = self._users.get(name, 0) - 1
+        if users > 0:
+            self._users[name] = users
+            return
+        self._users.pop(name, None)
+        self._evict()
+
+    def in_use(self, name: str) -> bool:
+        return name in self._users
+
+    async def _load(self, name: str) -> Any:
+        info = self.voices.get(name)
+        if info is None:
+            raise TTSError(f"Unknown TTS voice '{name}' (not in {self.config.voices_dir})")
+
+        metrics.increment("tts_voice_miss")
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            voice = await loop.run_in_executor(self._executor, self.loader, info)
+        except TTSError:
+            raise
+        except Exception as e:
+            raise TTSError(f"Failed to load TTS voice '{name}': {e}") from e
+        load_ms = (time.perf_counter() - start) * 1000
+
+        self._loaded[name] = voice
+        self._evict(keep=name)
+        metrics.record_latency("tts_voice_load", load_ms)
+        logger.info(f"TTS voice {name} loaded in {load_ms:.0f}ms ({self.loaded_bytes / 1e6:.0f} MB resident)")
+        return voice
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        while self.loaded_bytes > self.budget_bytes:
+            victim = next((name for name in self._loaded if name != keep and name not in self._users), None)
+            if victim is None:
+                logger.warning(f"TTS voices in use exceed the voice memory budget ({self.loaded_bytes / 1e6:.0f} MB)")
+                break
+            del self._loaded[victim]
+            logger.info(f"TTS voice {victim} evicted from the pool")
+        metrics.set_gauge("tts_voices_bytes", self.loaded_bytes)
+        metrics.set_gauge("tts_voices_loaded", len(self._loaded))
+
+    def preload(self, name: Optional[str] = None) -> asyncio.Task:
+        """Load a voice (default: the configured one) in the background."""
+
+        async def run():
+            try:
+                await self.get(name)
+            except TTSError as e:
+                logger.error(f"TTS voice preload failed: {e}")
+
+        self._preload_task = asyncio.create_task(run())
+        return self._preload_task
+
+    def close(self) -> None:
+        self._loaded.clear()
+        self._users.clear()
+        self._executor.shutdown(wait=False)
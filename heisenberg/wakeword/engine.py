@@ -1,4 +1,5 @@
 import asyncio
+import copy
 import logging
 import numpy as np
 import openwakeword
@@ -53,6 +54,25 @@ class OpenWakeWordEngine(ABCWakeword):
             logger.error(f"Failed to open debug WAV: {e}")
             self.debug_wav = None
 
+    def fork(self) -> "OpenWakeWordEngine":
+        """
+        Engine for another audio stream sharing this one's models.
+
+        The ONNX sessions (melspectrogram, embedding and wakeword models) are
+        stateless and reused; only the streaming buffers are per engine.
+        """
+        engine = object.__new__(type(self))
+        engine.config = self.config
+        engine.callback = None
+        engine.running = False
+        engine.model = copy.copy(self.model)
+        engine.model.preprocessor = copy.copy(self.model.preprocessor)
+        # reset() rebinds fresh audio, feature and prediction buffers on the copies
+        engine.model.reset()
+        engine.debug_wav_path = None
+        engine.debug_wav = None
+        return engine
+
     def on_detected(self, callback: Callable[[], Awaitable[None]]) -> None:
         self.callback = callback
 